@@ -23,6 +23,8 @@ from multichaindb.core import App  # noqa
 
 _database_keys_map = {
     'localarangodb': ('host', 'port', 'name'),
+    'memory': ('name',),
+    'sqlite': ('path', 'name'),
 }
 
 _base_database_localarangodb = {
@@ -44,12 +46,48 @@ _database_localarangodb = {
     'keyfile': None,
     'keyfile_passphrase': None,
     'crlfile': None,
+    'pool_size': 10,
+    'key_by_id': False,
+    'batch_size': 1000,
+    'spend_graph': False,
+    'shard_count': 1,
+    'replication_factor': 1,
+    'retry_delay': 100,
+    'retry_max_delay': 5000,
+    'breaker_threshold': 5,
+    'breaker_timeout': 30000,
+    'overwrite_mode': 'ignore',
+    'write_batch_size': 1000,
 }
 
 _database_localarangodb.update(_base_database_localarangodb)
 
+_database_memory = {
+    'backend': 'memory',
+    'host': None,
+    'port': None,
+    'name': 'multichaindb',
+    'connection_timeout': 5000,
+    'max_tries': 3,
+    'overwrite_mode': 'ignore',
+}
+
+_database_sqlite = {
+    'backend': 'sqlite',
+    'host': None,
+    'port': None,
+    'name': 'multichaindb',
+    'path': None,                   # defaults to the current directory
+    'connection_timeout': 5000,
+    'max_tries': 3,
+    'overwrite_mode': 'ignore',
+    'mmap_size': 268435456,         # 256 MiB
+}
+
 _database_map = {
     'localarangodb': _database_localarangodb,
+    'memory': _database_memory,
+    'sqlite': _database_sqlite,
 }
 
 config = {
@@ -76,6 +114,23 @@ config = {
     },
     # FIXME: hardcoding to localmongodb for now
     'database': _database_map['localarangodb'],
+    'cache': {
+        # Size of the cache of transactions and blocks read by each
+        # process. 0 disables it.
+        'max_bytes': 67108864,      # 64 MiB
+        # Size above which the bloom filter of the committed transaction
+        # ids is dropped, and the database queried for every id instead.
+        'committed_max_bytes': 134217728,   # 128 MiB
+    },
+    'mempool': {
+        # Unix socket the HTTP API reports the transactions it validated
+        # to, so that check_tx and deliver_tx do not verify their
+        # signatures again. Whatever the socket receives is trusted: only
+        # set it to a path in a directory that nobody but the user running
+        # MultiChainDB can write to, e.g. the data directory of the node.
+        # None (the default) disables it.
+        'validated_socket': None,
+    },
     'log': {
         'file': log_config['handlers']['file']['filename'],
         'error_file': log_config['handlers']['errors']['filename'],
@@ -0,0 +1,86 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""ABCI server handing the ``check_tx`` requests received together to the
+application at once."""
+
+import logging
+from io import BytesIO
+
+from abci import server
+from abci.encoding import read_messages, write_message
+from gevent.server import StreamServer
+
+
+logger = logging.getLogger(__name__)
+
+# Size of the reads from the connections to Tendermint.
+READ_SIZE = 64 * 1024
+
+
+class ABCIServer(server.ABCIServer):
+    """Same as :class:`abci.server.ABCIServer`, except for the consecutive
+    ``check_tx`` requests found in the data received: they are passed
+    together to :meth:`~multichaindb.core.App.check_txs`, so that they can
+    be validated in parallel.
+
+    Tendermint sends the requests of its mempool connection one after the
+    other, without waiting for the answers. The responses are still sent
+    one by one, in the order of the requests.
+    """
+
+    def __init__(self, port=26658, app=None):
+        super().__init__(port=port, app=app)
+        self.server = StreamServer(('0.0.0.0', port),
+                                   handle=self.handle_connection)
+
+    def process(self, requests):
+        """Return the responses, encoded, to ``requests``."""
+        responses = []
+        check_txs = []
+        for request in requests + [None]:
+            req_type = request.WhichOneof('value') if request else None
+            if req_type == 'check_tx':
+                check_txs.append(request.check_tx.tx)
+                continue
+            if check_txs:
+                responses.extend(
+                    write_message(self.app.abci.Response(check_tx=result))
+                    for result in self.app.check_txs(check_txs))
+                check_txs = []
+            if request is not None:
+                responses.append(self.protocol.process(req_type, request))
+        return responses
+
+    def handle_connection(self, socket, address):
+        logger.info(' ... connection from Tendermint: %s:%s ...', *address[:2])
+        data = BytesIO()
+        last_pos = 0
+
+        while True:
+            # Start a new buffer once all the data received was processed.
+            if last_pos == data.tell():
+                data = BytesIO()
+                last_pos = 0
+
+            inbound = socket.recv(READ_SIZE)
+            data.write(inbound)
+
+            if not len(inbound):
+                break
+
+            # Read the complete messages received since the last one.
+            data.seek(last_pos)
+            requests = []
+            for request in read_messages(data, self.app.abci.Request):
+                requests.append(request)
+                last_pos = data.tell()
+            # Position the buffer at the end again, to append to it.
+            data.seek(0, 2)
+
+            for response in self.process(requests):
+                socket.sendall(response)
+
+        socket.close()
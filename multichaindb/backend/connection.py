@@ -4,16 +4,20 @@
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
 import logging
+import time
 from importlib import import_module
 from itertools import repeat
 
 import multichaindb
 from multichaindb.backend.exceptions import ConnectionError
+from multichaindb.backend.retry import backoff
 from multichaindb.backend.utils import get_multichaindb_config_value, get_multichaindb_config_value_or_key_error
 from multichaindb.common.exceptions import ConfigurationError
 
 BACKENDS = {
     'localarangodb': 'multichaindb.backend.localarangodb.connection.LocalArangoDBConnection',
+    'memory': 'multichaindb.backend.memory.connection.MemoryConnection',
+    'sqlite': 'multichaindb.backend.sqlite.connection.SQLiteConnection',
 }
 
 logger = logging.getLogger(__name__)
@@ -22,7 +26,11 @@ logger = logging.getLogger(__name__)
 def connect(backend=None, host=None, port=None, name=None, max_tries=None,
             connection_timeout=None, replicaset=None, ssl=None, login=None, password=None,
             ca_cert=None, certfile=None, keyfile=None, keyfile_passphrase=None,
-            crlfile=None):
+            crlfile=None, pool_size=None, key_by_id=None,
+            batch_size=None, spend_graph=None, shard_count=None,
+            replication_factor=None, retry_delay=None, retry_max_delay=None,
+            breaker_threshold=None, breaker_timeout=None, overwrite_mode=None,
+            write_batch_size=None, path=None, mmap_size=None):
     """Create a new connection to the database backend.
 
     All arguments default to the current configuration's values if not
@@ -30,11 +38,45 @@ def connect(backend=None, host=None, port=None, name=None, max_tries=None,
 
     Args:
         backend (str): the name of the backend to use.
-        host (str): the host to connect to.
+        host (str): the host to connect to. Can be a comma separated list
+                    of ``host[:port]`` when connecting to a cluster.
         port (int): the port to connect to.
         name (str): the name of the database to use.
         replicaset (str): the name of the replica set (only relevant for
                           MongoDB connections).
+        pool_size (int): the maximum number of connections kept open
+                         towards each database host.
+        key_by_id (bool): whether transactions, assets and metadata are
+                          stored with their id as primary key.
+        batch_size (int): the number of rows fetched at a time when reading
+                          large results.
+        spend_graph (bool): whether the outputs spent by each transaction
+                            are also stored as the edges of a graph.
+        shard_count (int): the number of shards of the large collections,
+                           when the database is a cluster.
+        replication_factor (int): the number of copies of each shard, when
+                                  the database is a cluster.
+        retry_delay (int): the upper bound, in milliseconds, of the delay
+                           before the first retry of a failed connection
+                           or query. It doubles at each retry.
+        retry_max_delay (int): the upper bound, in milliseconds, of every
+                               delay between retries.
+        breaker_threshold (int): the number of consecutive failed queries
+                                 after which queries are refused without
+                                 reaching the database. ``0`` disables it.
+        breaker_timeout (int): how long, in milliseconds, queries are
+                               refused once ``breaker_threshold`` is
+                               reached, and unreachable hosts are skipped.
+        overwrite_mode (str): what storing a transaction, asset or metadata
+                              already stored does: ``ignore`` keeps the
+                              stored one, ``replace`` replaces it.
+        write_batch_size (int): the maximum number of documents written by
+                                a single request.
+        path (str): the directory holding the database file, for the
+                    backends storing it locally.
+        mmap_size (int): the number of bytes of the database file read
+                         through a memory map, for the backends storing it
+                         locally.
 
     Returns:
         An instance of :class:`~bigchaindb.backend.connection.Connection`
@@ -70,6 +112,23 @@ def connect(backend=None, host=None, port=None, name=None, max_tries=None,
     keyfile = keyfile or get_multichaindb_config_value('keyfile')
     keyfile_passphrase = keyfile_passphrase or get_multichaindb_config_value('keyfile_passphrase', None)
     crlfile = crlfile or get_multichaindb_config_value('crlfile')
+    pool_size = pool_size or get_multichaindb_config_value('pool_size')
+    batch_size = batch_size or get_multichaindb_config_value('batch_size')
+    key_by_id = key_by_id if key_by_id is not None else get_multichaindb_config_value('key_by_id', False)
+    spend_graph = spend_graph if spend_graph is not None else get_multichaindb_config_value('spend_graph', False)
+    shard_count = shard_count or get_multichaindb_config_value('shard_count')
+    replication_factor = replication_factor or get_multichaindb_config_value('replication_factor')
+    retry_delay = retry_delay if retry_delay is not None else get_multichaindb_config_value('retry_delay')
+    retry_max_delay = retry_max_delay if retry_max_delay is not None \
+        else get_multichaindb_config_value('retry_max_delay')
+    breaker_threshold = breaker_threshold if breaker_threshold is not None \
+        else get_multichaindb_config_value('breaker_threshold')
+    breaker_timeout = breaker_timeout if breaker_timeout is not None \
+        else get_multichaindb_config_value('breaker_timeout')
+    overwrite_mode = overwrite_mode or get_multichaindb_config_value('overwrite_mode')
+    write_batch_size = write_batch_size or get_multichaindb_config_value('write_batch_size')
+    path = path or get_multichaindb_config_value('path')
+    mmap_size = mmap_size if mmap_size is not None else get_multichaindb_config_value('mmap_size')
 
     try:
         module_name, _, class_name = BACKENDS[backend].rpartition('.')
@@ -85,7 +144,17 @@ def connect(backend=None, host=None, port=None, name=None, max_tries=None,
                  max_tries=max_tries, connection_timeout=connection_timeout,
                  replicaset=replicaset, ssl=ssl, login=login, password=password,
                  ca_cert=ca_cert, certfile=certfile, keyfile=keyfile,
-                 keyfile_passphrase=keyfile_passphrase, crlfile=crlfile)
+                 keyfile_passphrase=keyfile_passphrase, crlfile=crlfile,
+                 pool_size=pool_size, key_by_id=key_by_id,
+                 batch_size=batch_size, spend_graph=spend_graph,
+                 shard_count=shard_count,
+                 replication_factor=replication_factor,
+                 retry_delay=retry_delay, retry_max_delay=retry_max_delay,
+                 breaker_threshold=breaker_threshold,
+                 breaker_timeout=breaker_timeout,
+                 overwrite_mode=overwrite_mode,
+                 write_batch_size=write_batch_size, path=path,
+                 mmap_size=mmap_size)
 
 
 class Connection:
@@ -96,8 +165,8 @@ class Connection:
     """
 
     def __init__(self, host=None, port=None, dbname=None,
-                 connection_timeout=None, max_tries=None,
-                 **kwargs):
+                 connection_timeout=None, max_tries=None, batch_size=None,
+                 retry_delay=None, retry_max_delay=None, **kwargs):
         """Create a new :class:`~.Connection` instance.
 
         Args:
@@ -109,6 +178,14 @@ class Connection:
                 Defaults to 5000ms.
             max_tries (int, optional): how many tries before giving up,
                 if 0 then try forever. Defaults to 3.
+            batch_size (int, optional): the number of rows fetched at a
+                time when reading large results. Defaults to 1000.
+            retry_delay (int, optional): the upper bound, in milliseconds,
+                of the delay before the first retry. It doubles at each
+                retry. Defaults to 100ms.
+            retry_max_delay (int, optional): the upper bound, in
+                milliseconds, of every delay between retries. Defaults to
+                5000ms.
             **kwargs: arbitrary keyword arguments provided by the
                 configuration's ``database`` settings
         """
@@ -121,6 +198,11 @@ class Connection:
         self.connection_timeout = connection_timeout if connection_timeout is not None \
             else dbconf['connection_timeout']
         self.max_tries = max_tries if max_tries is not None else dbconf['max_tries']
+        self.batch_size = batch_size or dbconf.get('batch_size', 1000)
+        self.retry_delay = retry_delay if retry_delay is not None \
+            else dbconf.get('retry_delay', 100)
+        self.retry_max_delay = retry_max_delay if retry_max_delay is not None \
+            else dbconf.get('retry_max_delay', 5000)
         self.max_tries_counter = range(self.max_tries) if self.max_tries != 0 else repeat(0)
         self._conn = None
 
@@ -154,11 +236,17 @@ class Connection:
                 fails.
         """
 
+        self._conn = self._connect_with_retries()
+
+    def _connect_with_retries(self):
+        """Return a new connection to the database, see :meth:`connect`."""
+
         attempt = 0
+        delays = backoff(self.retry_delay, self.retry_max_delay)
         for i in self.max_tries_counter:
             attempt += 1
             try:
-                self._conn = self._connect()
+                return self._connect()
             except ConnectionError as exc:
                 logger.warning('Attempt %s/%s. Connection to %s:%s failed after %sms.',
                                attempt, self.max_tries if self.max_tries != 0 else '∞',
@@ -166,5 +254,4 @@ class Connection:
                 if attempt == self.max_tries:
                     logger.critical('Cannot connect to the Database. Giving up.')
                     raise ConnectionError() from exc
-            else:
-                break
+                time.sleep(next(delays))
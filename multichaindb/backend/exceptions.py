@@ -14,6 +14,12 @@ class ConnectionError(BackendError):
     """Exception raised when the connection to the backend fails."""
 
 
+class CircuitOpenError(ConnectionError):
+    """Exception raised, without trying, when too many recent requests to
+    the backend failed. It is not retried.
+    """
+
+
 class OperationError(BackendError):
     """Exception raised when a backend operation fails."""
 
@@ -1,13 +1,94 @@
 
+import time
+
 from arango import ArangoClient
 from arango.exceptions import (
     DocumentGetError
 )
+from arango.http import DefaultHTTPClient
+from arango.resolver import HostResolver
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PooledHTTPClient(DefaultHTTPClient):
+    """HTTP client keeping a bounded pool of keep-alive connections per host.
+
+    Every MultiChainDB process (each gunicorn worker, the ABCI app, ...) owns
+    its own client, so ``pool_size`` bounds the number of connections a
+    single process opens towards each ArangoDB host.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=None):
+        self.pool_size = pool_size
+        # Give up quickly on hosts that do not accept connections, so that
+        # the next one is tried, but let busy servers take their time to
+        # answer.
+        self.REQUEST_TIMEOUT = (connect_timeout, self.REQUEST_TIMEOUT)
+
+    def create_session(self, host):
+        retry_strategy = Retry(
+            total=self.RETRY_ATTEMPTS,
+            backoff_factor=self.BACKOFF_FACTOR,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['HEAD', 'GET', 'OPTIONS'],
+        )
+        # A single host per session: one pool, with up to `pool_size`
+        # connections kept alive and reused between queries. Block instead
+        # of opening throwaway connections when all of them are busy.
+        http_adapter = HTTPAdapter(pool_connections=1,
+                                   pool_maxsize=self.pool_size,
+                                   pool_block=True,
+                                   max_retries=retry_strategy)
+
+        session = Session()
+        session.headers['Connection'] = 'keep-alive'
+        session.mount('https://', http_adapter)
+        session.mount('http://', http_adapter)
+        return session
+
+
+class HealthAwareHostResolver(HostResolver):
+    """Round-robin over the hosts, skipping the ones that recently failed.
+
+    A host that could not be reached is left out for ``down_time`` seconds.
+    Then it receives requests again, the first one acting as health check.
+    If every host is down they are all tried, in turn.
+    """
+
+    def __init__(self, host_count, max_tries=None, down_time=30):
+        super().__init__(host_count, max_tries)
+        self.down_time = down_time
+        self._down_until = [0] * host_count
+        self._index = -1
+
+    def get_host_index(self, indexes_to_filter=None):
+        indexes_to_filter = indexes_to_filter or set()
+        now = time.monotonic()
+        for index in indexes_to_filter:
+            self._down_until[index] = now + self.down_time
+
+        fallback = None
+        for _ in range(self.host_count):
+            self._index = (self._index + 1) % self.host_count
+            if self._index in indexes_to_filter:
+                continue
+            if self._down_until[self._index] <= now:
+                return self._index
+            if fallback is None:
+                fallback = self._index
+        return fallback if fallback is not None else self._index
+
 
 class ArangoConnection(ArangoClient):
 
-    def __init__(self, hosts, username=None, password=None, **kwargs):
-        super().__init__(hosts, kwargs)
+    def __init__(self, hosts, username=None, password=None, down_time=30,
+                 **kwargs):
+        super().__init__(hosts, **kwargs)
+        if len(self.hosts) > 1:
+            self._host_resolver = HealthAwareHostResolver(
+                len(self.hosts), down_time=down_time)
         # Define defaults credentials
         self.username = username if username is not None else 'root'
         self.password = password if password is not None else ''
@@ -16,6 +97,9 @@ class ArangoConnection(ArangoClient):
         can only be executed from within this database.
         Additionally, the _system database itself cannot be dropped'''
         self._system = None
+        # Database handles are cheap to keep but not to build: reuse them
+        # for every query instead of creating a new one on each access.
+        self._databases = {}
 
     @property
     def system(self):
@@ -23,7 +107,7 @@ class ArangoConnection(ArangoClient):
             self._system = self.db('_system', username=self.username,
                 password=self.password, verify=True)
         return self._system
-    
+
     def has_database(self, dbname):
         return self.system.has_database(dbname)
 
@@ -31,4 +115,9 @@ class ArangoConnection(ArangoClient):
         return self.system.create_database(dbname, args)
 
     def __getitem__(self, dbname):
-        return self.db(dbname, self.username, self.password)
+        try:
+            return self._databases[dbname]
+        except KeyError:
+            database = self.db(dbname, self.username, self.password)
+            self._databases[dbname] = database
+            return database
@@ -1,38 +1,98 @@
 
 import logging
+import time
 
-from multichaindb.backend.localarangodb.arango import ArangoConnection
+from requests.exceptions import Timeout
+
+from multichaindb.backend.localarangodb.arango import (
+    ArangoConnection,
+    PooledHTTPClient
+)
 from arango.exceptions import (
     ServerConnectionError,
     ArangoClientError,
+    AQLQueryExecuteError,
     DocumentInsertError,
-    CursorStateError
+    CursorStateError,
+    TransactionExecuteError
 )
 
 from multichaindb.backend.connection import Connection
+from arango.cursor import Cursor
+
 from multichaindb.backend.exceptions import (
     OperationError,
+    CircuitOpenError,
     ConnectionError,
     DuplicateKeyError
 )
+from multichaindb.backend.retry import CircuitBreaker, backoff
 
 from multichaindb.backend.utils import get_multichaindb_config_value
 from multichaindb.common.exceptions import ConfigurationError
-from multichaindb.utils import Lazy
 
 logger = logging.getLogger(__name__)
 
+# ArangoDB error number for ERROR_ARANGO_UNIQUE_CONSTRAINT_VIOLATED
+UNIQUE_CONSTRAINT_VIOLATED = 1210
+
+# ArangoDB error number for ERROR_QUERY_KILLED, e.g. when a query runs for
+# longer than its `max_runtime`
+QUERY_KILLED = 1500
+
+# What storing a document that is already stored does, see `_write` in
+# `query.py`.
+OVERWRITE_MODES = ('ignore', 'replace')
+
+# Failures worth retrying: no host could be reached, or the server did not
+# answer in time.
+RETRYABLE_ERRORS = (ServerConnectionError, ConnectionAbortedError, Timeout)
+
 
 class LocalArangoDBConnection(Connection):
 
     def __init__(self, replicaset=None, ssl=None, login=None, password=None,
                  ca_cert=None, certfile=None, keyfile=None,
-                 keyfile_passphrase=None, crlfile=None, **kwargs):
+                 keyfile_passphrase=None, crlfile=None, pool_size=None,
+                 key_by_id=None, spend_graph=None, shard_count=None,
+                 replication_factor=None, breaker_threshold=None,
+                 breaker_timeout=None, overwrite_mode=None,
+                 write_batch_size=None, **kwargs):
         """Create a new Connection instance.
 
         Args:
             replicaset (str, optional): the name of the replica set to
                                         connect to.
+            pool_size (int, optional): the maximum number of keep-alive
+                                       connections opened towards each
+                                       host.
+            key_by_id (bool, optional): if ``True`` transactions, assets
+                                        and metadata use their id as
+                                        document ``_key``.
+            spend_graph (bool, optional): if ``True`` every input of a
+                                          committed transaction is also
+                                          stored as an edge of the
+                                          ``spends`` collection.
+            shard_count (int, optional): the number of shards of the
+                                         transactions, assets and metadata
+                                         collections on a cluster.
+            replication_factor (int, optional): the number of copies of
+                                                each shard on a cluster.
+            breaker_threshold (int, optional): the number of consecutive
+                                               failed queries after which
+                                               queries are refused for
+                                               ``breaker_timeout``
+                                               milliseconds.
+            breaker_timeout (int, optional): how long queries are refused
+                                             for, and unreachable hosts
+                                             are skipped for.
+            overwrite_mode (str, optional): ``ignore`` or ``replace``,
+                                            what storing a transaction,
+                                            asset or metadata already
+                                            stored does.
+            write_batch_size (int, optional): the maximum number of
+                                              documents written by a
+                                              single request.
             **kwargs: arbitrary keyword arguments provided by the
                 configuration's ``database`` settings
         """
@@ -47,48 +107,148 @@ class LocalArangoDBConnection(Connection):
         self.keyfile = keyfile or get_multichaindb_config_value('keyfile')
         self.keyfile_passphrase = keyfile_passphrase or get_multichaindb_config_value('keyfile_passphrase')
         self.crlfile = crlfile or get_multichaindb_config_value('crlfile')
+        self.pool_size = pool_size or get_multichaindb_config_value('pool_size', 10)
+        self.key_by_id = key_by_id if key_by_id is not None \
+            else get_multichaindb_config_value('key_by_id', False)
+        self.spend_graph = spend_graph if spend_graph is not None \
+            else get_multichaindb_config_value('spend_graph', False)
+        self.shard_count = shard_count or get_multichaindb_config_value('shard_count', 1)
+        self.replication_factor = replication_factor or get_multichaindb_config_value('replication_factor', 1)
+        self.breaker_threshold = breaker_threshold if breaker_threshold is not None \
+            else get_multichaindb_config_value('breaker_threshold', 5)
+        self.breaker_timeout = breaker_timeout if breaker_timeout is not None \
+            else get_multichaindb_config_value('breaker_timeout', 30000)
+        self.breaker = CircuitBreaker(self.breaker_threshold,
+                                      self.breaker_timeout)
+        self.overwrite_mode = overwrite_mode or get_multichaindb_config_value('overwrite_mode', 'ignore')
+        if self.overwrite_mode not in OVERWRITE_MODES:
+            raise ConfigurationError('`overwrite_mode` must be one of {}, not '
+                                     '`{}`.'.format(', '.join(OVERWRITE_MODES),
+                                                    self.overwrite_mode))
+        self.write_batch_size = write_batch_size or get_multichaindb_config_value('write_batch_size', 1000)
+        self._collections = {}
+
+    @property
+    def urls(self):
+        """The URLs of the servers to connect to.
+
+        ``host`` can list several cluster coordinators separated by commas,
+        each one with its own port or using ``port``. Requests are sent to
+        them in turn, skipping the ones that cannot be reached.
+        """
+        urls = []
+        for host in str(self.host).split(','):
+            host = host.strip()
+            if ':' not in host:
+                host = '{}:{}'.format(host, self.port)
+            urls.append('http://{}'.format(host))
+        return urls
+
+    @property
+    def query_timeout(self):
+        """The time, in seconds, after which the server aborts a lookup."""
+        return self.connection_timeout / 1000
 
     @property
     def db(self):
         return self.conn[self.dbname]
 
-    def query(self):
-        return Lazy()
-
     def collection(self, name):
-        """Return a lazy object that can be used to compose a query.
+        """Return the handle of a collection of the database.
+
+        Handles are resolved once and reused by every query.
 
         Args:
-            name (str): the name of the collection to query.
+            name (str): the name of the collection.
         """
-        return self.query()[self.dbname][name]
+        try:
+            return self._collections[name]
+        except KeyError:
+            collection = self.db.collection(name)
+            self._collections[name] = collection
+            return collection
 
-    @property
-    def aql(self):
-        '''Return a lazy object that can be used to compose a query
-        
-        Args:
-            query (str): aql query to execute
-        '''
-        return self.query()[self.dbname].aql
+    def run(self, query, *args, **kwargs):
+        """Run a prepared query.
 
-    def run(self, query):
+        Args:
+            query (:class:`~.PreparedQuery`): the query to run.
+            *args: positional arguments for the query.
+            **kwargs: keyword arguments (e.g. AQL bind variables) for the
+                query.
+        """
         try:
-            try:
-                return query.run(self.conn)
-            except ServerConnectionError:
-                logger.warning('Lost connection to the database, '
-                               'retrying query.')
-                return query.run(self.conn)
-        except ServerConnectionError as exc:
-            raise ConnectionError from exc
+            return self._retry(query, *args, **kwargs)
         except DocumentInsertError as exc:
             raise DuplicateKeyError from exc
         except CursorStateError as exc:
             print(f'DETAILS: {exc.details}')
             raise OperationError from exc
+        except TransactionExecuteError as exc:
+            if exc.error_code == UNIQUE_CONSTRAINT_VIOLATED:
+                raise DuplicateKeyError from exc
+            raise OperationError from exc
+
+    def _retry(self, query, *args, **kwargs):
+        """Run ``query``, retrying with exponential backoff as long as the
+        database cannot be reached, up to ``max_tries`` times.
+        """
+        attempt = 0
+        delays = backoff(self.retry_delay, self.retry_max_delay)
+        while True:
+            attempt += 1
+            try:
+                return self._run(query, *args, **kwargs)
+            except CircuitOpenError:
+                if not query.wait_for_breaker:
+                    # Fail fast: that is the point of the breaker.
+                    raise
+                # Waiting for the database is all there is to do, e.g. for
+                # a block commit: wait until the breaker lets a probe
+                # through. That is not a failed attempt.
+                attempt -= 1
+                delay = max(self.breaker.retry_in(), next(delays))
+                logger.warning('Database unavailable, retrying in %.3fs.',
+                               delay)
+                time.sleep(delay)
+            except ConnectionError:
+                if attempt == self.max_tries:
+                    raise
+                delay = next(delays)
+                logger.warning('Attempt %s/%s. Query failed, retrying in '
+                               '%.3fs.', attempt,
+                               self.max_tries if self.max_tries != 0 else '∞',
+                               delay)
+                time.sleep(delay)
 
+    def _allow(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError('Too many failed queries, the database '
+                                   'is not queried for now.')
 
+    def _run(self, query, *args, **kwargs):
+        self._allow()
+        try:
+            result = query.run(self, *args, **kwargs)
+        except RETRYABLE_ERRORS as exc:
+            self.breaker.record_failure()
+            raise ConnectionError from exc
+        except AQLQueryExecuteError as exc:
+            if exc.error_code != QUERY_KILLED:
+                self.breaker.record_success()
+                raise
+            # Too slow: count it against the database, but do not retry
+            # since the query would most likely be too slow again.
+            self.breaker.record_failure()
+            raise OperationError('Query timed out.') from exc
+        except Exception:
+            # The database did answer.
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        if isinstance(result, Cursor) and result.has_more():
+            return StreamedCursor(self, result)
+        return result
 
     def _connect(self):
         """Try to connect to the database.
@@ -110,17 +270,71 @@ class LocalArangoDBConnection(Connection):
             # use of certificates for TLS connectivity.
             if self.ca_cert is None or self.certfile is None or \
                 self.keyfile is None or self.crlfile is None:
-                # Create url based on host:port
-                url = 'http://{}:{}'.format(self.host, self.port)
-                client = ArangoConnection(hosts=url, username=self.login, 
-                    password=self.password)
+                client = ArangoConnection(hosts=self.urls,
+                    username=self.login, password=self.password,
+                    down_time=self.breaker_timeout / 1000,
+                    http_client=PooledHTTPClient(
+                        pool_size=self.pool_size,
+                        connect_timeout=self.query_timeout))
+                self._collections = {}
             else:
                 # NOTE! Must be implemented!!
                 pass
             # Return pyArango Connection instance
             return client
-        except ServerConnectionError as exc:
+        except (ServerConnectionError, ConnectionAbortedError) as exc:
+            # python-arango raises `ConnectionAbortedError` once no host
+            # could be reached.
             logger.info('Exception in _connect(): {}'.format(exc))
             raise ConnectionError(str(exc)) from exc
         except ArangoClientError as exc:
             raise ConfigurationError from exc
+
+
+class StreamedCursor:
+    """Iterate over a cursor whose rows are fetched from the server in
+    batches, as they are consumed.
+
+    Fetching a batch goes through the circuit breaker of the connection,
+    and its failures are raised as backend errors, but it is never
+    retried: the server moves the cursor forward with each request, so
+    a retried fetch could skip a batch.
+
+    Args:
+        conn (:class:`~.LocalArangoDBConnection`): the connection the
+            query ran on.
+        cursor (:class:`arango.cursor.Cursor`): the cursor.
+    """
+
+    def __init__(self, conn, cursor):
+        self.conn = conn
+        self.cursor = cursor
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cursor = self.cursor
+        if not (cursor.empty() and cursor.has_more()):
+            return next(cursor)
+        # The next row is in a batch still on the server.
+        breaker = self.conn.breaker
+        self.conn._allow()
+        try:
+            row = next(cursor)
+        except RETRYABLE_ERRORS as exc:
+            breaker.record_failure()
+            raise ConnectionError from exc
+        except CursorStateError as exc:
+            breaker.record_success()
+            raise OperationError from exc
+        except BaseException:
+            # The database did answer, e.g. the cursor is exhausted.
+            breaker.record_success()
+            raise
+        else:
+            breaker.record_success()
+            return row
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
@@ -0,0 +1,38 @@
+
+"""Spend graph support for the ArangoDB backend.
+
+When the ``database.spend_graph`` setting is enabled, every input of a
+committed transaction is also stored as an edge of the ``spends`` edge
+collection, going from the transaction whose output is spent to the
+spending transaction. The provenance and the descendants of an output can
+then be computed by a single graph traversal instead of walking the chain
+one transaction at a time.
+"""
+
+SPENDS = 'spends'
+
+# Upper bound on the length of the chains followed by a traversal when no
+# depth is given. Every transaction is visited at most once, so it only
+# needs to be larger than the longest chain of transfers.
+MAX_DEPTH = 1000000
+
+# Number of transactions returned by a traversal when no limit is given:
+# AQL only accepts a number as LIMIT.
+MAX_RESULTS = 2 ** 53
+
+# Insert the edges of the transactions whose id is in `@ids`, or of every
+# transaction if `@ids` is null. There is a unique index on the spent
+# output, so inserting an edge again is a no-op.
+INSERT_SPENDS = (
+    'FOR spending IN transactions '
+    'FILTER @ids == null OR spending.id IN @ids '
+    'FOR link IN spending.inputs[*].fulfills '
+    'FILTER link != null '
+    'LET spent = FIRST(FOR tx IN transactions '
+        'FILTER tx.id == link.transaction_id LIMIT 1 RETURN tx._id) '
+    'FILTER spent != null '
+    'INSERT {_from: spent, _to: spending._id, '
+        'transaction_id: link.transaction_id, '
+        'output_index: link.output_index} '
+    'INTO spends OPTIONS {ignoreErrors: true}'
+)
@@ -0,0 +1,98 @@
+
+"""Prepared queries for the ArangoDB backend.
+
+A prepared query is built once, at import time, and only receives its
+arguments (bind variables, documents, ...) when it is run through
+:meth:`~multichaindb.backend.localarangodb.LocalArangoDBConnection.run`.
+The database and collection handles it runs against are resolved once per
+connection and then reused.
+"""
+
+
+class PreparedQuery:
+    """Interface of the queries accepted by ``LocalArangoDBConnection.run``.
+
+    Attributes:
+        wait_for_breaker (bool): if ``True`` the query waits, instead of
+            failing, while the circuit breaker of the connection is open.
+    """
+
+    wait_for_breaker = False
+
+    def run(self, conn, *args, **kwargs):
+        """Run the query.
+
+        Args:
+            conn (:class:`~.LocalArangoDBConnection`): the connection to
+                run the query with.
+        """
+        raise NotImplementedError
+
+
+class PreparedAQL(PreparedQuery):
+    """An AQL query executed with bind variables.
+
+    Args:
+        query (str): the AQL query.
+        cache (bool, optional): if ``True`` the result is looked up in (and
+            stored to) the server-side AQL query cache. Only enable it for
+            lookups whose result never changes once written.
+        stream (bool, optional): if ``True`` the server produces the result
+            lazily, ``batch_size`` rows at a time, as the cursor is
+            consumed. Use it for results that can grow large. Streamed
+            results are never cached.
+        **options: any other option accepted by ``AQL.execute``.
+
+    The cursor fetches the rows in batches of ``conn.batch_size``. Queries
+    that are not streamed are aborted by the server after
+    ``conn.query_timeout`` seconds.
+    """
+
+    def __init__(self, query, cache=None, stream=None, **options):
+        self.query = query
+        self.options = dict(options, cache=cache, stream=stream)
+
+    def run(self, conn, **bind_vars):
+        options = self.options
+        if not options['stream']:
+            # A streamed query stays open while its result is consumed, so
+            # it cannot be bound by the time it runs for.
+            options = dict(options, max_runtime=conn.query_timeout)
+        return conn.db.aql.execute(self.query, bind_vars=bind_vars,
+                                   batch_size=conn.batch_size, **options)
+
+
+class PreparedCollectionCall(PreparedQuery):
+    """A call to a method of a collection, e.g. ``insert_many``.
+
+    Args:
+        collection (str): the name of the collection.
+        method (str): the name of the method to call.
+    """
+
+    def __init__(self, collection, method):
+        self.collection = collection
+        self.method = method
+
+    def run(self, conn, *args, **kwargs):
+        return getattr(conn.collection(self.collection), self.method)(*args, **kwargs)
+
+
+class PreparedTransaction(PreparedQuery):
+    """A JavaScript transaction executed on the server.
+
+    Args:
+        action (str): the JavaScript function to execute.
+        collections (list): the collections read and written by ``action``.
+        wait_for_breaker (bool, optional): see :class:`PreparedQuery`.
+    """
+
+    def __init__(self, action, collections, wait_for_breaker=False):
+        self.action = action
+        self.collections = list(collections)
+        self.wait_for_breaker = wait_for_breaker
+
+    def run(self, conn, **params):
+        return conn.db.execute_transaction(self.action, params=params,
+                                           read=self.collections,
+                                           write=self.collections)
@@ -1,132 +1,628 @@
 
-
 """Query implementation for arangoDB"""
 
-from arango.exceptions import (
-    DocumentInsertError,
-    DocumentGetError
-)
+import json
+from itertools import chain
+
+from arango.exceptions import DocumentInsertError
 
 from multichaindb import backend
 from multichaindb.backend.exceptions import DuplicateKeyError, OperationError
 from multichaindb.backend.utils import module_dispatch_registrar
 from multichaindb.backend.localarangodb.connection import LocalArangoDBConnection
+from multichaindb.backend.localarangodb.graph import (
+    INSERT_SPENDS,
+    MAX_DEPTH,
+    MAX_RESULTS,
+    SPENDS
+)
+from multichaindb.backend.localarangodb.prepared import (
+    PreparedAQL,
+    PreparedCollectionCall,
+    PreparedTransaction
+)
+from multichaindb.backend.localarangodb.search import (
+    ANALYZER,
+    SEARCH_FIELD,
+    VIEWS,
+    with_search_text
+)
 from multichaindb.common.transaction import Transaction
 
 register_query = module_dispatch_registrar(backend.query)
 
 
+# NOTE: transactions and blocks are never modified once written, so lookups
+# by transaction id and by block height go through the AQL query cache.
+
+# NOTE: queries that may return many rows stream their result, and the
+# functions running them return the cursor: rows are fetched from the
+# server `conn.batch_size` at a time, as the caller consumes them.
+
+# NOTE: when `conn.key_by_id` is set, transactions, assets and metadata are
+# stored with their id as `_key`, and lookups by id go through the primary
+# index (`DOCUMENT()` and `get_many`) instead of the `id` hash index.
+
+SYSTEM_ATTRIBUTES = ('_id', '_key', '_rev')
+
+# NOTE: transactions are stored with the height of the block they were
+# committed in, and their position in it, to sort the history of an asset.
+# Like the system attributes, they are never returned.
+BLOCK_POSITION = ('block_height', 'block_index')
+
+
+def _with_keys(conn, documents):
+    if not conn.key_by_id:
+        return documents
+    return [dict(document, _key=document['id']) for document in documents]
+
+
+def _assets(conn, assets):
+    return with_search_text(_with_keys(conn, assets), 'data')
+
+
+def _metadata(conn, metadata):
+    return with_search_text(_with_keys(conn, metadata), 'metadata')
+
+
+def _unset(document, *attributes):
+    attributes = SYSTEM_ATTRIBUTES + attributes
+    return {key: value for key, value in document.items()
+            if key not in attributes}
+
+
+# NOTE: transactions, assets and metadata are written without returning
+# anything. Storing a document already stored (e.g. when a block is applied
+# again after a crash) is not an error: depending on `conn.overwrite_mode`
+# the stored document is kept ("ignore") or replaced ("replace"). Documents
+# keyed by id conflict on their `_key`, the other ones on their `id`.
+WRITE_QUERIES = {
+    (True, 'ignore'):
+        'FOR doc IN @docs INSERT doc INTO @@collection '
+        'OPTIONS {overwriteMode: "ignore"}',
+    (True, 'replace'):
+        'FOR doc IN @docs INSERT doc INTO @@collection '
+        'OPTIONS {overwriteMode: "replace"}',
+    (False, 'ignore'):
+        'FOR doc IN @docs INSERT doc INTO @@collection '
+        'OPTIONS {ignoreErrors: true}',
+    (False, 'replace'):
+        'FOR doc IN @docs UPSERT {id: doc.id} '
+        'INSERT doc REPLACE doc IN @@collection',
+}
+
+WRITE = {mode: PreparedAQL(query) for mode, query in WRITE_QUERIES.items()}
+
+
+def _write_mode(conn):
+    return bool(conn.key_by_id), conn.overwrite_mode
+
+
+def _write(conn, collection, documents):
+    query = WRITE[_write_mode(conn)]
+    size = conn.write_batch_size
+    for start in range(0, len(documents), size):
+        conn.run(query, docs=documents[start:start + size],
+                 **{'@collection': collection})
+
+
 @register_query(LocalArangoDBConnection)
 def store_transactions(conn, signed_transactions):
-    return conn.run(conn.collection('transactions')
-        .insert_many(signed_transactions))
+    _write(conn, 'transactions', _with_keys(conn, signed_transactions))
+
+
+GET_TRANSACTION = PreparedAQL(
+    'FOR tx IN transactions ' \
+    'FILTER tx.id == @id LIMIT 1 RETURN UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index")',
+    cache=True)
+
+
+GET_TRANSACTION_BY_KEY = PreparedAQL(
+    'LET tx = DOCUMENT("transactions", @id) FILTER tx != null ' \
+    'RETURN UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index")',
+    cache=True)
 
 
 @register_query(LocalArangoDBConnection)
 def get_transaction(conn, transaction_id):
-    return next(conn.run(conn.aql.execute(
-        'FOR tx IN transactions ' \
-        'FILTER tx.id == @id RETURN UNSET(tx, "_id", "_key", "_rev")',
-            bind_vars={'id': transaction_id})), None)
+    query = GET_TRANSACTION_BY_KEY if conn.key_by_id else GET_TRANSACTION
+    return next(conn.run(query, id=transaction_id), None)
+
+
+GET_TRANSACTIONS = PreparedAQL(
+    'FOR tx IN transactions ' \
+    'FILTER tx.id IN @ids RETURN UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index")',
+    stream=True)
+
+
+GET_MANY_TRANSACTIONS = PreparedCollectionCall('transactions', 'get_many')
 
 
 @register_query(LocalArangoDBConnection)
 def get_transactions(conn, transaction_ids):
-    return list(conn.run(conn.aql.execute(
-        "FOR tx IN transactions " \
-        'FILTER tx.transaction_id IN @ids RETURN UNSET(tx, "_id", "_key", "_rev")', 
-            bind_vars={'ids': transaction_ids})))
+    if conn.key_by_id:
+        return (_unset(tx, *BLOCK_POSITION) for tx in
+                conn.run(GET_MANY_TRANSACTIONS, list(transaction_ids)))
+    return conn.run(GET_TRANSACTIONS, ids=transaction_ids)
+
+
+GET_TRANSACTION_IDS = PreparedAQL(
+    'FOR tx IN transactions RETURN tx.id', stream=True)
+
+
+@register_query(LocalArangoDBConnection)
+def get_transaction_ids(conn):
+    return conn.run(GET_TRANSACTION_IDS)
+
+
+# Join a transaction document with its asset (CREATE transactions only,
+# TRANSFER transactions keep the asset id inline) and its metadata, so that
+# the caller gets the same dict that was originally submitted.
+HYDRATE_TRANSACTION = \
+    'LET asset = FIRST(FOR a IN assets FILTER a.id == tx.id ' \
+        'LIMIT 1 RETURN UNSET(a, "_id", "_key", "_rev", "id", ' \
+            '"search_text")) ' \
+    'LET meta = FIRST(FOR m IN metadata FILTER m.id == tx.id ' \
+        'LIMIT 1 RETURN m.metadata) ' \
+    'RETURN MERGE(UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index"), ' \
+        '{metadata: meta}, asset == null ? {} : {asset: asset})'
+
+HYDRATE_TRANSACTION_BY_KEY = \
+    'LET asset = DOCUMENT("assets", tx.id) ' \
+    'LET meta = DOCUMENT("metadata", tx.id).metadata ' \
+    'RETURN MERGE(UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index"), {metadata: meta}, ' \
+        'asset == null ? {} : {asset: UNSET(asset, "_id", "_key", "_rev", ' \
+            '"id", "search_text")})'
+
+GET_HYDRATED_TRANSACTION = PreparedAQL(
+    'FOR tx IN transactions FILTER tx.id == @id LIMIT 1 ' +
+    HYDRATE_TRANSACTION,
+    cache=True)
+
+
+GET_HYDRATED_TRANSACTION_BY_KEY = PreparedAQL(
+    'LET tx = DOCUMENT("transactions", @id) FILTER tx != null ' +
+    HYDRATE_TRANSACTION_BY_KEY,
+    cache=True)
+
+
+@register_query(LocalArangoDBConnection)
+def get_hydrated_transaction(conn, transaction_id):
+    query = GET_HYDRATED_TRANSACTION_BY_KEY if conn.key_by_id \
+        else GET_HYDRATED_TRANSACTION
+    return next(conn.run(query, id=transaction_id), None)
+
+
+# Iterating over the ids keeps the order of `transaction_ids` and lets
+# every lookup go through the `transaction_id` index.
+GET_HYDRATED_TRANSACTIONS = PreparedAQL(
+    'FOR id IN @ids ' \
+    'LET tx = FIRST(FOR t IN transactions FILTER t.id == id ' \
+        'LIMIT 1 RETURN t) ' \
+    'FILTER tx != null ' +
+    HYDRATE_TRANSACTION,
+    cache=True)
+
+
+GET_HYDRATED_TRANSACTIONS_BY_KEY = PreparedAQL(
+    'FOR id IN @ids ' \
+    'LET tx = DOCUMENT("transactions", id) FILTER tx != null ' +
+    HYDRATE_TRANSACTION_BY_KEY,
+    cache=True)
+
+
+@register_query(LocalArangoDBConnection)
+def get_hydrated_transactions(conn, transaction_ids):
+    query = GET_HYDRATED_TRANSACTIONS_BY_KEY if conn.key_by_id \
+        else GET_HYDRATED_TRANSACTIONS
+    return list(conn.run(query, ids=transaction_ids))
 
 
 @register_query(LocalArangoDBConnection)
 def store_metadatas(conn, metadata):
-    return conn.run(conn.collection('metadata')
-        .insert_many(metadata))
+    _write(conn, 'metadata', _metadata(conn, metadata))
+
+
+GET_METADATA = PreparedAQL(
+    'FOR meta IN metadata ' \
+    'FILTER meta.id IN @ids ' \
+    'RETURN UNSET(meta, "_id", "_key", "_rev", "search_text")',
+    stream=True)
+
+
+GET_MANY_METADATA = PreparedCollectionCall('metadata', 'get_many')
 
 
 @register_query(LocalArangoDBConnection)
 def get_metadata(conn, transaction_ids):
-    return list(conn.run(conn.aql.execute(
-        "FOR meta IN metadata " \
-        'FILTER meta.id IN @ids RETURN UNSET(meta, "_id", "_key", "_rev")',
-            bind_vars={'ids': transaction_ids})))
+    if conn.key_by_id:
+        return (_unset(meta, SEARCH_FIELD) for meta in
+                conn.run(GET_MANY_METADATA, list(transaction_ids)))
+    return conn.run(GET_METADATA, ids=transaction_ids)
+
 
 @register_query(LocalArangoDBConnection)
 def store_asset(conn, asset):
-    return conn.run(conn.collection('assets')
-        .insert(asset))
+    _write(conn, 'assets', _assets(conn, [asset]))
 
 
 @register_query(LocalArangoDBConnection)
 def store_assets(conn, assets):
-    return conn.run(conn.collection('assets')
-        .insert_many(assets))
+    _write(conn, 'assets', _assets(conn, assets))
+
+
+GET_ASSET = PreparedAQL(
+    'FOR asset IN assets ' \
+    'FILTER asset.id == @id ' \
+    'RETURN UNSET(asset, "_id", "_key", "_rev", "id", "search_text")')
+
+
+GET_ASSET_BY_KEY = PreparedAQL(
+    'LET asset = DOCUMENT("assets", @id) FILTER asset != null ' \
+    'RETURN UNSET(asset, "_id", "_key", "_rev", "id", "search_text")')
 
 
 @register_query(LocalArangoDBConnection)
 def get_asset(conn, asset_id):
-    return next(conn.run(conn.aql.execute(
-        'FOR asset IN assets ' \
-        'FILTER asset.id == @id RETURN UNSET(asset, "_id", "_key", "_rev", "id")',
-            bind_vars={'id': asset_id})), None)
+    query = GET_ASSET_BY_KEY if conn.key_by_id else GET_ASSET
+    return next(conn.run(query, id=asset_id), None)
+
+
+GET_ASSETS = PreparedAQL(
+    'FOR asset in assets ' \
+    'FILTER asset.id IN @ids ' \
+    'RETURN UNSET(asset, "_id", "_key", "_rev", "id", "search_text")',
+    stream=True)
+
+
+GET_MANY_ASSETS = PreparedCollectionCall('assets', 'get_many')
 
 
 @register_query(LocalArangoDBConnection)
 def get_assets(conn, asset_ids):
-    return conn.run(conn.aql.execute(
-        "FOR asset in assets " \
-        'FILTER asset.id IN @ids RETURN UNSET(asset, "_id", "_key", "_rev", "id")',
-            bind_vars={'ids': asset_ids}))
+    if conn.key_by_id:
+        return (_unset(asset, 'id', SEARCH_FIELD) for asset in
+                conn.run(GET_MANY_ASSETS, list(asset_ids)))
+    return conn.run(GET_ASSETS, ids=asset_ids)
+
+
+GET_SPENT = PreparedAQL(
+    'FOR tx IN transactions ' \
+    'FILTER @fulfills IN tx.inputs[*].fulfills ' \
+    'RETURN UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index")',
+    stream=True)
 
 
 @register_query(LocalArangoDBConnection)
 def get_spent(conn, transaction_id, output):
-    pass
+    return conn.run(GET_SPENT, fulfills={'transaction_id': transaction_id,
+                                         'output_index': output})
+
+
+GET_SPENT_OUTPUTS = PreparedAQL(
+    'FOR link IN @links ' \
+    'FOR tx IN transactions FILTER link IN tx.inputs[*].fulfills ' \
+    'RETURN {fulfills: link, spent_by: tx.id}',
+    stream=True)
+
+
+@register_query(LocalArangoDBConnection)
+def get_spent_outputs(conn, outputs):
+    links = [{'transaction_id': output['transaction_id'],
+              'output_index': output['output_index']} for output in outputs]
+    return conn.run(GET_SPENT_OUTPUTS, links=links)
+
+
+GET_LATEST_BLOCK = PreparedAQL(
+    'FOR blk IN blocks ' \
+    'SORT blk.height DESC LIMIT 1 ' \
+    'RETURN UNSET(blk, "_id", "_key", "_rev")')
 
 
 @register_query(LocalArangoDBConnection)
 def get_latest_block(conn):
-    return next(conn.run(conn.aql.execute(
-        "FOR blk IN blocks " \
-        'SORT blk.height DESC LIMIT 1 ' \
-        'RETURN UNSET(blk, "_id", "_key", "_rev")')), None)
+    return next(conn.run(GET_LATEST_BLOCK), None)
+
+
+STORE_BLOCK = PreparedAQL(
+    'INSERT @blk INTO blocks OPTIONS {ignoreErrors: true}')
 
 
 @register_query(LocalArangoDBConnection)
 def store_block(conn, block):
-    return conn.run(conn.aql.execute(
-        "INSERT @blk INTO blocks OPTIONS {ignoreErrors: true}", 
-            bind_vars={'blk': block}))
+    return conn.run(STORE_BLOCK, blk=block)
+
+
+# Server-side action used by `commit_block`. It runs as a single
+# JavaScript transaction, so either the whole block is written or nothing is.
+COMMIT_BLOCK_ACTION = '''
+function (params) {
+    const arangodb = require('@arangodb');
+    const db = arangodb.db;
+
+    // Same as `_write`.
+    function write(collection, documents) {
+        if (documents.length > 0) {
+            db._query(params.write_query,
+                      {'@collection': collection, docs: documents});
+        }
+    }
+
+    write('metadata', params.metadata);
+    write('assets', params.assets);
+    write('transactions', params.transactions);
+    if (params.spend_graph) {
+        db._query(%(insert_spends)s, {
+            ids: params.transactions.map(function (tx) { return tx.id; })
+        });
+    }
+    // Outputs created and spent in the same block are inserted and then
+    // removed right away, so new outputs must be stored first. Like the
+    // writes above, this is idempotent: a block committed again after a
+    // crash, before Tendermint got the answer, ends in the same state.
+    db._query(%(store_unspent_outputs)s,
+              {utxos: params.unspent_outputs});
+    db._query(
+        'FOR link IN @links FOR utxo IN utxos ' +
+        'FILTER utxo.transaction_id == link.transaction_id ' +
+        'AND utxo.output_index == link.output_index ' +
+        'REMOVE utxo IN utxos', {links: params.spent_outputs});
+    // NOTE: storing the block must be the last operation, see `App.commit`.
+    db._query('INSERT @block INTO blocks OPTIONS {ignoreErrors: true}',
+              {block: params.block});
+}
+''' % {'insert_spends': json.dumps(INSERT_SPENDS),
+       'store_unspent_outputs': json.dumps(
+           'FOR utxo IN @utxos INSERT utxo INTO utxos '
+           'OPTIONS {ignoreErrors: true}')}
+
+# A block commit cannot be given up on: it waits for the database even
+# while the circuit breaker is open.
+COMMIT_BLOCK = PreparedTransaction(
+    COMMIT_BLOCK_ACTION,
+    ['metadata', 'assets', 'transactions', 'utxos', 'blocks'],
+    wait_for_breaker=True)
+
+COMMIT_BLOCK_WITH_SPENDS = PreparedTransaction(
+    COMMIT_BLOCK_ACTION,
+    ['metadata', 'assets', 'transactions', 'utxos', 'blocks', SPENDS],
+    wait_for_breaker=True)
+
+
+@register_query(LocalArangoDBConnection)
+def commit_block(conn, block, transactions, assets, metadata,
+                 unspent_outputs, spent_outputs):
+    transactions = [dict(transaction, block_height=block['height'],
+                         block_index=index)
+                    for index, transaction in enumerate(transactions)]
+    query = COMMIT_BLOCK_WITH_SPENDS if conn.spend_graph else COMMIT_BLOCK
+    return conn.run(query, block=block, spend_graph=conn.spend_graph,
+                    write_query=WRITE_QUERIES[_write_mode(conn)],
+                    transactions=_with_keys(conn, transactions),
+                    assets=_assets(conn, assets),
+                    metadata=_metadata(conn, metadata),
+                    unspent_outputs=unspent_outputs,
+                    spent_outputs=spent_outputs)
+
+
+# The transaction creating an asset is stored without its asset, and its
+# id is the asset id. All the other transactions of the asset are ordered
+# by their position in the chain, see `BLOCK_POSITION`.
+GET_ASSET_CREATION = PreparedAQL(
+    'FOR tx IN transactions FILTER tx.id == @asset_id ' \
+    'FILTER @operation == null OR tx.operation == @operation ' \
+    'RETURN tx.id')
+
+GET_TRANSFERS = \
+    'FOR tx IN transactions FILTER tx.asset.id == @asset_id ' \
+    'FILTER @operation == null OR tx.operation == @operation '
+
+# Transactions at the same position, i.e. stored outside of a block, are
+# ordered by id.
+GET_TRANSFERS_AFTER = GET_TRANSFERS + \
+    'FILTER @after == null OR tx.block_height > @after.height ' \
+        'OR (tx.block_height == @after.height AND tx.block_index > @after.index) ' \
+        'OR (tx.block_height == @after.height AND tx.block_index == @after.index ' \
+            'AND tx.id > @after.id) ' \
+    'SORT tx.block_height, tx.block_index, tx.id '
+
+GET_ALL_TRANSFERS = PreparedAQL(
+    GET_TRANSFERS_AFTER + 'RETURN tx.id', stream=True)
+
+GET_PAGE_OF_TRANSFERS = PreparedAQL(
+    GET_TRANSFERS_AFTER + 'LIMIT @limit RETURN tx.id')
+
+GET_LAST_TRANSFER = PreparedAQL(
+    GET_TRANSFERS +
+    'SORT tx.block_height DESC, tx.block_index DESC, tx.id DESC '
+    'LIMIT 1 RETURN tx.id')
+
+GET_BLOCK_POSITION = PreparedAQL(
+    'FOR tx IN transactions FILTER tx.id == @id LIMIT 1 ' \
+    'RETURN {height: tx.block_height, index: tx.block_index, id: tx.id}')
+
+
+@register_query(LocalArangoDBConnection)
+def get_txids_filtered(conn, asset_id, operation=None, last_tx=False,
+                       after=None, limit=None):
+    creation = list(conn.run(GET_ASSET_CREATION, asset_id=asset_id,
+                             operation=operation))
+    if last_tx:
+        last = list(conn.run(GET_LAST_TRANSFER, asset_id=asset_id,
+                             operation=operation))
+        return iter(last or creation)
+
+    if after is None:
+        position = None
+    elif after == asset_id:
+        # Everything but the creation, i.e. the transfers from the start
+        position, creation = None, []
+    else:
+        position = next(conn.run(GET_BLOCK_POSITION, id=after), None)
+        if position is None:
+            return iter([])
+        creation = []
+
+    if limit:
+        limit -= len(creation)
+        if limit <= 0:
+            return iter(creation)
+        transfers = conn.run(GET_PAGE_OF_TRANSFERS, asset_id=asset_id,
+                             operation=operation, after=position, limit=limit)
+    else:
+        transfers = conn.run(GET_ALL_TRANSFERS, asset_id=asset_id,
+                             operation=operation, after=position)
+    return chain(creation, transfers)
+
+
+# Breadth first, so that the closest transactions come first, and visiting
+# every transaction once even when several paths lead to it.
+TRAVERSE_SPENDS = \
+    'FOR tx IN 0..@depth {{}} start {} ' \
+    'OPTIONS {{{{order: "bfs", uniqueVertices: "global"}}}} ' \
+    'LIMIT @limit '.format(SPENDS)
+
+GET_PROVENANCE = PreparedAQL(
+    'FOR start IN transactions FILTER start.id == @transaction_id ' \
+    'FILTER @output_index < LENGTH(start.outputs) LIMIT 1 ' +
+    TRAVERSE_SPENDS.format('INBOUND') + HYDRATE_TRANSACTION,
+    stream=True)
+
+GET_PROVENANCE_BY_KEY = PreparedAQL(
+    'LET start = DOCUMENT("transactions", @transaction_id) ' \
+    'FILTER start != null AND @output_index < LENGTH(start.outputs) ' +
+    TRAVERSE_SPENDS.format('INBOUND') + HYDRATE_TRANSACTION_BY_KEY,
+    stream=True)
+
+
+def _check_spend_graph(conn):
+    if not conn.spend_graph:
+        raise OperationError('The spend graph is not enabled, see the '
+                             '`database.spend_graph` setting.')
+
+
+def _traversal_bounds(depth, limit):
+    return {'depth': MAX_DEPTH if depth is None else depth,
+            'limit': MAX_RESULTS if limit is None else limit}
 
 
 @register_query(LocalArangoDBConnection)
-def get_txids_filtered(conn, asset_id, operation=None, last_tx=None):
-    pass
+def get_provenance(conn, transaction_id, output_index, depth=None,
+                   limit=None):
+    _check_spend_graph(conn)
+    query = GET_PROVENANCE_BY_KEY if conn.key_by_id else GET_PROVENANCE
+    return conn.run(query, transaction_id=transaction_id,
+                    output_index=output_index,
+                    **_traversal_bounds(depth, limit))
+
+
+# There is at most one edge per output, as an output can only be spent once.
+GET_DESCENDANTS = \
+    'FOR spend IN spends FILTER spend.transaction_id == @transaction_id ' \
+    'AND spend.output_index == @output_index ' \
+    'LET start = spend._to ' + TRAVERSE_SPENDS.format('OUTBOUND')
+
+GET_DESCENDANTS_BY_ID = PreparedAQL(
+    GET_DESCENDANTS + HYDRATE_TRANSACTION, stream=True)
+
+GET_DESCENDANTS_BY_KEY = PreparedAQL(
+    GET_DESCENDANTS + HYDRATE_TRANSACTION_BY_KEY, stream=True)
+
+
+@register_query(LocalArangoDBConnection)
+def get_descendants(conn, transaction_id, output_index, depth=None,
+                    limit=None):
+    _check_spend_graph(conn)
+    query = GET_DESCENDANTS_BY_KEY if conn.key_by_id \
+        else GET_DESCENDANTS_BY_ID
+    return conn.run(query, transaction_id=transaction_id,
+                    output_index=output_index,
+                    **_traversal_bounds(depth, limit))
+
+
+# Terms are OR-ed, and the best matches (BM25) come first.
+TEXT_SEARCH = \
+    'FOR doc IN @@view ' \
+    'SEARCH ANALYZER(doc.search_text IN TOKENS(@search, @analyzer), @analyzer) ' \
+    'LET score = BM25(doc) SORT score DESC '
+
+TEXT_SEARCH_RESULT = \
+    'RETURN MERGE(UNSET(doc, "_id", "_key", "_rev", "search_text"), ' \
+        '@text_score ? {score} : {})'
+
+TEXT_SEARCH_ALL = PreparedAQL(TEXT_SEARCH + TEXT_SEARCH_RESULT, stream=True)
+
+TEXT_SEARCH_LIMIT = PreparedAQL(
+    TEXT_SEARCH + 'LIMIT @limit ' + TEXT_SEARCH_RESULT)
 
 
 @register_query(LocalArangoDBConnection)
 def text_search(conn, search, *, language='english', case_sensitive=False,
                 diacritic_sensitive=False, text_score=False, limit=0, table='assets'):
-    pass
+    # NOTE: the search always goes through the `multichaindb_text` analyzer
+    # (English stemming, case and accent insensitive), `language`,
+    # `case_sensitive` and `diacritic_sensitive` are not supported.
+    try:
+        view, _ = VIEWS[table]
+    except KeyError:
+        raise OperationError('Text search is not supported on `{}`'.format(table))
+    bind_vars = {'@view': view, 'search': search, 'analyzer': ANALYZER,
+                 'text_score': text_score}
+    if limit:
+        return conn.run(TEXT_SEARCH_LIMIT, limit=limit, **bind_vars)
+    return conn.run(TEXT_SEARCH_ALL, **bind_vars)
 
 
-def _remove_text_score(asset):
-    pass
+# NOTE: the filter must match the `outputs_public_keys` array index.
+GET_OWNED_IDS = PreparedAQL(
+    'FOR tx IN transactions ' \
+    'FILTER @owner IN tx.outputs[*].public_keys[*] ' \
+    'RETURN UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index")',
+    stream=True)
 
 
 @register_query(LocalArangoDBConnection)
 def get_owned_ids(conn, owner):
-    pass
+    return conn.run(GET_OWNED_IDS, owner=owner)
+
+
+GET_OWNED_OUTPUTS = PreparedAQL(
+    'FOR tx IN transactions ' \
+    'FILTER @owner IN tx.outputs[*].public_keys[*] ' \
+    'FOR output_index IN 0..LENGTH(tx.outputs) - 1 ' \
+    'FILTER @owner IN tx.outputs[output_index].public_keys ' \
+    'RETURN {transaction_id: tx.id, output_index}',
+    stream=True)
+
+
+@register_query(LocalArangoDBConnection)
+def get_owned_outputs(conn, owner):
+    return conn.run(GET_OWNED_OUTPUTS, owner=owner)
+
+
+GET_SPENDING_TRANSACTIONS = PreparedAQL(
+    'FOR link IN @links ' \
+    'FOR tx IN transactions FILTER link IN tx.inputs[*].fulfills ' \
+    'RETURN DISTINCT UNSET(tx, "_id", "_key", "_rev", "block_height", "block_index")',
+    stream=True)
 
 
 @register_query(LocalArangoDBConnection)
 def get_spending_transactions(conn, inputs):
-    pass
+    links = [{'transaction_id': input_['transaction_id'],
+              'output_index': input_['output_index']} for input_ in inputs]
+    return conn.run(GET_SPENDING_TRANSACTIONS, links=links)
+
+
+GET_BLOCK = PreparedAQL(
+    'FOR blk IN blocks FILTER blk.height == @height LIMIT 1 ' \
+    'RETURN UNSET(blk, "_id", "_key", "_rev")',
+    cache=True)
 
 
 @register_query(LocalArangoDBConnection)
 def get_block(conn, block_id):
-    pass
+    return next(conn.run(GET_BLOCK, height=block_id), None)
 
 
 @register_query(LocalArangoDBConnection)
@@ -139,45 +635,94 @@ def delete_transactions(conn, txn_ids):
     pass
 
 
+# Storing an output twice (e.g. when replaying a block) leaves the UTXO
+# set unchanged.
+STORE_UNSPENT_OUTPUTS = PreparedAQL(
+    'FOR utxo IN @utxos INSERT utxo INTO utxos OPTIONS {ignoreErrors: true}')
+
+
 @register_query(LocalArangoDBConnection)
 def store_unspent_outputs(conn, *unspent_outputs):
-    pass
+    return conn.run(STORE_UNSPENT_OUTPUTS, utxos=unspent_outputs)
+
+
+DELETE_UNSPENT_OUTPUTS = PreparedAQL(
+    'FOR link IN @links FOR utxo IN utxos ' \
+    'FILTER utxo.transaction_id == link.transaction_id ' \
+    'AND utxo.output_index == link.output_index ' \
+    'REMOVE utxo IN utxos')
 
 
 @register_query(LocalArangoDBConnection)
 def delete_unspent_outputs(conn, *unspent_outputs):
-    pass
+    links = [{'transaction_id': utxo['transaction_id'],
+              'output_index': utxo['output_index']} for utxo in unspent_outputs]
+    return conn.run(DELETE_UNSPENT_OUTPUTS, links=links)
+
+
+GET_UNSPENT_OUTPUTS = PreparedAQL(
+    'FOR utxo IN utxos RETURN UNSET(utxo, "_id", "_key", "_rev")',
+    stream=True)
+
+GET_MATCHING_UNSPENT_OUTPUTS = PreparedAQL(
+    'FOR utxo IN utxos FILTER MATCHES(utxo, @query) ' \
+    'RETURN UNSET(utxo, "_id", "_key", "_rev")',
+    stream=True)
 
 
 @register_query(LocalArangoDBConnection)
 def get_unspent_outputs(conn, *, query=None):
-    pass
+    if query is None:
+        return conn.run(GET_UNSPENT_OUTPUTS)
+    return conn.run(GET_MATCHING_UNSPENT_OUTPUTS, query=query)
+
+
+GET_UTXOS = PreparedAQL(
+    'FOR link IN @links FOR utxo IN utxos ' \
+    'FILTER utxo.transaction_id == link.transaction_id ' \
+    'AND utxo.output_index == link.output_index ' \
+    'RETURN {transaction_id: utxo.transaction_id, ' \
+        'output_index: utxo.output_index}',
+    stream=True)
+
+
+@register_query(LocalArangoDBConnection)
+def get_utxos(conn, outputs):
+    links = [{'transaction_id': output['transaction_id'],
+              'output_index': output['output_index']} for output in outputs]
+    return conn.run(GET_UTXOS, links=links)
+
+
+STORE_PRE_COMMIT_STATE = PreparedAQL(
+    'UPSERT {height: @height} ' \
+    'INSERT @state UPDATE @state IN pre_commit')
 
 
 @register_query(LocalArangoDBConnection)
 def store_pre_commit_state(conn, state):
-    return conn.run(conn.aql.execute(
-        'UPSERT {height: @height} ' \
-        'INSERT @state UPDATE @state IN pre_commit',
-            bind_vars={'height': state['height'], 'state': state}))
+    return conn.run(STORE_PRE_COMMIT_STATE, height=state['height'], state=state)
+
+
+GET_PRE_COMMIT_STATE = PreparedAQL(
+    'FOR state IN pre_commit ' \
+    'SORT state.height DESC LIMIT 1 ' \
+    'RETURN UNSET(state, "_id", "_key", "_rev")')
 
 
 @register_query(LocalArangoDBConnection)
 def get_pre_commit_state(conn):
-    try:
-        next(conn.run(conn.collection('pre_commit')
-            .all(limit=1)), None)   
-    except DocumentGetError:
-        return None
+    return next(conn.run(GET_PRE_COMMIT_STATE), None)
+
+
+STORE_VALIDATOR_SET = PreparedAQL(
+    'UPSERT {height: @height} ' \
+    'INSERT @update UPDATE @update IN validators')
 
 
 @register_query(LocalArangoDBConnection)
 def store_validator_set(conn, validators_update):
-    return conn.run(conn.aql.execute(
-        "UPSERT {height: @height} " \
-        "INSERT @update UPDATE @update IN validators",
-            bind_vars={'height': validators_update['height'],
-            'update': validators_update}))
+    return conn.run(STORE_VALIDATOR_SET, height=validators_update['height'],
+                    update=validators_update)
 
 
 @register_query(LocalArangoDBConnection)
@@ -195,10 +740,12 @@ def store_elections(conn, elections):
     pass
 
 
+DELETE_ELECTIONS = PreparedCollectionCall('elections', 'delete_match')
+
+
 @register_query(LocalArangoDBConnection)
 def delete_elections(conn, height):
-    return conn.run(conn.collection('elections')
-        .delete_match({'height': height}))
+    return conn.run(DELETE_ELECTIONS, {'height': height})
 
 
 @register_query(LocalArangoDBConnection)
@@ -206,12 +753,15 @@ def get_validator_set(conn, height=None):
     pass
 
 
+GET_ELECTION = PreparedAQL(
+    'FOR election IN elections ' \
+    'SORT election.height DESC LIMIT 1 ' \
+    'RETURN UNSET(election, "_id", "_key", "_rev")')
+
+
 @register_query(LocalArangoDBConnection)
 def get_election(conn, election_id):
-    return next(conn.run(
-        conn.aql.execute('FOR election IN elections ' \
-            'SORT election.height DESC LIMIT 1 ' \
-            'RETURN UNSET(election, "_id", "_key", "_rev")')), None)
+    return next(conn.run(GET_ELECTION), None)
 
 
 @register_query(LocalArangoDBConnection)
@@ -219,24 +769,32 @@ def get_asset_tokens_for_public_key(conn, asset_id, public_key):
     pass
 
 
+STORE_ABCI_CHAIN = PreparedAQL(
+    'UPSERT { height: @height } ' \
+    'INSERT @blk UPDATE @blk IN abci_chains')
+
+
 @register_query(LocalArangoDBConnection)
 def store_abci_chain(conn, height, chain_id, is_synced=True):
-    return conn.run(conn.aql.execute(
-        'UPSERT { height: @height }' \
-        "INSERT @blk UPDATE @blk IN abci_chains", 
-            bind_vars={'height': height, 'blk': {'height': height, 'chain_id': chain_id, 
-                'is_synced': is_synced}}))
+    return conn.run(STORE_ABCI_CHAIN, height=height,
+                    blk={'height': height, 'chain_id': chain_id,
+                         'is_synced': is_synced})
+
+
+DELETE_ABCI_CHAIN = PreparedCollectionCall('abci_chains', 'delete_match')
 
 
 @register_query(LocalArangoDBConnection)
 def delete_abci_chain(conn, height):
-    return conn.run(conn.collection('abci_chains')
-        .delete_match({'height': height}))
+    return conn.run(DELETE_ABCI_CHAIN, {'height': height})
+
+
+GET_LATEST_ABCI_CHAIN = PreparedAQL(
+    'FOR chain IN abci_chains ' \
+    'SORT chain.height DESC LIMIT 1 ' \
+    'RETURN UNSET(chain, "_id", "_key", "_rev")')
 
 
 @register_query(LocalArangoDBConnection)
 def get_latest_abci_chain(conn):
-    return next(conn.run(
-        conn.aql.execute("FOR chain IN abci_chains " \
-            "SORT chain.height DESC LIMIT 1 "
-            'RETURN UNSET(chain, "_id", "_key", "_rev")')), None)
\ No newline at end of file
+    return next(conn.run(GET_LATEST_ABCI_CHAIN), None)
@@ -1,12 +1,27 @@
 
 import logging
 
+from itertools import islice
+
 from arango.exceptions import (
-    CollectionCreateError
+    AQLCacheConfigureError,
+    AQLCachePropertiesError,
+    CollectionCreateError,
+    ViewCreateError
 )
 
 from multichaindb import backend
+from multichaindb.backend.exceptions import OperationError
 from multichaindb.backend.localarangodb.connection import LocalArangoDBConnection
+from multichaindb.backend.localarangodb.graph import INSERT_SPENDS, SPENDS
+from multichaindb.backend.localarangodb.search import (
+    ANALYZER,
+    ANALYZER_FEATURES,
+    ANALYZER_PROPERTIES,
+    SEARCH_FIELD,
+    VIEWS,
+    search_text
+)
 from multichaindb.backend.utils import module_dispatch_registrar
 
 logger = logging.getLogger(__name__)
@@ -15,10 +30,17 @@ register_schema = module_dispatch_registrar(backend.schema)
 INDEXES = {
     'transactions': [
         (['id'], dict(unique=True, name='transaction_id')),
-        (['asset.id'], dict(name='asset_id')),
-        (['outputs.public_keys'], dict(name='outputs')),
-        (['inputs.fulfills.transaction_id', 
-            'inputs.fulfills.output_index'], dict(name='inputs'))
+        # History of an asset: its transfers in the order they were
+        # committed, see `get_txids_filtered`.
+        (['asset.id', 'block_height', 'block_index', 'id'],
+         dict(name='asset_history', type='persistent')),
+        # Array index over the public keys of every output, used to find
+        # the outputs owned by a public key.
+        (['outputs[*].public_keys[*]'], dict(name='outputs_public_keys',
+                                             type='persistent')),
+        # Array index over the outputs spent by a transaction, used to
+        # answer "which transaction spends (txid, output)" lookups.
+        (['inputs[*].fulfills'], dict(name='fulfills', type='persistent'))
     ],
     'assets': [
         (['id'], dict(name='asset_id', unique=True))
@@ -44,9 +66,49 @@ INDEXES = {
     'abci_chains': [
         (['height'], dict(name='height', unique=True)),
         (['chain_id'], dict(name='chain_id', unique=True))
+    ],
+    # Edges are also indexed on `_from` and `_to` by ArangoDB.
+    SPENDS: [
+        (['transaction_id', 'output_index'], dict(name='spent_output',
+                                                  unique=True))
     ]
 }
 
+# Collections whose documents can be keyed by their `id`, see the
+# `database.key_by_id` setting.
+KEYED_TABLES = ('transactions', 'assets', 'metadata')
+
+# How the large collections are spread over the servers of a cluster. They
+# are all sharded by transaction id, and the UTXOs and spend edges are
+# distributed like the transactions, so all the documents of a transaction
+# live on the same server and a lookup by transaction id hits one shard.
+# The other collections are small and use a single shard.
+SHARDING = {
+    'transactions': dict(shard_fields=['id']),
+    'assets': dict(shard_fields=['id']),
+    'metadata': dict(shard_fields=['id']),
+    'utxos': dict(shard_fields=['transaction_id'], shard_like='transactions'),
+    SPENDS: dict(shard_fields=['transaction_id'], shard_like='transactions'),
+}
+
+
+def is_cluster(conn, dbname):
+    return conn.conn[dbname].role() == 'COORDINATOR'
+
+
+def sharding(conn, table_name):
+    """Return the cluster options to create ``table_name`` with."""
+    options = dict(SHARDING.get(table_name, dict(shard_count=1)))
+    if conn.key_by_id and table_name in KEYED_TABLES:
+        # Documents with a user defined `_key` can only be stored in
+        # collections sharded by `_key`, which equals the id.
+        options['shard_fields'] = ['_key']
+    if 'shard_like' not in options:
+        options.setdefault('shard_count', conn.shard_count)
+        options['replication_factor'] = conn.replication_factor
+    return options
+
+
 @register_schema(LocalArangoDBConnection)
 def create_database(conn, dbname):
     logger.info('Create database `%s`.', dbname)
@@ -57,22 +119,207 @@ def create_database(conn, dbname):
 
 @register_schema(LocalArangoDBConnection)
 def create_tables(conn, dbname):
+    cluster = is_cluster(conn, dbname)
+    # NOTE: `transactions` comes first, the collections distributed like it
+    # can only be created afterwards.
     for table_name in backend.schema.TABLES:
-        # create the table
-        # TODO: read and write concerns can be declared here
-        try:
-            logger.info(f'Create `{table_name}` table.')
-            conn.conn[dbname].create_collection(name=table_name)
-        except CollectionCreateError:
-            logger.info(f'Collection {table_name} already exists.')
-        # Add here new index for each collection
-        create_indexes(conn, dbname, table_name, INDEXES[table_name])
+        create_table(conn, dbname, table_name, cluster)
+    create_search_views(conn, dbname)
+    if conn.spend_graph:
+        create_spend_graph(conn, dbname)
+    enable_query_cache(conn, dbname)
+
+
+def enable_query_cache(conn, dbname):
+    """Switch the AQL query cache of the server to ``demand`` mode if it
+    is off, so that the queries explicitly asking for it are cached.
+
+    The mode is a server setting: it is only changed here, when the
+    database is initialized, and never by the connections.
+    """
+    cache = conn.conn[dbname].aql.cache
+    try:
+        if cache.properties()['mode'] == 'off':
+            logger.info('Enable the AQL query cache on demand.')
+            cache.configure(mode='demand')
+    except (AQLCachePropertiesError, AQLCacheConfigureError) as exc:
+        # The user might not be allowed to change server settings: run
+        # without the cache.
+        logger.info('AQL query cache not enabled: %s', exc)
+
+
+def create_table(conn, dbname, table_name, cluster, edge=False):
+    options = sharding(conn, table_name) if cluster else {}
+    # TODO: read and write concerns can be declared here
+    try:
+        logger.info(f'Create `{table_name}` table.')
+        conn.conn[dbname].create_collection(name=table_name, edge=edge,
+                                            **options)
+    except CollectionCreateError:
+        logger.info(f'Collection {table_name} already exists.')
+    # Add here new index for each collection
+    create_indexes(conn, dbname, table_name, INDEXES[table_name],
+                   options.get('shard_fields'))
 
 
-def create_indexes(conn, dbname, collection, indexes):
+def create_indexes(conn, dbname, collection, indexes, shard_fields=None):
     logger.info(f'Ensure secondary indexes for `{collection}`.')
     for fields, kwargs in indexes:
-        conn.conn[dbname][collection].add_hash_index(fields, **kwargs)
+        kwargs = dict(kwargs)
+        index_type = kwargs.pop('type', 'hash')
+        if kwargs.get('unique') and shard_fields \
+                and not set(shard_fields) <= set(fields):
+            # A cluster can only enforce the uniqueness of attributes
+            # including the shard keys. This only happens for the `id`
+            # of collections sharded by `_key`, where `_key` == `id`.
+            kwargs['unique'] = False
+        add_index = getattr(conn.conn[dbname][collection], f'add_{index_type}_index')
+        add_index(fields, **kwargs)
+
+
+# Let the server commit long running copies in chunks instead of holding
+# whole collections in a single transaction.
+MIGRATION_COMMIT_COUNT = 10000
+
+
+@register_schema(LocalArangoDBConnection)
+def key_collections_by_id(conn, dbname):
+    database = conn.conn[dbname]
+    if is_cluster(conn, dbname):
+        raise OperationError('Collections sharded by `id` cannot be keyed by '
+                             'id: set `database.key_by_id` before creating '
+                             'the database instead.')
+    for table_name in KEYED_TABLES:
+        logger.info(f'Key `{table_name}` by id.')
+        staging_name = f'{table_name}_keyed'
+        if not database.has_collection(staging_name):
+            database.create_collection(name=staging_name)
+        bind_vars = {'@table': table_name, '@staging': staging_name}
+
+        # Every step only touches documents not keyed yet, or ignores the
+        # ones already copied, so an interrupted migration can be resumed.
+        database.aql.execute(
+            'FOR doc IN @@table FILTER doc._key != doc.id '
+            'INSERT MERGE(UNSET(doc, "_id", "_key", "_rev"), {_key: doc.id}) '
+            'INTO @@staging OPTIONS {ignoreErrors: true}',
+            bind_vars=bind_vars,
+            intermediate_commit_count=MIGRATION_COMMIT_COUNT)
+        missing = next(database.aql.execute(
+            'RETURN LENGTH(FOR doc IN @@table FILTER doc._key != doc.id '
+            'FILTER DOCUMENT(@staging, doc.id) == null LIMIT 1 RETURN 1)',
+            bind_vars={'@table': table_name, 'staging': staging_name}))
+        if missing:
+            raise OperationError(f'Could not copy all the documents of '
+                                 f'`{table_name}`, the collection was not '
+                                 f'modified.')
+        database.aql.execute(
+            'FOR doc IN @@table FILTER doc._key != doc.id '
+            'REMOVE doc IN @@table',
+            bind_vars={'@table': table_name},
+            intermediate_commit_count=MIGRATION_COMMIT_COUNT)
+        database.aql.execute(
+            'FOR doc IN @@staging '
+            'INSERT UNSET(doc, "_id", "_rev") '
+            'INTO @@table OPTIONS {ignoreErrors: true}',
+            bind_vars=bind_vars,
+            intermediate_commit_count=MIGRATION_COMMIT_COUNT)
+        database.delete_collection(staging_name)
+
+
+@register_schema(LocalArangoDBConnection)
+def rebuild_utxos(conn, dbname):
+    database = conn.conn[dbname]
+    logger.info('Remove spent outputs from `utxos`.')
+    database.aql.execute(
+        'FOR utxo IN utxos '
+        'LET link = {transaction_id: utxo.transaction_id, '
+            'output_index: utxo.output_index} '
+        'FILTER LENGTH(FOR tx IN transactions '
+            'FILTER link IN tx.inputs[*].fulfills LIMIT 1 RETURN 1) > 0 '
+        'REMOVE utxo IN utxos',
+        intermediate_commit_count=MIGRATION_COMMIT_COUNT)
+    logger.info('Add missing unspent outputs to `utxos`.')
+    # Mirrors `Transaction.unspent_outputs`: CREATE-like transactions are
+    # stored without their asset, and define the asset with their own id.
+    database.aql.execute(
+        'FOR tx IN transactions '
+        'FOR output_index IN 0..LENGTH(tx.outputs) - 1 '
+        'LET link = {transaction_id: tx.id, output_index} '
+        'FILTER LENGTH(FOR spending IN transactions '
+            'FILTER link IN spending.inputs[*].fulfills LIMIT 1 RETURN 1) == 0 '
+        'LET output = tx.outputs[output_index] '
+        'INSERT MERGE(link, {amount: TO_NUMBER(output.amount), '
+            'asset_id: tx.asset.id != null ? tx.asset.id : tx.id, '
+            'condition_uri: output.condition.uri}) '
+        'INTO utxos OPTIONS {ignoreErrors: true}',
+        intermediate_commit_count=MIGRATION_COMMIT_COUNT)
+
+
+@register_schema(LocalArangoDBConnection)
+def store_block_positions(conn, dbname):
+    logger.info('Store the block position of the committed transactions.')
+    conn.conn[dbname].aql.execute(
+        'FOR block IN blocks FILTER LENGTH(block.transactions) > 0 '
+        'FOR index IN 0..LENGTH(block.transactions) - 1 '
+        'FOR tx IN transactions FILTER tx.id == block.transactions[index] '
+        'FILTER tx.block_height == null '
+        'UPDATE tx WITH {block_height: block.height, block_index: index} '
+        'IN transactions',
+        intermediate_commit_count=MIGRATION_COMMIT_COUNT)
+
+
+def create_spend_graph(conn, dbname):
+    create_table(conn, dbname, SPENDS, is_cluster(conn, dbname), edge=True)
+
+
+@register_schema(LocalArangoDBConnection)
+def build_spend_graph(conn, dbname):
+    create_spend_graph(conn, dbname)
+    logger.info(f'Add the inputs of the stored transactions to `{SPENDS}`.')
+    conn.conn[dbname].aql.execute(
+        INSERT_SPENDS, bind_vars={'ids': None},
+        intermediate_commit_count=MIGRATION_COMMIT_COUNT)
+
+
+def create_search_views(conn, dbname):
+    database = conn.conn[dbname]
+    logger.info(f'Ensure text search analyzer `{ANALYZER}`.')
+    # Creating an analyzer that already exists with the same definition is
+    # a no-op.
+    database.create_analyzer(ANALYZER, 'text', ANALYZER_PROPERTIES,
+                             ANALYZER_FEATURES)
+    for table_name, (view_name, _) in VIEWS.items():
+        logger.info(f'Create `{view_name}` search view.')
+        try:
+            database.create_arangosearch_view(view_name, properties={
+                'links': {
+                    table_name: {
+                        'fields': {SEARCH_FIELD: {'analyzers': [ANALYZER]}},
+                    },
+                },
+            })
+        except ViewCreateError:
+            logger.info(f'View {view_name} already exists.')
+
+
+@register_schema(LocalArangoDBConnection)
+def index_text_search(conn, dbname):
+    database = conn.conn[dbname]
+    for table_name, (_, field) in VIEWS.items():
+        logger.info(f'Index `{table_name}` for text search.')
+        collection = database.collection(table_name)
+        cursor = database.aql.execute(
+            'FOR doc IN @@table FILTER !HAS(doc, @search_field) '
+            'RETURN {_key: doc._key, value: doc.@field}',
+            bind_vars={'@table': table_name, 'search_field': SEARCH_FIELD,
+                       'field': field},
+            batch_size=conn.batch_size, stream=True)
+        batch = list(islice(cursor, conn.batch_size))
+        while batch:
+            collection.update_many(
+                [{'_key': doc['_key'], SEARCH_FIELD: search_text(doc['value'])}
+                 for doc in batch], check_rev=False)
+            batch = list(islice(cursor, conn.batch_size))
 
 
 @register_schema(LocalArangoDBConnection)
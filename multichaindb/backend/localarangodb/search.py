@@ -0,0 +1,41 @@
+
+"""Full-text search support for the ArangoDB backend.
+
+Assets and metadata are free-form JSON, while an ArangoSearch view can only
+search attributes it knows the path of. Every asset and metadata document
+is thus stored with an extra ``search_text`` attribute holding all the
+strings of its ``data`` (resp. ``metadata``), which is what the views
+index. The attribute is never returned by the queries.
+"""
+
+from multichaindb.backend.search import search_text
+
+SEARCH_FIELD = 'search_text'
+
+ANALYZER = 'multichaindb_text'
+
+# English stemming; case and accent insensitive. `frequency` and `norm` are
+# needed for BM25 scoring, `position` for phrase search.
+ANALYZER_PROPERTIES = {
+    'locale': 'en.utf-8',
+    'case': 'lower',
+    'accent': False,
+    'stemming': True,
+    'stopwords': [],
+}
+ANALYZER_FEATURES = ['frequency', 'norm', 'position']
+
+# Searchable collections: name of their view, and of the attribute holding
+# the user data.
+VIEWS = {
+    'assets': ('assets_view', 'data'),
+    'metadata': ('metadata_view', 'metadata'),
+}
+
+
+def with_search_text(documents, field):
+    """Return copies of ``documents`` with their ``search_text`` set from
+    their ``field`` attribute.
+    """
+    return [dict(document, **{SEARCH_FIELD: search_text(document.get(field))})
+            for document in documents]
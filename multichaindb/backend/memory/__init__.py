@@ -0,0 +1,19 @@
+
+"""In-memory backend implementation.
+
+Contains a pure Python implementation of the
+:mod:`~multichaindb.backend.schema` and :mod:`~multichaindb.backend.query`
+interfaces, keeping every table in dicts and sorted lists. Nothing is
+persisted and the data is only shared by the connections of a same
+process, so it is meant for benchmarks and tests, not for running a node.
+
+You can specify MultiChainDB to use it by either setting
+``database.backend`` to ``'memory'`` in your configuration file, or setting
+the ``MULTICHAINDB_DATABASE_BACKEND`` environment variable to ``'memory'``.
+"""
+
+# Register the single dispatched modules on import.
+from multichaindb.backend.memory import schema, query # noqa
+
+# MemoryConnection should always be accessed via
+# ``multichaindb.backend.connect()``.
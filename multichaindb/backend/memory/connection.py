@@ -0,0 +1,193 @@
+
+import logging
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from copy import deepcopy
+from itertools import count
+
+from multichaindb.backend.connection import Connection
+from multichaindb.backend.utils import get_multichaindb_config_value
+from multichaindb.common.exceptions import ConfigurationError
+
+logger = logging.getLogger(__name__)
+
+# See `database.overwrite_mode`.
+OVERWRITE_MODES = ('ignore', 'replace')
+
+# Databases of this process, by name.
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(name, create=True):
+    """Return the database called ``name``, creating it if ``create`` is
+    set, or ``None``.
+    """
+    with _databases_lock:
+        if name not in _databases and create:
+            _databases[name] = MemoryDatabase(name)
+        return _databases.get(name)
+
+
+def delete_database(name):
+    """Delete the database called ``name``, returning ``False`` if it did
+    not exist.
+    """
+    with _databases_lock:
+        database = _databases.pop(name, None)
+    if database is None:
+        return False
+    database.clear()
+    return True
+
+
+def insort_unique(values, value):
+    """Insert ``value`` in the sorted list ``values``, unless present."""
+    index = bisect_left(values, value)
+    if index == len(values) or values[index] != value:
+        values.insert(index, value)
+
+
+def remove_sorted(values, value):
+    """Remove ``value`` from the sorted list ``values``, if present."""
+    index = bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        del values[index]
+
+
+class MemoryDatabase:
+    """The tables of a database, and the indexes answering the queries.
+
+    Documents are copied when they are written and when they are read, so
+    that callers can never modify the stored ones. Every access must hold
+    ``lock``.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        self.transactions = {}
+        # Transaction id -> (block height, index in the block). Transactions
+        # not stored by `commit_block` come first, in the order they were
+        # stored.
+        self.positions = {}
+        self.assets = {}
+        self.metadata = {}
+        # (transaction_id, output_index) -> id of the spending transaction
+        self.spends = {}
+        # Public key -> ids of the transactions with an output it owns
+        self.owners = defaultdict(list)
+        # Asset id -> sorted (position, id) of the transactions transferring
+        # it
+        self.histories = defaultdict(list)
+        # (transaction_id, output_index) -> unspent output
+        self.utxos = {}
+        self.blocks = {}
+        self.block_heights = []
+        # Transaction id -> heights of the blocks including it
+        self.transaction_blocks = defaultdict(list)
+        self.pre_commit = {}
+        self.validators = {}
+        self.validator_heights = []
+        # (election_id, height) -> election
+        self.elections = {}
+        self.abci_chains = {}
+        self._sequence = count()
+
+    def put_transaction(self, transaction, position=None, replace=False):
+        transaction_id = transaction['id']
+        if transaction_id in self.transactions:
+            if not replace:
+                return
+            self.remove_transaction(transaction_id)
+        if position is None:
+            position = (-1, next(self._sequence))
+        transaction = deepcopy(transaction)
+        self.transactions[transaction_id] = transaction
+        self.positions[transaction_id] = position
+
+        for input_ in transaction['inputs']:
+            fulfills = input_.get('fulfills')
+            if fulfills:
+                link = (fulfills['transaction_id'], fulfills['output_index'])
+                self.spends[link] = transaction_id
+        owners = {public_key for output in transaction['outputs']
+                  for public_key in output['public_keys']}
+        for public_key in owners:
+            self.owners[public_key].append(transaction_id)
+        asset_id = transaction.get('asset', {}).get('id')
+        if asset_id is not None:
+            insort(self.histories[asset_id], (position, transaction_id))
+
+    def remove_transaction(self, transaction_id):
+        transaction = self.transactions.pop(transaction_id, None)
+        if transaction is None:
+            return
+        position = self.positions.pop(transaction_id)
+        for input_ in transaction['inputs']:
+            fulfills = input_.get('fulfills')
+            if fulfills:
+                link = (fulfills['transaction_id'], fulfills['output_index'])
+                if self.spends.get(link) == transaction_id:
+                    del self.spends[link]
+        owners = {public_key for output in transaction['outputs']
+                  for public_key in output['public_keys']}
+        for public_key in owners:
+            self.owners[public_key].remove(transaction_id)
+        asset_id = transaction.get('asset', {}).get('id')
+        if asset_id is not None:
+            remove_sorted(self.histories[asset_id], (position, transaction_id))
+
+    def put(self, table, document, replace=False):
+        """Store an asset or a metadata, keyed by its id."""
+        if replace or document['id'] not in table:
+            table[document['id']] = deepcopy(document)
+
+    def put_block(self, block):
+        height = block['height']
+        if height in self.blocks:
+            return
+        self.blocks[height] = deepcopy(block)
+        insort_unique(self.block_heights, height)
+        for transaction_id in block.get('transactions', ()):
+            self.transaction_blocks[transaction_id].append(height)
+
+
+class MemoryConnection(Connection):
+
+    def __init__(self, overwrite_mode=None, **kwargs):
+        """Create a new Connection instance.
+
+        Args:
+            overwrite_mode (str, optional): ``ignore`` or ``replace``, what
+                storing a transaction, asset or metadata already stored
+                does.
+            **kwargs: arbitrary keyword arguments provided by the
+                configuration's ``database`` settings
+        """
+
+        super().__init__(**kwargs)
+        self.overwrite_mode = overwrite_mode or get_multichaindb_config_value('overwrite_mode', 'ignore')
+        if self.overwrite_mode not in OVERWRITE_MODES:
+            raise ConfigurationError('`overwrite_mode` must be one of {}, not '
+                                     '`{}`.'.format(', '.join(OVERWRITE_MODES),
+                                                    self.overwrite_mode))
+
+    @property
+    def replace(self):
+        return self.overwrite_mode == 'replace'
+
+    def run(self, query, *args, **kwargs):
+        """Run ``query(database, *args, **kwargs)`` holding the lock of the
+        database.
+        """
+        database = self.conn
+        with database.lock:
+            return query(database, *args, **kwargs)
+
+    def _connect(self):
+        return get_database(self.dbname)
@@ -0,0 +1,518 @@
+"""Query implementation for the in-memory backend"""
+
+from collections import Counter, deque
+from copy import deepcopy
+
+from multichaindb import backend
+from multichaindb.backend.exceptions import OperationError
+from multichaindb.backend.search import strings, terms
+from multichaindb.backend.memory.connection import (
+    MemoryConnection,
+    insort_unique,
+    remove_sorted
+)
+from multichaindb.backend.utils import module_dispatch_registrar
+
+register_query = module_dispatch_registrar(backend.query)
+
+
+# NOTE: every function holds the lock of the database while it reads or
+# writes it, and returns copies of the stored documents. Results that the
+# other backends stream are built in full before being returned, so that
+# the lock is not held while the caller consumes them.
+
+
+def _link(output):
+    return output['transaction_id'], output['output_index']
+
+
+def _hydrate(db, transaction_id):
+    transaction = deepcopy(db.transactions[transaction_id])
+    transaction['metadata'] = deepcopy(
+        db.metadata.get(transaction_id, {}).get('metadata'))
+    if transaction_id in db.assets:
+        transaction['asset'] = {'data': deepcopy(db.assets[transaction_id]['data'])}
+    return transaction
+
+
+@register_query(MemoryConnection)
+def store_transactions(conn, signed_transactions):
+    db = conn.conn
+    with db.lock:
+        for transaction in signed_transactions:
+            db.put_transaction(transaction, replace=conn.replace)
+
+
+@register_query(MemoryConnection)
+def get_transaction(conn, transaction_id):
+    db = conn.conn
+    with db.lock:
+        return deepcopy(db.transactions.get(transaction_id))
+
+
+@register_query(MemoryConnection)
+def get_transactions(conn, transaction_ids):
+    db = conn.conn
+    with db.lock:
+        return iter([deepcopy(db.transactions[transaction_id])
+                     for transaction_id in transaction_ids
+                     if transaction_id in db.transactions])
+
+
+@register_query(MemoryConnection)
+def get_transaction_ids(conn):
+    db = conn.conn
+    with db.lock:
+        return iter(list(db.transactions))
+
+
+@register_query(MemoryConnection)
+def get_hydrated_transaction(conn, transaction_id):
+    db = conn.conn
+    with db.lock:
+        if transaction_id not in db.transactions:
+            return None
+        return _hydrate(db, transaction_id)
+
+
+@register_query(MemoryConnection)
+def get_hydrated_transactions(conn, transaction_ids):
+    db = conn.conn
+    with db.lock:
+        return [_hydrate(db, transaction_id)
+                for transaction_id in transaction_ids
+                if transaction_id in db.transactions]
+
+
+@register_query(MemoryConnection)
+def store_metadatas(conn, metadata):
+    db = conn.conn
+    with db.lock:
+        for meta in metadata:
+            db.put(db.metadata, meta, replace=conn.replace)
+
+
+@register_query(MemoryConnection)
+def get_metadata(conn, transaction_ids):
+    db = conn.conn
+    with db.lock:
+        return iter([deepcopy(db.metadata[transaction_id])
+                     for transaction_id in transaction_ids
+                     if transaction_id in db.metadata])
+
+
+@register_query(MemoryConnection)
+def store_asset(conn, asset):
+    store_assets(conn, [asset])
+
+
+@register_query(MemoryConnection)
+def store_assets(conn, assets):
+    db = conn.conn
+    with db.lock:
+        for asset in assets:
+            db.put(db.assets, asset, replace=conn.replace)
+
+
+@register_query(MemoryConnection)
+def get_asset(conn, asset_id):
+    db = conn.conn
+    with db.lock:
+        if asset_id not in db.assets:
+            return None
+        return {'data': deepcopy(db.assets[asset_id]['data'])}
+
+
+@register_query(MemoryConnection)
+def get_assets(conn, asset_ids):
+    db = conn.conn
+    with db.lock:
+        return iter([{'data': deepcopy(db.assets[asset_id]['data'])}
+                     for asset_id in asset_ids if asset_id in db.assets])
+
+
+@register_query(MemoryConnection)
+def get_spent(conn, transaction_id, output):
+    db = conn.conn
+    with db.lock:
+        spending = db.spends.get((transaction_id, output))
+        if spending is None:
+            return iter([])
+        return iter([deepcopy(db.transactions[spending])])
+
+
+@register_query(MemoryConnection)
+def get_spent_outputs(conn, outputs):
+    db = conn.conn
+    with db.lock:
+        spent = []
+        for output in outputs:
+            link = _link(output)
+            if link in db.spends:
+                spent.append({'fulfills': {'transaction_id': link[0],
+                                           'output_index': link[1]},
+                              'spent_by': db.spends[link]})
+        return iter(spent)
+
+
+@register_query(MemoryConnection)
+def get_latest_block(conn):
+    db = conn.conn
+    with db.lock:
+        if not db.block_heights:
+            return None
+        return deepcopy(db.blocks[db.block_heights[-1]])
+
+
+@register_query(MemoryConnection)
+def store_block(conn, block):
+    db = conn.conn
+    with db.lock:
+        db.put_block(block)
+
+
+@register_query(MemoryConnection)
+def commit_block(conn, block, transactions, assets, metadata,
+                 unspent_outputs, spent_outputs):
+    db = conn.conn
+    with db.lock:
+        for meta in metadata:
+            db.put(db.metadata, meta, replace=conn.replace)
+        for asset in assets:
+            db.put(db.assets, asset, replace=conn.replace)
+        for index, transaction in enumerate(transactions):
+            db.put_transaction(transaction, (block['height'], index),
+                               replace=conn.replace)
+        # Outputs created and spent in the same block are inserted and then
+        # removed right away, so new outputs must be stored first.
+        for utxo in unspent_outputs:
+            db.utxos.setdefault(_link(utxo), deepcopy(utxo))
+        for output in spent_outputs:
+            db.utxos.pop(_link(output), None)
+        db.put_block(block)
+
+
+@register_query(MemoryConnection)
+def get_txids_filtered(conn, asset_id, operation=None, last_tx=False,
+                       after=None, limit=None):
+    db = conn.conn
+    with db.lock:
+        creation = [asset_id] if asset_id in db.transactions and \
+            operation in (None, db.transactions[asset_id]['operation']) \
+            else []
+        transfers = [transaction_id for _, transaction_id in db.histories[asset_id]
+                     if operation in (None, db.transactions[transaction_id]['operation'])]
+        if last_tx:
+            return iter(transfers[-1:] or creation)
+
+        if after == asset_id:
+            creation = []
+        elif after is not None:
+            if after not in db.positions:
+                return iter([])
+            position = db.positions[after]
+            creation = []
+            transfers = [transaction_id for transaction_id in transfers
+                         if db.positions[transaction_id] > position]
+        txids = creation + transfers
+        return iter(txids[:limit] if limit else txids)
+
+
+# Searchable tables: attribute holding the user data.
+TEXT_SEARCH_FIELDS = {
+    'assets': 'data',
+    'metadata': 'metadata',
+}
+
+
+@register_query(MemoryConnection)
+def text_search(conn, search, *, language='english', case_sensitive=False,
+                diacritic_sensitive=False, text_score=False, limit=0, table='assets'):
+    # NOTE: the documents are scanned, and scored by the number of
+    # occurrences of the search terms. Terms are OR-ed and case insensitive;
+    # `language`, `case_sensitive` and `diacritic_sensitive` are not
+    # supported.
+    try:
+        field = TEXT_SEARCH_FIELDS[table]
+    except KeyError:
+        raise OperationError('Text search is not supported on `{}`'.format(table))
+    search_terms = set(terms(search))
+    db = conn.conn
+    with db.lock:
+        matches = []
+        for document in getattr(db, table).values():
+            counts = Counter(term for text in strings(document.get(field))
+                             for term in terms(text))
+            score = sum(counts[term] for term in search_terms)
+            if score:
+                document = deepcopy(document)
+                if text_score:
+                    document['score'] = score
+                matches.append((score, document))
+    matches.sort(key=lambda match: match[0], reverse=True)
+    if limit:
+        matches = matches[:limit]
+    return iter([document for _, document in matches])
+
+
+@register_query(MemoryConnection)
+def get_owned_ids(conn, owner):
+    db = conn.conn
+    with db.lock:
+        return iter([deepcopy(db.transactions[transaction_id])
+                     for transaction_id in db.owners.get(owner, ())])
+
+
+@register_query(MemoryConnection)
+def get_owned_outputs(conn, owner):
+    db = conn.conn
+    with db.lock:
+        return iter([{'transaction_id': transaction_id, 'output_index': index}
+                     for transaction_id in db.owners.get(owner, ())
+                     for index, output in enumerate(db.transactions[transaction_id]['outputs'])
+                     if owner in output['public_keys']])
+
+
+def _traverse(db, start, neighbours, depth=None, limit=None):
+    # Breadth first, so that the closest transactions come first.
+    seen = set(start)
+    queue = deque((transaction_id, 0) for transaction_id in start)
+    while queue and limit != 0:
+        transaction_id, level = queue.popleft()
+        yield transaction_id
+        if limit is not None:
+            limit -= 1
+        if level == depth:
+            continue
+        for neighbour in neighbours(transaction_id):
+            if neighbour not in seen:
+                seen.add(neighbour)
+                queue.append((neighbour, level + 1))
+
+
+@register_query(MemoryConnection)
+def get_provenance(conn, transaction_id, output_index, depth=None,
+                   limit=None):
+    db = conn.conn
+
+    def spent(transaction_id):
+        for input_ in db.transactions[transaction_id]['inputs']:
+            fulfills = input_.get('fulfills')
+            if fulfills and fulfills['transaction_id'] in db.transactions:
+                yield fulfills['transaction_id']
+
+    with db.lock:
+        transaction = db.transactions.get(transaction_id)
+        if transaction is None or output_index >= len(transaction['outputs']):
+            return iter([])
+        return iter([_hydrate(db, ancestor) for ancestor in
+                     _traverse(db, [transaction_id], spent, depth, limit)])
+
+
+@register_query(MemoryConnection)
+def get_descendants(conn, transaction_id, output_index, depth=None,
+                    limit=None):
+    db = conn.conn
+
+    def spending(transaction_id):
+        for index in range(len(db.transactions[transaction_id]['outputs'])):
+            if (transaction_id, index) in db.spends:
+                yield db.spends[transaction_id, index]
+
+    with db.lock:
+        start = db.spends.get((transaction_id, output_index))
+        if start is None:
+            return iter([])
+        return iter([_hydrate(db, descendant) for descendant in
+                     _traverse(db, [start], spending, depth, limit)])
+
+
+@register_query(MemoryConnection)
+def get_spending_transactions(conn, inputs):
+    db = conn.conn
+    with db.lock:
+        spending = []
+        for input_ in inputs:
+            transaction_id = db.spends.get(_link(input_))
+            if transaction_id is not None and transaction_id not in spending:
+                spending.append(transaction_id)
+        return iter([deepcopy(db.transactions[transaction_id])
+                     for transaction_id in spending])
+
+
+@register_query(MemoryConnection)
+def get_block(conn, block_id):
+    db = conn.conn
+    with db.lock:
+        return deepcopy(db.blocks.get(block_id))
+
+
+@register_query(MemoryConnection)
+def get_block_with_transaction(conn, txid):
+    db = conn.conn
+    with db.lock:
+        return iter([{'height': height}
+                     for height in db.transaction_blocks.get(txid, ())])
+
+
+@register_query(MemoryConnection)
+def delete_transactions(conn, txn_ids):
+    db = conn.conn
+    with db.lock:
+        for transaction_id in txn_ids:
+            db.remove_transaction(transaction_id)
+            db.assets.pop(transaction_id, None)
+            db.metadata.pop(transaction_id, None)
+
+
+@register_query(MemoryConnection)
+def store_unspent_outputs(conn, *unspent_outputs):
+    db = conn.conn
+    with db.lock:
+        for utxo in unspent_outputs:
+            db.utxos.setdefault(_link(utxo), deepcopy(utxo))
+
+
+@register_query(MemoryConnection)
+def delete_unspent_outputs(conn, *unspent_outputs):
+    db = conn.conn
+    with db.lock:
+        for utxo in unspent_outputs:
+            db.utxos.pop(_link(utxo), None)
+
+
+@register_query(MemoryConnection)
+def get_unspent_outputs(conn, *, query=None):
+    query = query or {}
+    db = conn.conn
+    with db.lock:
+        return iter([deepcopy(utxo) for utxo in db.utxos.values()
+                     if all(utxo.get(key) == value
+                            for key, value in query.items())])
+
+
+@register_query(MemoryConnection)
+def get_utxos(conn, outputs):
+    db = conn.conn
+    with db.lock:
+        return iter([{'transaction_id': link[0], 'output_index': link[1]}
+                     for link in map(_link, outputs) if link in db.utxos])
+
+
+@register_query(MemoryConnection)
+def store_pre_commit_state(conn, state):
+    db = conn.conn
+    with db.lock:
+        db.pre_commit[state['height']] = deepcopy(state)
+
+
+@register_query(MemoryConnection)
+def get_pre_commit_state(conn):
+    db = conn.conn
+    with db.lock:
+        if not db.pre_commit:
+            return None
+        return deepcopy(db.pre_commit[max(db.pre_commit)])
+
+
+@register_query(MemoryConnection)
+def store_validator_set(conn, validators_update):
+    db = conn.conn
+    with db.lock:
+        height = validators_update['height']
+        db.validators[height] = deepcopy(validators_update)
+        insort_unique(db.validator_heights, height)
+
+
+@register_query(MemoryConnection)
+def delete_validator_set(conn, height):
+    db = conn.conn
+    with db.lock:
+        if db.validators.pop(height, None) is not None:
+            remove_sorted(db.validator_heights, height)
+
+
+@register_query(MemoryConnection)
+def get_validator_set(conn, height=None):
+    db = conn.conn
+    with db.lock:
+        heights = db.validator_heights
+        if height is not None:
+            heights = [h for h in heights if h <= height]
+        if not heights:
+            return None
+        return deepcopy(db.validators[heights[-1]])
+
+
+@register_query(MemoryConnection)
+def store_election(conn, election_id, height, is_concluded):
+    db = conn.conn
+    with db.lock:
+        db.elections[election_id, height] = {'election_id': election_id,
+                                             'height': height,
+                                             'is_concluded': is_concluded}
+
+
+@register_query(MemoryConnection)
+def store_elections(conn, elections):
+    db = conn.conn
+    with db.lock:
+        for election in elections:
+            db.elections[election['election_id'], election['height']] = \
+                deepcopy(election)
+
+
+@register_query(MemoryConnection)
+def delete_elections(conn, height):
+    db = conn.conn
+    with db.lock:
+        for key in [key for key in db.elections if key[1] == height]:
+            del db.elections[key]
+
+
+@register_query(MemoryConnection)
+def get_election(conn, election_id):
+    db = conn.conn
+    with db.lock:
+        heights = [height for (id_, height) in db.elections
+                   if id_ == election_id]
+        if not heights:
+            return None
+        return deepcopy(db.elections[election_id, max(heights)])
+
+
+@register_query(MemoryConnection)
+def get_asset_tokens_for_public_key(conn, asset_id, public_key):
+    db = conn.conn
+    with db.lock:
+        transaction_ids = [asset_id] + [transaction_id for _, transaction_id
+                                        in db.histories[asset_id]]
+        return iter([deepcopy(db.transactions[transaction_id])
+                     for transaction_id in transaction_ids
+                     if transaction_id in db.transactions and
+                     any(output['public_keys'] == [public_key]
+                         for output in db.transactions[transaction_id]['outputs'])])
+
+
+@register_query(MemoryConnection)
+def store_abci_chain(conn, height, chain_id, is_synced=True):
+    db = conn.conn
+    with db.lock:
+        db.abci_chains[height] = {'height': height, 'chain_id': chain_id,
+                                  'is_synced': is_synced}
+
+
+@register_query(MemoryConnection)
+def delete_abci_chain(conn, height):
+    db = conn.conn
+    with db.lock:
+        db.abci_chains.pop(height, None)
+
+
+@register_query(MemoryConnection)
+def get_latest_abci_chain(conn):
+    db = conn.conn
+    with db.lock:
+        if not db.abci_chains:
+            return None
+        return deepcopy(db.abci_chains[max(db.abci_chains)])
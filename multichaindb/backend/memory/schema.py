@@ -0,0 +1,74 @@
+import logging
+
+from multichaindb import backend
+from multichaindb.backend.memory.connection import (
+    MemoryConnection,
+    delete_database,
+    get_database
+)
+from multichaindb.backend.utils import module_dispatch_registrar
+from multichaindb.common.exceptions import DatabaseDoesNotExist
+
+logger = logging.getLogger(__name__)
+register_schema = module_dispatch_registrar(backend.schema)
+
+
+@register_schema(MemoryConnection)
+def create_database(conn, dbname):
+    logger.info('Create database `%s`.', dbname)
+    get_database(dbname)
+
+
+@register_schema(MemoryConnection)
+def create_tables(conn, dbname):
+    # The tables and their indexes are created with the database.
+    get_database(dbname)
+
+
+@register_schema(MemoryConnection)
+def drop_database(conn, dbname):
+    if not delete_database(dbname):
+        raise DatabaseDoesNotExist('Database `{}` does not exist'.format(dbname))
+    if conn._conn is not None and conn._conn.name == dbname:
+        conn._conn = None
+
+
+@register_schema(MemoryConnection)
+def key_collections_by_id(conn, dbname):
+    logger.info('Documents of the memory backend are always keyed by id.')
+
+
+@register_schema(MemoryConnection)
+def index_text_search(conn, dbname):
+    logger.info('The memory backend searches the documents without an index.')
+
+
+@register_schema(MemoryConnection)
+def store_block_positions(conn, dbname):
+    logger.info('The memory backend always stores the block positions.')
+
+
+@register_schema(MemoryConnection)
+def build_spend_graph(conn, dbname):
+    logger.info('The memory backend always indexes the spent outputs.')
+
+
+@register_schema(MemoryConnection)
+def rebuild_utxos(conn, dbname):
+    database = get_database(dbname)
+    with database.lock:
+        logger.info('Rebuild `utxos` from the stored transactions.')
+        # Mirrors `Transaction.unspent_outputs`: CREATE-like transactions are
+        # stored without their asset, and define the asset with their own id.
+        database.utxos = {
+            (tx['id'], index): {
+                'transaction_id': tx['id'],
+                'output_index': index,
+                'amount': int(output['amount']),
+                'asset_id': tx.get('asset', {}).get('id', tx['id']),
+                'condition_uri': output['condition']['uri'],
+            }
+            for tx in database.transactions.values()
+            for index, output in enumerate(tx['outputs'])
+            if (tx['id'], index) not in database.spends
+        }
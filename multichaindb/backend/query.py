@@ -87,6 +87,48 @@ def get_transactions(connection, transaction_ids):
     raise NotImplementedError
 
 
+@singledispatch
+def get_transaction_ids(connection):
+    """Get the ids of all the stored transactions.
+
+    Returns:
+        An iterator of transaction ids.
+    """
+
+    raise NotImplementedError
+
+
+@singledispatch
+def get_hydrated_transaction(connection, transaction_id):
+    """Get a transaction together with its asset and metadata.
+
+    Args:
+        transaction_id (str): the id of the transaction.
+
+    Returns:
+        The transaction dict, with the ``asset`` and ``metadata`` keys
+        filled in, or ``None`` if the transaction does not exist.
+    """
+
+    raise NotImplementedError
+
+
+@singledispatch
+def get_hydrated_transactions(connection, transaction_ids):
+    """Get transactions together with their assets and metadata.
+
+    Args:
+        transaction_ids (list): list of transaction ids to fetch
+
+    Returns:
+        list: the transaction dicts, in the order of ``transaction_ids``,
+        with the ``asset`` and ``metadata`` keys filled in. Missing
+        transactions are skipped.
+    """
+
+    raise NotImplementedError
+
+
 @singledispatch
 def get_asset(connection, asset_id):
     """Get a transaction from the transactions table.
@@ -120,6 +162,22 @@ def get_spent(connection, transaction_id, condition_id):
     raise NotImplementedError
 
 
+@singledispatch
+def get_spent_outputs(connection, outputs):
+    """Check which of the given outputs were already used as an input.
+
+    Args:
+        outputs (list): list of {transaction_id, output_index}
+
+    Returns:
+        Iterator of {fulfills, spent_by} dicts, one for every transaction
+        (``spent_by`` is its id) spending one of the given outputs
+        (``fulfills``). Unspent outputs are not returned.
+    """
+
+    raise NotImplementedError
+
+
 @singledispatch
 def get_spending_transactions(connection, inputs):
     """Return transactions which spend given inputs
@@ -148,6 +206,61 @@ def get_owned_ids(connection, owner):
     raise NotImplementedError
 
 
+@singledispatch
+def get_owned_outputs(connection, owner):
+    """Retrieve the outputs that list the given owner in their public keys.
+
+    Args:
+        owner (str): base58 encoded public key.
+
+    Returns:
+        Iterator of {transaction_id, output_index} dicts, one for every
+        output (spent or not) owned by ``owner``.
+    """
+    raise NotImplementedError
+
+
+@singledispatch
+def get_provenance(connection, transaction_id, output_index, depth=None,
+                   limit=None):
+    """Retrieve the provenance of an output: the transaction creating it,
+    and every transaction it was transferred from, down to the ones
+    creating the asset.
+
+    Args:
+        transaction_id (str): the id of the transaction creating the output.
+        output_index (int): the index of the output in the transaction.
+        depth (int): how many transfers away from the first transaction
+            to go, ``None`` for no bound.
+        limit (int): the maximum number of transactions to return, ``None``
+            for no bound.
+
+    Returns:
+        Iterator of hydrated transaction dicts, the closest ones first.
+    """
+    raise OperationError('This query is not supported by the backend.')
+
+
+@singledispatch
+def get_descendants(connection, transaction_id, output_index, depth=None,
+                    limit=None):
+    """Retrieve the descendants of an output: the transaction spending it,
+    and every transaction spending the outputs of a descendant.
+
+    Args:
+        transaction_id (str): the id of the transaction creating the output.
+        output_index (int): the index of the output in the transaction.
+        depth (int): how many transfers away from the first transaction
+            to go, ``None`` for no bound.
+        limit (int): the maximum number of transactions to return, ``None``
+            for no bound.
+
+    Returns:
+        Iterator of hydrated transaction dicts, the closest ones first.
+    """
+    raise OperationError('This query is not supported by the backend.')
+
+
 @singledispatch
 def get_block(connection, block_id):
     """Get a block from the bigchain table.
@@ -203,12 +316,23 @@ def get_assets(connection, asset_ids):
 
 
 @singledispatch
-def get_txids_filtered(connection, asset_id, operation=None):
+def get_txids_filtered(connection, asset_id, operation=None, last_tx=False,
+                       after=None, limit=None):
     """Return all transactions for a particular asset id and optional operation.
 
+    The transaction creating the asset comes first, then the other ones in
+    the order they were committed.
+
     Args:
         asset_id (str): ID of transaction that defined the asset
         operation (str) (optional): Operation to filter on
+        last_tx (bool) (optional): Return only the last transaction
+        after (str) (optional): Return only the transactions following the
+            one with this id
+        limit (int) (optional): Return at most this many transactions
+
+    Returns:
+        Iterator of transaction ids.
     """
 
     raise NotImplementedError
@@ -217,11 +341,9 @@ def get_txids_filtered(connection, asset_id, operation=None):
 @singledispatch
 def text_search(conn, search, *, language='english', case_sensitive=False,
                 diacritic_sensitive=False, text_score=False, limit=0, table=None):
-    """Return all the assets that match the text search.
+    """Return all the assets (or metadata) that match the text search.
 
-    The results are sorted by text score.
-    For more information about the behavior of text search on MongoDB see
-    https://docs.mongodb.com/manual/reference/operator/query/text/#behavior
+    The results are sorted by text score, best match first.
 
     Args:
         search (str): Text search string to query the text index
@@ -235,6 +357,8 @@ def text_search(conn, search, *, language='english', case_sensitive=False,
         text_score (bool, optional): If ``True`` returns the text score with
             each document.
         limit (int, optional): Limit the number of returned documents.
+        table (str, optional): The table to search, ``'assets'`` or
+            ``'metadata'``.
 
     Returns:
         :obj:`list` of :obj:`dict`: a list of assets
@@ -243,8 +367,7 @@ def text_search(conn, search, *, language='english', case_sensitive=False,
         OperationError: If the backend does not support text search
     """
 
-    raise OperationError('This query is only supported when running '
-                         'BigchainDB with MongoDB as the backend.')
+    raise OperationError('This query is not supported by the backend.')
 
 
 @singledispatch
@@ -268,6 +391,30 @@ def store_block(conn, block):
     raise NotImplementedError
 
 
+@singledispatch
+def commit_block(conn, block, transactions, assets, metadata,
+                 unspent_outputs, spent_outputs):
+    """Atomically write a block together with everything it changes.
+
+    Either all the documents are written, or none of them is.
+
+    Args:
+        block (dict): block with current height and block hash.
+        transactions (list): transactions without their asset (CREATE
+            only) and metadata.
+        assets (list): assets of the CREATE transactions.
+        metadata (list): metadata of the transactions.
+        unspent_outputs (list): outputs created by the transactions.
+        spent_outputs (list): list of {transaction_id, output_index}
+            spent by the transactions.
+
+    Returns:
+        The result of the operation.
+    """
+
+    raise NotImplementedError
+
+
 @singledispatch
 def store_unspent_outputs(connection, unspent_outputs):
     """Store unspent outputs in ``utxo_set`` table."""
@@ -282,6 +429,21 @@ def delete_unspent_outputs(connection, unspent_outputs):
     raise NotImplementedError
 
 
+@singledispatch
+def get_utxos(connection, outputs):
+    """Check which of the given outputs are in the UTXO set.
+
+    Args:
+        outputs (list): list of {transaction_id, output_index}
+
+    Returns:
+        Iterator of the {transaction_id, output_index} dicts of the given
+        outputs that are unspent.
+    """
+
+    raise NotImplementedError
+
+
 @singledispatch
 def delete_transactions(conn, txn_ids):
     """Delete transactions from database
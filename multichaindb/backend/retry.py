@@ -0,0 +1,89 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Retry policies shared by the backend connections."""
+
+import random
+import threading
+import time
+
+
+def backoff(base_delay, max_delay):
+    """Yield the delays, in seconds, to wait before each retry.
+
+    Exponential backoff with "full jitter": the n-th delay is drawn
+    uniformly between 0 and ``min(max_delay, base_delay * 2 ** n)``, so
+    that clients failing at the same time do not retry at the same time.
+
+    Args:
+        base_delay (int): the upper bound of the first delay, in
+            milliseconds.
+        max_delay (int): the upper bound of every delay, in milliseconds.
+    """
+    attempt = 0
+    while True:
+        cap = min(max_delay, base_delay * 2 ** attempt)
+        yield random.uniform(0, cap) / 1000
+        attempt += 1
+
+
+class CircuitBreaker:
+    """Stop sending requests to a database that keeps failing.
+
+    After ``threshold`` consecutive failures the breaker opens: requests
+    are refused without reaching the database for ``timeout``
+    milliseconds. Then a single request is let through; the breaker
+    closes again if it succeeds, and opens again otherwise.
+
+    Args:
+        threshold (int): the number of consecutive failures opening the
+            breaker. ``0`` disables the breaker.
+        timeout (int): how long the breaker stays open, in milliseconds.
+    """
+
+    def __init__(self, threshold, timeout):
+        self.threshold = threshold
+        self.timeout = timeout / 1000
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        """Return ``True`` if a request can be sent to the database."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or \
+                    time.monotonic() - self._opened_at < self.timeout:
+                return False
+            # Half open: let this request probe the database.
+            self._probing = True
+            return True
+
+    def retry_in(self):
+        """Return how long, in seconds, requests are still refused for."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(0, self._opened_at + self.timeout - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.threshold and (self._probing or
+                                   self._failures >= self.threshold):
+                self._opened_at = time.monotonic()
+            self._probing = False
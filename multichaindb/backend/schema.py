@@ -10,8 +10,6 @@ import logging
 
 import multichaindb
 from multichaindb.backend.connection import connect
-from multichaindb.common.exceptions import ValidationError
-from multichaindb.common.utils import validate_all_values_for_key_in_obj, validate_all_values_for_key_in_list
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +17,6 @@ logger = logging.getLogger(__name__)
 TABLES = ('transactions', 'blocks', 'assets', 'metadata',
           'validators', 'elections', 'pre_commit', 'utxos', 'abci_chains')
 
-VALID_LANGUAGES = ('danish', 'dutch', 'english', 'finnish', 'french', 'german',
-                   'hungarian', 'italian', 'norwegian', 'portuguese', 'romanian',
-                   'russian', 'spanish', 'swedish', 'turkish', 'none',
-                   'da', 'nl', 'en', 'fi', 'fr', 'de', 'hu', 'it', 'nb', 'pt',
-                   'ro', 'ru', 'es', 'sv', 'tr')
-
 
 @singledispatch
 def create_database(connection, dbname):
@@ -63,6 +55,77 @@ def drop_database(connection, dbname):
     raise NotImplementedError
 
 
+@singledispatch
+def key_collections_by_id(connection, dbname):
+    """Re-key the transactions, assets and metadata by their ``id``.
+
+    Migrates an existing database to the layout used when
+    ``database.key_by_id`` is enabled. It is safe to run it again if it
+    gets interrupted.
+
+    Args:
+        dbname (str): the name of the database to migrate.
+    """
+
+    raise NotImplementedError
+
+
+@singledispatch
+def index_text_search(connection, dbname):
+    """Make the assets and metadata stored by a version without text
+    search searchable.
+
+    Args:
+        dbname (str): the name of the database to index.
+    """
+
+    raise NotImplementedError
+
+
+@singledispatch
+def rebuild_utxos(connection, dbname):
+    """Rebuild the UTXO set from the stored transactions.
+
+    Adds the unspent outputs missing from the ``utxos`` table, e.g. the
+    ones committed by a version that did not maintain it, and removes the
+    spent ones.
+
+    Args:
+        dbname (str): the name of the database to rebuild the UTXO set of.
+    """
+
+    raise NotImplementedError
+
+
+@singledispatch
+def store_block_positions(connection, dbname):
+    """Store the position in the chain of the transactions committed by a
+    version that did not, so that the history of their asset is complete.
+
+    It is safe to run it again.
+
+    Args:
+        dbname (str): the name of the database to migrate.
+    """
+
+    raise NotImplementedError
+
+
+@singledispatch
+def build_spend_graph(connection, dbname):
+    """Create the spend graph and add the inputs of the stored
+    transactions to it.
+
+    Needed before enabling ``database.spend_graph`` on a database that
+    already holds transactions. It is safe to run it again.
+
+    Args:
+        dbname (str): the name of the database to build the spend graph of.
+    """
+
+    raise NotImplementedError
+
+
 def init_database(connection=None, dbname=None):
     """Initialize the configured backend for use with MultiChainDB.
 
@@ -83,46 +146,3 @@ def init_database(connection=None, dbname=None):
 
     create_database(connection, dbname)
     create_tables(connection, dbname)
-
-
-def validate_language_key(obj, key):
-    """Validate all nested "language" key in `obj`.
-
-       Args:
-           obj (dict): dictionary whose "language" key is to be validated.
-
-       Returns:
-           None: validation successful
-
-        Raises:
-            ValidationError: will raise exception in case language is not valid.
-    """
-    backend = multichaindb.config['database']['backend']
-
-    if backend == 'localarangodb':
-        data = obj.get(key, {})
-        if isinstance(data, dict):
-            validate_all_values_for_key_in_obj(data, 'language', validate_language)
-        elif isinstance(data, list):
-            validate_all_values_for_key_in_list(data, 'language', validate_language)
-
-
-def validate_language(value):
-    """Check if `value` is a valid language.
-       https://www.arangodb.com/full-text-search-engine/
-
-        Args:
-            value (str): language to validated
-
-        Returns:
-            None: validation successful
-
-        Raises:
-            ValidationError: will raise exception in case language is not valid.
-    """
-    if value not in VALID_LANGUAGES:
-        error_str = ('ArangoDB does not support text search for the '
-                     'language "{}". If you do not understand this error '
-                     'message then please rename key/field "language" to '
-                     'something else like "lang".').format(value)
-        raise ValidationError(error_str)
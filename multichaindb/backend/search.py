@@ -0,0 +1,39 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Full-text search helpers shared by the backends.
+
+Assets and metadata are free-form JSON: what is searched is all the
+strings they contain.
+"""
+
+import re
+
+
+def strings(value):
+    """Yield all the strings contained in ``value``, in document order.
+
+    Args:
+        value: any JSON value.
+    """
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, dict):
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+
+
+def search_text(value):
+    """Return all the strings contained in ``value``, one per line."""
+    return '\n'.join(strings(value))
+
+
+def terms(text):
+    """Return the lowercase words of ``text``."""
+    return re.findall(r'\w+', text.lower())
@@ -0,0 +1,19 @@
+
+"""SQLite backend implementation.
+
+Contains a SQLite-specific implementation of the
+:mod:`~multichaindb.backend.schema` and :mod:`~multichaindb.backend.query`
+interfaces, for single node deployments where running ArangoDB is not worth
+it. The database is a single file, ``<database.path>/<database.name>.sqlite``,
+written through a write-ahead log and read through a memory map.
+
+You can specify MultiChainDB to use it by either setting
+``database.backend`` to ``'sqlite'`` in your configuration file, or setting
+the ``MULTICHAINDB_DATABASE_BACKEND`` environment variable to ``'sqlite'``.
+"""
+
+# Register the single dispatched modules on import.
+from multichaindb.backend.sqlite import schema, query # noqa
+
+# SQLiteConnection should always be accessed via
+# ``multichaindb.backend.connect()``.
@@ -0,0 +1,127 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from multichaindb.backend.connection import Connection
+from multichaindb.backend.exceptions import (
+    ConnectionError,
+    DuplicateKeyError,
+    OperationError
+)
+from multichaindb.backend.utils import get_multichaindb_config_value
+from multichaindb.common.exceptions import ConfigurationError
+
+logger = logging.getLogger(__name__)
+
+# See `database.overwrite_mode`.
+OVERWRITE_MODES = ('ignore', 'replace')
+
+
+class SQLiteConnection(Connection):
+
+    def __init__(self, path=None, mmap_size=None, overwrite_mode=None,
+                 **kwargs):
+        """Create a new Connection instance.
+
+        Args:
+            path (str, optional): the directory holding the database file,
+                ``<dbname>.sqlite``. Defaults to the current directory.
+            mmap_size (int, optional): the number of bytes of the database
+                file read through a memory map.
+            overwrite_mode (str, optional): ``ignore`` or ``replace``, what
+                storing a transaction, asset or metadata already stored
+                does.
+            **kwargs: arbitrary keyword arguments provided by the
+                configuration's ``database`` settings
+        """
+
+        super().__init__(**kwargs)
+        self.path = path or get_multichaindb_config_value('path') or os.getcwd()
+        self.mmap_size = mmap_size if mmap_size is not None \
+            else get_multichaindb_config_value('mmap_size', 0)
+        self.overwrite_mode = overwrite_mode or get_multichaindb_config_value('overwrite_mode', 'ignore')
+        if self.overwrite_mode not in OVERWRITE_MODES:
+            raise ConfigurationError('`overwrite_mode` must be one of {}, not '
+                                     '`{}`.'.format(', '.join(OVERWRITE_MODES),
+                                                    self.overwrite_mode))
+        self._local = threading.local()
+
+    @property
+    def filename(self):
+        return os.path.join(self.path, '{}.sqlite'.format(self.dbname))
+
+    @property
+    def replace(self):
+        return self.overwrite_mode == 'replace'
+
+    @property
+    def conn(self):
+        # A SQLite connection can not be shared between threads: each thread
+        # opens its own, and in WAL mode readers never wait for the writer.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect_with_retries()
+        return conn
+
+    def connect(self):
+        """Open the connection of the calling thread."""
+        self.close()
+        self._local.conn = self._connect_with_retries()
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def errors(self):
+        """Translate the SQLite errors raised in the block."""
+        try:
+            yield
+        except sqlite3.IntegrityError as exc:
+            raise DuplicateKeyError(str(exc)) from exc
+        except sqlite3.Error as exc:
+            raise OperationError(str(exc)) from exc
+
+    def run(self, query, parameters=()):
+        """Execute ``query`` and return a cursor over its rows."""
+        with self.errors():
+            return self.conn.execute(query, parameters)
+
+    def run_many(self, query, rows):
+        """Execute ``query`` once per row of ``rows``."""
+        with self.errors():
+            self.conn.executemany(query, rows)
+
+    @contextmanager
+    def transaction(self):
+        """Run the statements of the block in a single transaction.
+
+        The write-ahead log is synced once, when the transaction commits.
+        """
+        conn = self.conn
+        with self.errors():
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def _connect(self):
+        try:
+            conn = sqlite3.connect(self.filename,
+                                   timeout=self.connection_timeout / 1000,
+                                   isolation_level=None)
+        except sqlite3.Error as exc:
+            raise ConnectionError(str(exc)) from exc
+        conn.execute('PRAGMA journal_mode = WAL')
+        # In WAL mode, FULL syncs the log on every commit, and only then.
+        conn.execute('PRAGMA synchronous = FULL')
+        conn.execute('PRAGMA mmap_size = {:d}'.format(self.mmap_size))
+        return conn
@@ -0,0 +1,551 @@
+"""Query implementation for SQLite"""
+
+import json
+import re
+
+from multichaindb import backend
+from multichaindb.backend.exceptions import OperationError
+from multichaindb.backend.search import search_text
+from multichaindb.backend.sqlite.connection import SQLiteConnection
+from multichaindb.backend.sqlite.schema import SEARCH_TABLES
+from multichaindb.backend.utils import module_dispatch_registrar
+
+register_query = module_dispatch_registrar(backend.query)
+
+
+# NOTE: lists of ids and of outputs are bound as a single JSON array, and
+# joined through `json_each`, which keeps their order.
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _bodies(rows):
+    return (json.loads(body) for body, in rows)
+
+
+def _write_transactions(conn, db, transactions, height=None):
+    transactions = list(transactions)
+    if conn.replace:
+        ids = _dumps([transaction['id'] for transaction in transactions])
+        db.execute('DELETE FROM spends WHERE spent_by IN '
+                   '(SELECT value FROM json_each(?))', (ids,))
+        db.execute('DELETE FROM owners WHERE transaction_id IN '
+                   '(SELECT value FROM json_each(?))', (ids,))
+    db.executemany(
+        'INSERT OR {} INTO transactions (id, operation, asset_id, '
+        'block_height, block_index, body) VALUES (?, ?, ?, ?, ?, ?)'.format(
+            'REPLACE' if conn.replace else 'IGNORE'),
+        [(transaction['id'], transaction['operation'],
+          (transaction.get('asset') or {}).get('id'), height,
+          None if height is None else index, _dumps(transaction))
+         for index, transaction in enumerate(transactions)])
+    db.executemany(
+        'INSERT OR IGNORE INTO spends (transaction_id, output_index, spent_by) '
+        'VALUES (?, ?, ?)',
+        [(input_['fulfills']['transaction_id'],
+          input_['fulfills']['output_index'], transaction['id'])
+         for transaction in transactions
+         for input_ in transaction['inputs'] if input_.get('fulfills')])
+    db.executemany(
+        'INSERT OR IGNORE INTO owners (public_key, transaction_id, output_index) '
+        'VALUES (?, ?, ?)',
+        [(public_key, transaction['id'], index)
+         for transaction in transactions
+         for index, output in enumerate(transaction['outputs'])
+         for public_key in output['public_keys']])
+
+
+def _write_documents(conn, db, table, documents):
+    search_table, field = SEARCH_TABLES[table]
+    on_conflict = 'DO UPDATE SET {0} = excluded.{0}'.format(field) \
+        if conn.replace else 'DO NOTHING'
+    for document in documents:
+        value = document.get(field)
+        written = db.execute(
+            f'INSERT INTO {table} (id, {field}) VALUES (?, ?) '
+            f'ON CONFLICT (id) {on_conflict}', (document['id'], _dumps(value)))
+        if written.rowcount:
+            db.execute(f'INSERT OR REPLACE INTO {search_table} (rowid, text) '
+                       f'SELECT rowid, ? FROM {table} WHERE id = ?',
+                       (search_text(value), document['id']))
+
+
+def _write_block(db, block):
+    written = db.execute('INSERT OR IGNORE INTO blocks (height, body) '
+                         'VALUES (?, ?)', (block['height'], _dumps(block)))
+    if written.rowcount:
+        db.executemany('INSERT OR IGNORE INTO block_transactions '
+                       '(transaction_id, height) VALUES (?, ?)',
+                       [(transaction_id, block['height'])
+                        for transaction_id in block.get('transactions', ())])
+
+
+def _write_utxos(db, utxos):
+    db.executemany('INSERT OR IGNORE INTO utxos (transaction_id, '
+                   'output_index, body) VALUES (?, ?, ?)',
+                   [(utxo['transaction_id'], utxo['output_index'], _dumps(utxo))
+                    for utxo in utxos])
+
+
+def _delete_utxos(db, utxos):
+    db.executemany('DELETE FROM utxos WHERE transaction_id = ? '
+                   'AND output_index = ?',
+                   [(utxo['transaction_id'], utxo['output_index'])
+                    for utxo in utxos])
+
+
+@register_query(SQLiteConnection)
+def store_transactions(conn, signed_transactions):
+    with conn.transaction() as db:
+        _write_transactions(conn, db, signed_transactions)
+
+
+@register_query(SQLiteConnection)
+def get_transaction(conn, transaction_id):
+    return next(_bodies(conn.run('SELECT body FROM transactions WHERE id = ?',
+                                 (transaction_id,))), None)
+
+
+@register_query(SQLiteConnection)
+def get_transactions(conn, transaction_ids):
+    return _bodies(conn.run(
+        'SELECT tx.body FROM json_each(?) AS ids '
+        'JOIN transactions AS tx ON tx.id = ids.value ORDER BY ids.key',
+        (_dumps(list(transaction_ids)),)))
+
+
+@register_query(SQLiteConnection)
+def get_transaction_ids(conn):
+    return (id_ for id_, in conn.run('SELECT id FROM transactions'))
+
+
+HYDRATE_TRANSACTIONS = \
+    'SELECT tx.body, asset.data, meta.metadata FROM json_each(?) AS ids ' \
+    'JOIN transactions AS tx ON tx.id = ids.value ' \
+    'LEFT JOIN assets AS asset ON asset.id = tx.id ' \
+    'LEFT JOIN metadata AS meta ON meta.id = tx.id ' \
+    'ORDER BY ids.key'
+
+
+def _hydrate(rows):
+    for body, data, metadata in rows:
+        transaction = json.loads(body)
+        transaction['metadata'] = None if metadata is None else json.loads(metadata)
+        if data is not None:
+            transaction['asset'] = {'data': json.loads(data)}
+        yield transaction
+
+
+def _hydrated_transactions(conn, transaction_ids):
+    return _hydrate(conn.run(HYDRATE_TRANSACTIONS,
+                             (_dumps(list(transaction_ids)),)))
+
+
+@register_query(SQLiteConnection)
+def get_hydrated_transaction(conn, transaction_id):
+    return next(_hydrated_transactions(conn, [transaction_id]), None)
+
+
+@register_query(SQLiteConnection)
+def get_hydrated_transactions(conn, transaction_ids):
+    return list(_hydrated_transactions(conn, transaction_ids))
+
+
+@register_query(SQLiteConnection)
+def store_metadatas(conn, metadata):
+    with conn.transaction() as db:
+        _write_documents(conn, db, 'metadata', metadata)
+
+
+@register_query(SQLiteConnection)
+def get_metadata(conn, transaction_ids):
+    rows = conn.run('SELECT meta.id, meta.metadata FROM json_each(?) AS ids '
+                    'JOIN metadata AS meta ON meta.id = ids.value '
+                    'ORDER BY ids.key', (_dumps(list(transaction_ids)),))
+    return ({'id': id_, 'metadata': json.loads(metadata)}
+            for id_, metadata in rows)
+
+
+@register_query(SQLiteConnection)
+def store_asset(conn, asset):
+    store_assets(conn, [asset])
+
+
+@register_query(SQLiteConnection)
+def store_assets(conn, assets):
+    with conn.transaction() as db:
+        _write_documents(conn, db, 'assets', assets)
+
+
+@register_query(SQLiteConnection)
+def get_asset(conn, asset_id):
+    return next(get_assets(conn, [asset_id]), None)
+
+
+@register_query(SQLiteConnection)
+def get_assets(conn, asset_ids):
+    rows = conn.run('SELECT asset.data FROM json_each(?) AS ids '
+                    'JOIN assets AS asset ON asset.id = ids.value '
+                    'ORDER BY ids.key', (_dumps(list(asset_ids)),))
+    return ({'data': json.loads(data)} for data, in rows)
+
+
+@register_query(SQLiteConnection)
+def get_spent(conn, transaction_id, output):
+    return _bodies(conn.run(
+        'SELECT tx.body FROM spends '
+        'JOIN transactions AS tx ON tx.id = spends.spent_by '
+        'WHERE spends.transaction_id = ? AND spends.output_index = ?',
+        (transaction_id, output)))
+
+
+SPENDS_OF_OUTPUTS = \
+    "FROM json_each(?) AS outputs JOIN spends " \
+    "ON spends.transaction_id = json_extract(outputs.value, '$.transaction_id') " \
+    "AND spends.output_index = json_extract(outputs.value, '$.output_index') "
+
+
+@register_query(SQLiteConnection)
+def get_spent_outputs(conn, outputs):
+    rows = conn.run('SELECT spends.transaction_id, spends.output_index, '
+                    'spends.spent_by ' + SPENDS_OF_OUTPUTS,
+                    (_dumps(list(outputs)),))
+    return ({'fulfills': {'transaction_id': transaction_id,
+                          'output_index': output_index},
+             'spent_by': spent_by}
+            for transaction_id, output_index, spent_by in rows)
+
+
+@register_query(SQLiteConnection)
+def get_spending_transactions(conn, inputs):
+    return _bodies(conn.run(
+        'SELECT tx.body FROM transactions AS tx WHERE tx.id IN '
+        '(SELECT spends.spent_by ' + SPENDS_OF_OUTPUTS + ')',
+        (_dumps(list(inputs)),)))
+
+
+@register_query(SQLiteConnection)
+def get_latest_block(conn):
+    return next(_bodies(conn.run(
+        'SELECT body FROM blocks ORDER BY height DESC LIMIT 1')), None)
+
+
+@register_query(SQLiteConnection)
+def store_block(conn, block):
+    with conn.transaction() as db:
+        _write_block(db, block)
+
+
+@register_query(SQLiteConnection)
+def commit_block(conn, block, transactions, assets, metadata,
+                 unspent_outputs, spent_outputs):
+    # A single transaction: the block is synced to disk at once, and a
+    # crash never leaves it half written.
+    with conn.transaction() as db:
+        _write_documents(conn, db, 'metadata', metadata)
+        _write_documents(conn, db, 'assets', assets)
+        _write_transactions(conn, db, transactions, block['height'])
+        # Outputs created and spent in the same block are inserted and then
+        # removed right away, so new outputs must be stored first.
+        _write_utxos(db, unspent_outputs)
+        _delete_utxos(db, spent_outputs)
+        _write_block(db, block)
+
+
+@register_query(SQLiteConnection)
+def get_block(conn, block_id):
+    return next(_bodies(conn.run('SELECT body FROM blocks WHERE height = ?',
+                                 (block_id,))), None)
+
+
+@register_query(SQLiteConnection)
+def get_block_with_transaction(conn, txid):
+    rows = conn.run('SELECT height FROM block_transactions '
+                    'WHERE transaction_id = ?', (txid,))
+    return ({'height': height} for height, in rows)
+
+
+GET_TRANSFERS = \
+    'SELECT id FROM transactions WHERE asset_id = :asset_id ' \
+    'AND (:operation IS NULL OR operation = :operation) '
+
+# NOTE: the sort follows the `asset_history` index. Transactions stored
+# outside of a block have no position: they come first, ordered by id.
+GET_TRANSFERS_AFTER = GET_TRANSFERS + \
+    'AND (:height IS NULL OR (coalesce(block_height, -1), ' \
+    'coalesce(block_index, -1), id) > (:height, :index, :id)) ' \
+    'ORDER BY block_height, block_index, id LIMIT :limit'
+
+GET_LAST_TRANSFER = GET_TRANSFERS + \
+    'ORDER BY block_height DESC, block_index DESC, id DESC LIMIT 1'
+
+
+@register_query(SQLiteConnection)
+def get_txids_filtered(conn, asset_id, operation=None, last_tx=False,
+                       after=None, limit=None):
+    parameters = {'asset_id': asset_id, 'operation': operation}
+    creation = [id_ for id_, in conn.run(
+        'SELECT id FROM transactions WHERE id = :asset_id '
+        'AND (:operation IS NULL OR operation = :operation)', parameters)]
+    if last_tx:
+        last = [id_ for id_, in conn.run(GET_LAST_TRANSFER, parameters)]
+        return iter(last or creation)
+
+    parameters.update(height=None, index=None, id=None)
+    if after == asset_id:
+        # Everything but the creation, i.e. the transfers from the start
+        creation = []
+    elif after is not None:
+        position = next(conn.run('SELECT block_height, block_index '
+                                 'FROM transactions WHERE id = ?', (after,)),
+                        None)
+        if position is None:
+            return iter([])
+        creation = []
+        # Transactions stored outside of a block come before any block.
+        height, index = position
+        parameters.update(height=-1 if height is None else height,
+                          index=-1 if index is None else index, id=after)
+
+    if limit:
+        limit -= len(creation)
+        if limit <= 0:
+            return iter(creation)
+    transfers = conn.run(GET_TRANSFERS_AFTER, dict(parameters, limit=limit or -1))
+    return iter(creation + [id_ for id_, in transfers])
+
+
+def _traverse(conn, start, neighbours, depth=None, limit=None):
+    # Breadth first, one query per level, so that the closest transactions
+    # come first.
+    seen = set(start)
+    level = list(start)
+    levels = 0
+    while level:
+        if limit is not None:
+            level = level[:limit]
+            limit -= len(level)
+        yield from level
+        if levels == depth or limit == 0:
+            return
+        levels += 1
+        level = [id_ for id_, in conn.run(neighbours, (_dumps(level),))
+                 if id_ not in seen]
+        seen.update(level)
+
+
+@register_query(SQLiteConnection)
+def get_provenance(conn, transaction_id, output_index, depth=None,
+                   limit=None):
+    start = [id_ for id_, in conn.run(
+        'SELECT id FROM transactions WHERE id = ? '
+        "AND ? < json_array_length(body, '$.outputs')",
+        (transaction_id, output_index))]
+    ids = list(_traverse(conn, start,
+                         'SELECT DISTINCT spends.transaction_id '
+                         'FROM json_each(?) AS ids JOIN spends '
+                         'ON spends.spent_by = ids.value', depth, limit))
+    return _hydrated_transactions(conn, ids)
+
+
+@register_query(SQLiteConnection)
+def get_descendants(conn, transaction_id, output_index, depth=None,
+                    limit=None):
+    start = [id_ for id_, in conn.run(
+        'SELECT spent_by FROM spends WHERE transaction_id = ? '
+        'AND output_index = ?', (transaction_id, output_index))]
+    ids = list(_traverse(conn, start,
+                         'SELECT DISTINCT spends.spent_by '
+                         'FROM json_each(?) AS ids JOIN spends '
+                         'ON spends.transaction_id = ids.value', depth, limit))
+    return _hydrated_transactions(conn, ids)
+
+
+@register_query(SQLiteConnection)
+def text_search(conn, search, *, language='english', case_sensitive=False,
+                diacritic_sensitive=False, text_score=False, limit=0, table='assets'):
+    # NOTE: the search always goes through the `porter` tokenizer (English
+    # stemming, case and accent insensitive), `language`, `case_sensitive`
+    # and `diacritic_sensitive` are not supported. Terms are OR-ed, and the
+    # best matches (BM25) come first.
+    try:
+        search_table, field = SEARCH_TABLES[table]
+    except KeyError:
+        raise OperationError('Text search is not supported on `{}`'.format(table))
+    terms = re.findall(r'\w+', search)
+    if not terms:
+        return iter([])
+    rows = conn.run(
+        f'SELECT doc.id, doc.{field}, -bm25({search_table}) '
+        f'FROM {search_table} JOIN {table} AS doc '
+        f'ON doc.rowid = {search_table}.rowid '
+        f'WHERE {search_table} MATCH ? ORDER BY rank LIMIT ?',
+        (' OR '.join('"{}"'.format(term) for term in terms), limit or -1))
+    return (dict({'id': id_, field: json.loads(value)},
+                 **({'score': score} if text_score else {}))
+            for id_, value, score in rows)
+
+
+@register_query(SQLiteConnection)
+def get_owned_ids(conn, owner):
+    return _bodies(conn.run(
+        'SELECT body FROM transactions WHERE id IN '
+        '(SELECT transaction_id FROM owners WHERE public_key = ?)', (owner,)))
+
+
+@register_query(SQLiteConnection)
+def get_owned_outputs(conn, owner):
+    rows = conn.run('SELECT transaction_id, output_index FROM owners '
+                    'WHERE public_key = ?', (owner,))
+    return ({'transaction_id': transaction_id, 'output_index': output_index}
+            for transaction_id, output_index in rows)
+
+
+@register_query(SQLiteConnection)
+def delete_transactions(conn, txn_ids):
+    ids = (_dumps(list(txn_ids)),)
+    with conn.transaction() as db:
+        db.execute('DELETE FROM spends WHERE spent_by IN '
+                   '(SELECT value FROM json_each(?))', ids)
+        db.execute('DELETE FROM owners WHERE transaction_id IN '
+                   '(SELECT value FROM json_each(?))', ids)
+        db.execute('DELETE FROM transactions WHERE id IN '
+                   '(SELECT value FROM json_each(?))', ids)
+        for table, (search_table, _) in SEARCH_TABLES.items():
+            db.execute(f'DELETE FROM {search_table} WHERE rowid IN '
+                       f'(SELECT rowid FROM {table} WHERE id IN '
+                       f'(SELECT value FROM json_each(?)))', ids)
+            db.execute(f'DELETE FROM {table} WHERE id IN '
+                       f'(SELECT value FROM json_each(?))', ids)
+
+
+@register_query(SQLiteConnection)
+def store_unspent_outputs(conn, *unspent_outputs):
+    with conn.transaction() as db:
+        _write_utxos(db, unspent_outputs)
+
+
+@register_query(SQLiteConnection)
+def delete_unspent_outputs(conn, *unspent_outputs):
+    with conn.transaction() as db:
+        _delete_utxos(db, unspent_outputs)
+
+
+@register_query(SQLiteConnection)
+def get_unspent_outputs(conn, *, query=None):
+    query = query or {}
+    where, parameters = '', []
+    for key, value in query.items():
+        where += ' AND json_extract(body, ?) = ?'
+        parameters += ['$."{}"'.format(key), value]
+    return _bodies(conn.run('SELECT body FROM utxos WHERE 1' + where,
+                            parameters))
+
+
+@register_query(SQLiteConnection)
+def get_utxos(conn, outputs):
+    rows = conn.run(
+        'SELECT utxos.transaction_id, utxos.output_index '
+        'FROM json_each(?) AS outputs JOIN utxos '
+        "ON utxos.transaction_id = json_extract(outputs.value, '$.transaction_id') "
+        "AND utxos.output_index = json_extract(outputs.value, '$.output_index')",
+        (_dumps(list(outputs)),))
+    return ({'transaction_id': transaction_id, 'output_index': output_index}
+            for transaction_id, output_index in rows)
+
+
+@register_query(SQLiteConnection)
+def store_pre_commit_state(conn, state):
+    with conn.transaction() as db:
+        db.execute('INSERT OR REPLACE INTO pre_commit (height, body) '
+                   'VALUES (?, ?)', (state['height'], _dumps(state)))
+
+
+@register_query(SQLiteConnection)
+def get_pre_commit_state(conn):
+    return next(_bodies(conn.run(
+        'SELECT body FROM pre_commit ORDER BY height DESC LIMIT 1')), None)
+
+
+@register_query(SQLiteConnection)
+def store_validator_set(conn, validators_update):
+    with conn.transaction() as db:
+        db.execute('INSERT OR REPLACE INTO validators (height, body) '
+                   'VALUES (?, ?)',
+                   (validators_update['height'], _dumps(validators_update)))
+
+
+@register_query(SQLiteConnection)
+def delete_validator_set(conn, height):
+    with conn.transaction() as db:
+        db.execute('DELETE FROM validators WHERE height = ?', (height,))
+
+
+@register_query(SQLiteConnection)
+def get_validator_set(conn, height=None):
+    return next(_bodies(conn.run(
+        'SELECT body FROM validators WHERE :height IS NULL OR height <= :height '
+        'ORDER BY height DESC LIMIT 1', {'height': height})), None)
+
+
+@register_query(SQLiteConnection)
+def store_election(conn, election_id, height, is_concluded):
+    store_elections(conn, [{'election_id': election_id, 'height': height,
+                            'is_concluded': is_concluded}])
+
+
+@register_query(SQLiteConnection)
+def store_elections(conn, elections):
+    with conn.transaction() as db:
+        db.executemany('INSERT OR REPLACE INTO elections (election_id, height, '
+                       'body) VALUES (?, ?, ?)',
+                       [(election['election_id'], election['height'],
+                         _dumps(election)) for election in elections])
+
+
+@register_query(SQLiteConnection)
+def delete_elections(conn, height):
+    with conn.transaction() as db:
+        db.execute('DELETE FROM elections WHERE height = ?', (height,))
+
+
+@register_query(SQLiteConnection)
+def get_election(conn, election_id):
+    return next(_bodies(conn.run(
+        'SELECT body FROM elections WHERE election_id = ? '
+        'ORDER BY height DESC LIMIT 1', (election_id,))), None)
+
+
+@register_query(SQLiteConnection)
+def get_asset_tokens_for_public_key(conn, asset_id, public_key):
+    transactions = _bodies(conn.run(
+        'SELECT body FROM transactions WHERE (id = :asset_id OR '
+        'asset_id = :asset_id) AND id IN (SELECT transaction_id FROM owners '
+        'WHERE public_key = :public_key)',
+        {'asset_id': asset_id, 'public_key': public_key}))
+    return (transaction for transaction in transactions
+            if any(output['public_keys'] == [public_key]
+                   for output in transaction['outputs']))
+
+
+@register_query(SQLiteConnection)
+def store_abci_chain(conn, height, chain_id, is_synced=True):
+    with conn.transaction() as db:
+        db.execute('INSERT OR REPLACE INTO abci_chains (height, body) '
+                   'VALUES (?, ?)',
+                   (height, _dumps({'height': height, 'chain_id': chain_id,
+                                    'is_synced': is_synced})))
+
+
+@register_query(SQLiteConnection)
+def delete_abci_chain(conn, height):
+    with conn.transaction() as db:
+        db.execute('DELETE FROM abci_chains WHERE height = ?', (height,))
+
+
+@register_query(SQLiteConnection)
+def get_latest_abci_chain(conn):
+    return next(_bodies(conn.run(
+        'SELECT body FROM abci_chains ORDER BY height DESC LIMIT 1')), None)
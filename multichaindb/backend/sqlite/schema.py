@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+
+from multichaindb import backend
+from multichaindb.backend.search import search_text
+from multichaindb.backend.sqlite.connection import SQLiteConnection
+from multichaindb.backend.utils import module_dispatch_registrar
+from multichaindb.common.exceptions import DatabaseDoesNotExist
+
+logger = logging.getLogger(__name__)
+register_schema = module_dispatch_registrar(backend.schema)
+
+# Documents are stored as JSON in `body`, next to the columns the queries
+# filter on. Tables only looked up by their primary key are stored WITHOUT
+# ROWID, i.e. clustered on it.
+TABLES = {
+    'transactions': '(id TEXT PRIMARY KEY, operation TEXT NOT NULL, '
+                    'asset_id TEXT, block_height INTEGER, '
+                    'block_index INTEGER, body TEXT NOT NULL)',
+    # The rowid of assets and metadata is the one of their search entry.
+    'assets': '(id TEXT PRIMARY KEY, data TEXT)',
+    'metadata': '(id TEXT PRIMARY KEY, metadata TEXT)',
+    # One row per input: the output it spends, and the transaction spending
+    # it.
+    'spends': '(transaction_id TEXT, output_index INTEGER, spent_by TEXT, '
+              'PRIMARY KEY (transaction_id, output_index, spent_by)) '
+              'WITHOUT ROWID',
+    # One row per public key of an output.
+    'owners': '(public_key TEXT, transaction_id TEXT, output_index INTEGER, '
+              'PRIMARY KEY (public_key, transaction_id, output_index)) '
+              'WITHOUT ROWID',
+    'utxos': '(transaction_id TEXT, output_index INTEGER, body TEXT NOT NULL, '
+             'PRIMARY KEY (transaction_id, output_index)) WITHOUT ROWID',
+    'blocks': '(height INTEGER PRIMARY KEY, body TEXT NOT NULL)',
+    'block_transactions': '(transaction_id TEXT, height INTEGER, '
+                          'PRIMARY KEY (transaction_id, height)) WITHOUT ROWID',
+    'pre_commit': '(height INTEGER PRIMARY KEY, body TEXT NOT NULL)',
+    'validators': '(height INTEGER PRIMARY KEY, body TEXT NOT NULL)',
+    'elections': '(election_id TEXT, height INTEGER, body TEXT NOT NULL, '
+                 'PRIMARY KEY (election_id, height)) WITHOUT ROWID',
+    'abci_chains': '(height INTEGER PRIMARY KEY, body TEXT NOT NULL)',
+}
+
+INDEXES = {
+    'transactions': [
+        ('asset_history', '(asset_id, block_height, block_index, id)'),
+    ],
+    'spends': [
+        ('spent_by', '(spent_by)'),
+    ],
+    'owners': [
+        ('owned_by', '(transaction_id)'),
+    ],
+    'elections': [
+        ('election_height', '(height)'),
+    ],
+}
+
+# Full-text search tables, and the column of the documents they index.
+# English stemming; case and accent insensitive.
+SEARCH_TABLES = {
+    'assets': ('assets_search', 'data'),
+    'metadata': ('metadata_search', 'metadata'),
+}
+TOKENIZER = 'porter unicode61 remove_diacritics 2'
+
+
+@register_schema(SQLiteConnection)
+def create_database(conn, dbname):
+    logger.info('Create database `%s`.', dbname)
+    os.makedirs(conn.path, exist_ok=True)
+    conn.conn
+
+
+@register_schema(SQLiteConnection)
+def create_tables(conn, dbname):
+    with conn.transaction() as db:
+        for table_name, columns in TABLES.items():
+            logger.info(f'Create `{table_name}` table.')
+            db.execute(f'CREATE TABLE IF NOT EXISTS {table_name} {columns}')
+            for index_name, index_columns in INDEXES.get(table_name, ()):
+                db.execute(f'CREATE INDEX IF NOT EXISTS {index_name} '
+                           f'ON {table_name} {index_columns}')
+        for search_table, _ in SEARCH_TABLES.values():
+            db.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {search_table} '
+                       f'USING fts5(text, tokenize="{TOKENIZER}")')
+
+
+@register_schema(SQLiteConnection)
+def drop_database(conn, dbname):
+    filename = conn.filename
+    if not os.path.exists(filename):
+        raise DatabaseDoesNotExist('Database `{}` does not exist'.format(dbname))
+    conn.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(filename + suffix):
+            os.remove(filename + suffix)
+
+
+@register_schema(SQLiteConnection)
+def key_collections_by_id(conn, dbname):
+    logger.info('Tables of the sqlite backend are always keyed by id.')
+
+
+@register_schema(SQLiteConnection)
+def index_text_search(conn, dbname):
+    with conn.transaction() as db:
+        for table_name, (search_table, field) in SEARCH_TABLES.items():
+            logger.info(f'Rebuild `{search_table}` from `{table_name}`.')
+            db.execute(f'DELETE FROM {search_table}')
+            rows = db.execute(f'SELECT rowid, {field} FROM {table_name}')
+            db.executemany(f'INSERT INTO {search_table} (rowid, text) '
+                           'VALUES (?, ?)',
+                           ((rowid, search_text(json.loads(value)))
+                            for rowid, value in rows))
+
+
+@register_schema(SQLiteConnection)
+def store_block_positions(conn, dbname):
+    with conn.transaction() as db:
+        logger.info('Store the block position of the committed transactions.')
+        db.execute(
+            'UPDATE transactions SET block_height = '
+            '(SELECT min(height) FROM block_transactions '
+            'WHERE transaction_id = transactions.id) '
+            'WHERE block_height IS NULL')
+        db.execute(
+            "UPDATE transactions SET block_index = "
+            "(SELECT CAST(position.key AS INTEGER) "
+            "FROM blocks, json_each(blocks.body, '$.transactions') AS position "
+            "WHERE blocks.height = transactions.block_height "
+            "AND position.value = transactions.id) "
+            "WHERE block_height IS NOT NULL AND block_index IS NULL")
+
+
+@register_schema(SQLiteConnection)
+def build_spend_graph(conn, dbname):
+    logger.info('The sqlite backend always indexes the spent outputs.')
+
+
+@register_schema(SQLiteConnection)
+def rebuild_utxos(conn, dbname):
+    with conn.transaction() as db:
+        logger.info('Rebuild `utxos` from the stored transactions.')
+        db.execute('DELETE FROM utxos')
+        # Mirrors `Transaction.unspent_outputs`: CREATE-like transactions are
+        # stored without their asset, and define the asset with their own id.
+        db.execute(
+            "INSERT INTO utxos "
+            "SELECT tx.id, output.key, json_object("
+                "'transaction_id', tx.id, 'output_index', output.key, "
+                "'amount', CAST(json_extract(output.value, '$.amount') AS INTEGER), "
+                "'asset_id', coalesce(tx.asset_id, tx.id), "
+                "'condition_uri', json_extract(output.value, '$.condition.uri')) "
+            "FROM transactions AS tx, json_each(tx.body, '$.outputs') AS output "
+            "WHERE NOT EXISTS (SELECT 1 FROM spends "
+                "WHERE spends.transaction_id = tx.id "
+                "AND spends.output_index = output.key)")
@@ -0,0 +1,98 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Bloom filters over strings.
+
+A bloom filter answers "maybe" or "no" to membership queries: it has false
+positives, at a rate chosen when it is created, but never false negatives.
+Items can be added but not removed.
+"""
+
+from hashlib import blake2b
+from math import ceil, log
+
+
+# Initial capacity and false positive rate of a `ScalableBloomFilter`.
+INITIAL_CAPACITY = 1000000
+ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """A bloom filter sized for ``capacity`` items.
+
+    Past ``capacity`` items, the false positive rate grows above
+    ``error_rate``.
+
+    Args:
+        capacity (int): the expected number of items.
+        error_rate (float): the false positive rate with ``capacity``
+            items.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = ceil(-capacity * log(error_rate) / log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, item):
+        # Double hashing: the k indexes are derived from two 64 bit hashes.
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size
+                for i in range(self.hash_count)]
+
+    def add(self, item):
+        for index in self._indexes(item):
+            self.bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[index >> 3] & (1 << (index & 7))
+                   for index in self._indexes(item))
+
+
+class ScalableBloomFilter:
+    """A bloom filter that grows with the number of items.
+
+    When its current filter is full, a new one twice as large and with half
+    the false positive rate is added, so that the overall false positive
+    rate stays below ``error_rate`` whatever the number of items.
+
+    Args:
+        items (iterable): the items to add.
+        capacity (int): the capacity of the first filter.
+        error_rate (float): the bound of the false positive rate.
+    """
+
+    def __init__(self, items=(), capacity=INITIAL_CAPACITY,
+                 error_rate=ERROR_RATE):
+        # The rates of the filters are error_rate / 2, / 4, ..., and their
+        # sum stays below error_rate.
+        self.filters = [BloomFilter(capacity, error_rate / 2)]
+        self.nbytes = len(self.filters[0].bits)
+        self.update(items)
+
+    def add(self, item):
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * 2,
+                                  current.error_rate / 2)
+            self.filters.append(current)
+            self.nbytes += len(current.bits)
+        current.add(item)
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        return any(item in bloom_filter for bloom_filter in self.filters)
+
+    def __len__(self):
+        return sum(bloom_filter.count for bloom_filter in self.filters)
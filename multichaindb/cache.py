@@ -0,0 +1,98 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Read cache of the chain data that never changes once written.
+
+Stored transactions (with their asset and metadata) and blocks are never
+modified, so they can be cached without ever being invalidated, except
+when they are deleted, i.e. on rollback.
+"""
+
+import threading
+from collections import OrderedDict
+
+import rapidjson
+
+import multichaindb
+
+
+class ReadCache:
+    """A least recently used cache of JSON values, bounded in bytes.
+
+    Values are stored serialized: their size is known exactly, and callers
+    get a fresh copy they are free to modify.
+
+    Args:
+        max_bytes (int): the maximum size of the cached values. ``0``
+            disables the cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value cached for ``key``, or ``None``."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return rapidjson.loads(data)
+
+    def put(self, key, value):
+        """Cache ``value`` for ``key``, evicting the least recently used
+        values if needed.
+        """
+        data = rapidjson.dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self._entries[key] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def discard(self, key):
+        with self._lock:
+            data = self._entries.pop(key, None)
+            if data is not None:
+                self.bytes -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Return the hit and miss counters, and the size of the cache."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'bytes': self.bytes}
+
+
+_read_cache = None
+_read_cache_lock = threading.Lock()
+
+
+def get_read_cache():
+    """Return the read cache shared by the MultiChainDB instances of this
+    process, sized by ``cache.max_bytes``.
+    """
+    global _read_cache
+    with _read_cache_lock:
+        if _read_cache is None:
+            _read_cache = ReadCache(multichaindb.config['cache']['max_bytes'])
+        return _read_cache
@@ -270,6 +270,57 @@ def run_drop(args):
         print("Cannot drop '{name}'. The database does not exist.".format(name=dbname), file=sys.stderr)
 
 
+@configure_multichaindb
+def run_key_by_id(args):
+    """Re-key transactions, assets and metadata by their id"""
+    dbname = multichaindb.config['database']['name']
+
+    if not args.yes:
+        response = input_on_stderr('Stop the node before migrating `{}`. '
+                                   'Continue? [y/n]: '.format(dbname))
+        if response != 'y':
+            return
+
+    conn = backend.connect()
+    schema.key_collections_by_id(conn, dbname)
+    print('Migration done. Set `database.key_by_id` to `true` in the '
+          'configuration before starting the node.', file=sys.stderr)
+
+
+@configure_multichaindb
+def run_rebuild_utxos(args):
+    """Rebuild the UTXO set from the stored transactions"""
+    dbname = multichaindb.config['database']['name']
+    conn = backend.connect()
+    schema.rebuild_utxos(conn, dbname)
+
+
+@configure_multichaindb
+def run_store_block_positions(args):
+    """Store the block position of the committed transactions"""
+    dbname = multichaindb.config['database']['name']
+    conn = backend.connect()
+    schema.store_block_positions(conn, dbname)
+
+
+@configure_multichaindb
+def run_index_text_search(args):
+    """Make the stored assets and metadata searchable"""
+    dbname = multichaindb.config['database']['name']
+    conn = backend.connect()
+    schema.index_text_search(conn, dbname)
+
+
+@configure_multichaindb
+def run_build_spend_graph(args):
+    """Build the spend graph from the stored transactions"""
+    dbname = multichaindb.config['database']['name']
+    conn = backend.connect()
+    schema.build_spend_graph(conn, dbname)
+    print('Spend graph built. Set `database.spend_graph` to `true` in the '
+          'configuration to keep it up to date.', file=sys.stderr)
+
+
 def run_recover(b):
     rollback(b)
 
@@ -282,6 +333,13 @@ def run_start(args):
     setup_logging()
 
     logger.info('MultiChainDB Version %s', multichaindb.__version__)
+    # The web API and the validation workers run in processes of their own,
+    # which would each see an empty in-memory database.
+    if multichaindb.config['database']['backend'] == 'memory':
+        logger.error('The `memory` backend is for benchmarks and tests, it '
+                     'cannot run a node. Configure another backend.')
+        sys.exit(1)
+
     run_recover(multichaindb.lib.MultiChainDB())
 
     if not args.skip_initialize_database:
@@ -319,12 +377,13 @@ def create_parser():
                                           help='Prepare the config file.')
 
     config_parser.add_argument('backend',
-                               choices=['localarangodb'],
+                               choices=['localarangodb', 'sqlite', 'memory'],
                                default='localarangodb',
                                const='localarangodb',
                                nargs='?',
-                               help='The backend to use. It can only be '
-                               '"localarangodb", currently.')
+                               help='The backend to use: "localarangodb", '
+                               '"sqlite" for single node deployments, or '
+                               '"memory" for benchmarks and tests.')
 
     # parser for managing elections
     election_parser = subparsers.add_parser('election',
@@ -373,6 +432,27 @@ def create_parser():
     subparsers.add_parser('drop',
                           help='Drop the database')
 
+    subparsers.add_parser('rebuild-utxos',
+                          help='Rebuild the UTXO set from the stored '
+                               'transactions')
+
+    subparsers.add_parser('store-block-positions',
+                          help='Store the block position of the committed '
+                               'transactions, to page through the history '
+                               'of their asset')
+
+    subparsers.add_parser('index-text-search',
+                          help='Index the stored assets and metadata for '
+                               'text search')
+
+    subparsers.add_parser('build-spend-graph',
+                          help='Build the graph of the outputs spent by '
+                               'the stored transactions')
+
+    subparsers.add_parser('key-by-id',
+                          help='Migrate the database to use transaction ids '
+                               'as document keys')
+
     # parser for starting BigchainDB
     start_parser = subparsers.add_parser('start',
                                          help='Start BigchainDB')
@@ -12,6 +12,8 @@ except ImportError:
     from sha3 import sha3_256
 
 from cryptoconditions import crypto
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
 
 
 CryptoKeypair = namedtuple('CryptoKeypair', ('private_key', 'public_key'))
@@ -41,6 +43,28 @@ PrivateKey = crypto.Ed25519SigningKey
 PublicKey = crypto.Ed25519VerifyingKey
 
 
+def ed25519_verify(public_key, message, signature):
+    """Return whether ``signature`` is a valid Ed25519 signature of
+    ``message`` by ``public_key`` (all bytes).
+    """
+    try:
+        VerifyKey(public_key).verify(message, signature)
+    except (BadSignatureError, TypeError, ValueError):
+        return False
+    return True
+
+
+def ed25519_verify_batch(signatures):
+    """Return whether all the ``(public_key, message, signature)`` of
+    ``signatures`` are valid Ed25519 signatures.
+
+    libsodium has no batch verification, so the signatures are verified
+    one by one. A library with a real batch primitive can be plugged in
+    instead, see :func:`~multichaindb.config_utils.load_batch_verifier`.
+    """
+    return all(ed25519_verify(*signature) for signature in signatures)
+
+
 def key_pair_from_ed25519_key(hex_private_key):
     """Generate base58 encode public-private key pair from a hex encoded private key"""
     priv_key = crypto.Ed25519SigningKey(bytes.fromhex(hex_private_key)[:32], encoding='bytes')
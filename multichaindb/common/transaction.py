@@ -952,7 +952,7 @@ class Transaction(object):
                     message.digest(), base58.b58decode(private_key.encode()))
         return input_
 
-    def inputs_valid(self, outputs=None):
+    def inputs_valid(self, outputs=None, prevalidated=False):
         """Validates the Inputs in the Transaction against given
         Outputs.
 
@@ -965,6 +965,10 @@ class Transaction(object):
                 outputs (:obj:`list` of :class:`~bigchaindb.common.
                     transaction.Output`): A list of Outputs to check the
                     Inputs against.
+                prevalidated (bool): whether the signatures were already
+                    verified, from the exact same bytes (see
+                    `multichaindb.mempool`). Only the conditions of the
+                    Outputs spent are checked then.
 
             Returns:
                 bool: If all Inputs are valid.
@@ -975,16 +979,16 @@ class Transaction(object):
             #       values to the actual method. This simplifies it's logic
             #       greatly, as we do not have to check against `None` values.
             return self._inputs_valid(['dummyvalue'
-                                       for _ in self.inputs])
+                                       for _ in self.inputs], prevalidated)
         elif self.operation == self.TRANSFER:
             return self._inputs_valid([output.fulfillment.condition_uri
-                                       for output in outputs])
+                                       for output in outputs], prevalidated)
         else:
             allowed_ops = ', '.join(self.__class__.ALLOWED_OPERATIONS)
             raise TypeError('`operation` must be one of {}'
                             .format(allowed_ops))
 
-    def _inputs_valid(self, output_condition_uris):
+    def _inputs_valid(self, output_condition_uris, prevalidated=False):
         """Validates an Input against a given set of Outputs.
 
             Note:
@@ -994,6 +998,8 @@ class Transaction(object):
             Args:
                 output_condition_uris (:obj:`list` of :obj:`str`): A list of
                     Outputs to check the Inputs against.
+                prevalidated (bool): whether the signatures were already
+                    verified.
 
             Returns:
                 bool: If all Outputs are valid.
@@ -1003,21 +1009,59 @@ class Transaction(object):
             raise ValueError('Inputs and '
                              'output_condition_uris must have the same count')
 
-        tx_dict = self.tx_dict if self.tx_dict else self.to_dict()
-        tx_dict = Transaction._remove_signatures(tx_dict)
-        tx_dict['id'] = None
-        tx_serialized = Transaction._to_str(tx_dict)
+        tx_serialized = self._signed_message()
 
         def validate(i, output_condition_uri=None):
             """Validate input against output condition URI"""
             return self._input_valid(self.inputs[i], self.operation,
-                                     tx_serialized, output_condition_uri)
+                                     tx_serialized, output_condition_uri,
+                                     prevalidated)
 
         return all(validate(i, cond)
                    for i, cond in enumerate(output_condition_uris))
 
+    def _signed_message(self):
+        """Return the serialization of the Transaction its Inputs sign."""
+        tx_dict = self.tx_dict if self.tx_dict else self.to_dict()
+        tx_dict = Transaction._remove_signatures(tx_dict)
+        tx_dict['id'] = None
+        return Transaction._to_str(tx_dict)
+
+    @staticmethod
+    def _input_message(input_, message):
+        """Return the digest signed by ``input_``, given the message signed
+        by all the Inputs (see :meth:`_signed_message`).
+        """
+        message = sha3_256(message.encode())
+        if input_.fulfills:
+            message.update('{}{}'.format(
+                input_.fulfills.txid, input_.fulfills.output).encode())
+        return message.digest()
+
+    def ed25519_signatures(self):
+        """Return the signature of each Input, if they are all fulfilled by
+        a single Ed25519 signature.
+
+            Returns:
+                list: the ``(public_key, message, signature)`` of each
+                Input, in bytes, or ``None`` if some Input has another
+                condition, e.g. a threshold.
+        """
+        tx_serialized = self._signed_message()
+        signatures = []
+        for input_ in self.inputs:
+            fulfillment = input_.fulfillment
+            if not isinstance(fulfillment, Ed25519Sha256) or \
+                    fulfillment.signature is None:
+                return None
+            signatures.append((fulfillment.public_key,
+                               self._input_message(input_, tx_serialized),
+                               fulfillment.signature))
+        return signatures
+
     @lru_cache(maxsize=16384)
-    def _input_valid(self, input_, operation, message, output_condition_uri=None):
+    def _input_valid(self, input_, operation, message, output_condition_uri=None,
+                     prevalidated=False):
         """Validates a single Input against a single Output.
 
             Note:
@@ -1031,6 +1075,8 @@ class Transaction(object):
                 message (str): The fulfillment message.
                 output_condition_uri (str, optional): An Output to check the
                     Input against.
+                prevalidated (bool): whether the signature was already
+                    verified: only the condition is checked then.
 
             Returns:
                 bool: If the Input is valid.
@@ -1049,17 +1095,19 @@ class Transaction(object):
         else:
             output_valid = output_condition_uri == ccffill.condition_uri
 
-        message = sha3_256(message.encode())
-        if input_.fulfills:
-            message.update('{}{}'.format(
-                input_.fulfills.txid, input_.fulfills.output).encode())
+        # Only the signature was verified already: the Input must still
+        # fulfill the condition of the Output it spends.
+        if prevalidated:
+            return output_valid
+
+        message = self._input_message(input_, message)
 
         # NOTE: We pass a timestamp to `.validate`, as in case of a timeout
         #       condition we'll have to validate against it
 
         # cryptoconditions makes no assumptions of the encoding of the
         # message to sign or verify. It only accepts bytestrings
-        ffill_valid = parsed_ffill.validate(message=message.digest())
+        ffill_valid = parsed_ffill.validate(message=message)
         return output_valid and ffill_valid
 
     # This function is required by `lru_cache` to create a key for memoization
@@ -1213,8 +1261,9 @@ class Transaction(object):
     @classmethod
     def from_db(cls, bigchain, tx_dict_list):
         """Helper method that reconstructs a transaction dict that was returned
-        from the database. It checks what asset_id to retrieve, retrieves the
-        asset from the asset table and reconstructs the transaction.
+        from the database. Transaction dicts that were not already hydrated
+        (i.e. that lack the ``metadata`` key) are fetched again together with
+        their asset and metadata, in a single query for the whole list.
 
         Args:
             bigchain (:class:`~bigchaindb.tendermint.BigchainDB`): An instance
@@ -1232,24 +1281,16 @@ class Transaction(object):
             return_list = False
 
         tx_map = {}
-        tx_ids = []
+        missing_ids = []
         for tx in tx_dict_list:
-            tx.update({'metadata': None})
+            if 'metadata' not in tx:
+                tx.update({'metadata': None})
+                missing_ids.append(tx['id'])
             tx_map[tx['id']] = tx
-            tx_ids.append(tx['id'])
-
-        assets = list(bigchain.get_assets(tx_ids))
-        for asset in assets:
-            if asset is not None:
-                tx = tx_map[asset['id']]
-                del asset['id']
-                tx['asset'] = asset
 
-        tx_ids = list(tx_map.keys())
-        metadata_list = list(bigchain.get_metadata(tx_ids))
-        for metadata in metadata_list:
-            tx = tx_map[metadata['id']]
-            tx.update({'metadata': metadata.get('metadata')})
+        if missing_ids:
+            for tx in bigchain.get_hydrated_transactions(missing_ids):
+                tx_map[tx['id']] = tx
 
         if return_list:
             tx_list = []
@@ -1276,13 +1317,22 @@ class Transaction(object):
     def validate_schema(cls, tx):
         pass
 
-    def validate_transfer_inputs(self, bigchain, current_transactions=[]):
+    def validate_transfer_inputs(self, bigchain, current_transactions=[],
+                                 prevalidated=False):
+        # Fetch every input transaction, and check every input for double
+        # spends, with one query each instead of one per input.
+        input_txids = list({input_.fulfills.txid for input_ in self.inputs})
+        committed_txs = {tx.id: tx for tx in self.from_db(
+            bigchain, bigchain.get_hydrated_transactions(input_txids))}
+        spent_links = bigchain.get_spent_outputs(
+            [input_.fulfills for input_ in self.inputs], current_transactions)
+
         # store the inputs so that we can check if the asset ids match
         input_txs = []
         input_conditions = []
         for input_ in self.inputs:
             input_txid = input_.fulfills.txid
-            input_tx = bigchain.get_transaction(input_txid)
+            input_tx = committed_txs.get(input_txid)
 
             if input_tx is None:
                 for ctxn in current_transactions:
@@ -1293,9 +1343,7 @@ class Transaction(object):
                 raise InputDoesNotExist("input `{}` doesn't exist"
                                         .format(input_txid))
 
-            spent = bigchain.get_spent(input_txid, input_.fulfills.output,
-                                       current_transactions)
-            if spent:
+            if input_.fulfills in spent_links:
                 raise DoubleSpend('input `{}` was already spent'
                                   .format(input_txid))
 
@@ -1324,7 +1372,7 @@ class Transaction(object):
                                ' in the outputs `{}`')
                               .format(input_amount, output_amount))
 
-        if not self.inputs_valid(input_conditions):
+        if not self.inputs_valid(input_conditions, prevalidated):
             raise InvalidSignature('Transaction signature is invalid.')
 
         return True
@@ -26,6 +26,7 @@ from functools import lru_cache
 from pkg_resources import iter_entry_points, ResolutionError
 
 from multichaindb.common import exceptions
+from multichaindb.common.crypto import ed25519_verify_batch
 
 import multichaindb
 
@@ -295,6 +296,33 @@ def load_validation_plugin(name=None):
     return plugin
 
 
+@lru_cache()
+def load_batch_verifier(name=None):
+    """Find and load the chosen Ed25519 batch verification primitive.
+
+    Args:
+        name (string): the name of the entry_point, as advertised in the
+            setup.py of the providing package.
+
+    Returns:
+        a function with the signature of
+        :func:`~multichaindb.common.crypto.ed25519_verify_batch`.
+    """
+    if not name:
+        return ed25519_verify_batch
+
+    verifier = None
+    for entry_point in iter_entry_points('multichaindb.ed25519_batch', name):
+        verifier = entry_point.load()
+
+    if not verifier:
+        raise ResolutionError(
+            'No plugin found in group `multichaindb.ed25519_batch` with '
+            'name `{}`'.format(name))
+
+    return verifier
+
+
 def load_events_plugins(names=None):
     plugins = []
 
@@ -12,6 +12,7 @@ import sys
 from abci.application import BaseApplication
 from abci import CodeTypeOk
 
+import multichaindb
 from multichaindb import MultiChainDB
 from multichaindb.elections.election import Election
 from multichaindb.version import __tm_supported_versions__
@@ -19,6 +20,7 @@ from multichaindb.utils import tendermint_version_is_compatible
 from multichaindb.tendermint_utils import (decode_transaction,
                                          calculate_hash)
 from multichaindb.lib import Block
+from multichaindb.mempool import ValidatedCache, ValidatedFeed, validated_key
 import multichaindb.upsert_validator.validator_utils as vutils
 from multichaindb.events import EventTypes, Event
 
@@ -38,6 +40,13 @@ class App(BaseApplication):
         super().__init__(abci)
         self.events_queue = events_queue
         self.multichaindb = multichaindb or MultiChainDB()
+        # Validating a CREATE transaction checks that it is not committed
+        # yet, which is almost never the case: let a bloom filter answer.
+        self.multichaindb.track_committed_transactions()
+        # Transactions that passed check_tx, or the HTTP API: their
+        # signatures are not verified again.
+        self.validated_transactions = ValidatedCache()
+        self.validated_feed = None
         self.block_txn_ids = []
         self.block_txn_hash = ''
         self.block_transactions = []
@@ -50,6 +59,31 @@ class App(BaseApplication):
                      'Download the new ABCI client and configure it with '
                      f'chain_id={chain_id} and validators={validators}.')
 
+    def listen_validated_transactions(self):
+        """Trust the transactions the HTTP API reports as validated, if
+        ``mempool.validated_socket`` is configured.
+
+        Only called when the node starts: a single ABCI application can
+        listen to the socket.
+        """
+        path = multichaindb.config['mempool']['validated_socket']
+        if not path:
+            return
+        try:
+            self.validated_feed = ValidatedFeed(path, self.validated_transactions)
+        except OSError as e:
+            logger.warning('Cannot listen to the transactions validated by '
+                           'the HTTP API on `%s`: %s', path, e)
+
+    def is_validated(self, transaction, raw_transaction):
+        """Return whether ``transaction`` already passed validation, from
+        the same ``raw_transaction``.
+        """
+        if self.validated_feed:
+            self.validated_feed.receive()
+        return (validated_key(transaction.get('id'), raw_transaction)
+                in self.validated_transactions)
+
     def abort_if_abci_chain_is_not_synced(self):
         if self.chain is None or self.chain['is_synced']:
             return
@@ -142,8 +176,12 @@ class App(BaseApplication):
 
         logger.debug('check_tx: %s', raw_transaction)
         transaction = decode_transaction(raw_transaction)
-        if self.multichaindb.is_valid_transaction(transaction):
+        prevalidated = self.is_validated(transaction, raw_transaction)
+        if self.multichaindb.is_valid_transaction(transaction,
+                                                  prevalidated=prevalidated):
             logger.debug('check_tx: VALID')
+            self.validated_transactions.add(
+                validated_key(transaction['id'], raw_transaction))
             return self.abci.ResponseCheckTx(code=CodeTypeOk)
         else:
             logger.debug('check_tx: INVALID')
@@ -156,6 +194,17 @@ class App(BaseApplication):
             return self.abci.ResponseCheckTx(code=CodeTypeError)
 
 
+    def check_txs(self, raw_transactions):
+        """Validate transactions received together before entry into the
+        mempool, see :meth:`check_tx`.
+
+        Returns:
+            list: the response to each transaction, in order.
+        """
+        return [self.check_tx(raw_transaction)
+                for raw_transaction in raw_transactions]
+
+
     def begin_block(self, req_begin_block):
         """Initialize list of transaction.
         Args:
@@ -184,8 +233,10 @@ class App(BaseApplication):
         self.abort_if_abci_chain_is_not_synced()
 
         logger.debug('deliver_tx: %s', raw_transaction)
+        transaction = decode_transaction(raw_transaction)
         transaction = self.multichaindb.is_valid_transaction(
-            decode_transaction(raw_transaction), self.block_transactions)
+            transaction, self.block_transactions,
+            prevalidated=self.is_validated(transaction, raw_transaction))
 
         if not transaction:
             logger.debug('deliver_tx: INVALID')
@@ -247,20 +298,21 @@ class App(BaseApplication):
 
         data = self.block_txn_hash.encode('utf-8')
 
-        # register a new block only when new transactions are received
-        if self.block_txn_ids:
-            self.multichaindb.store_bulk_transactions(self.block_transactions)
-
         block = Block(app_hash=self.block_txn_hash,
                       height=self.new_height,
                       transactions=self.block_txn_ids)
-        # NOTE: storing the block should be the last operation during commit
-        # this effects crash recovery. Refer BEP#8 for details
-        self.multichaindb.store_block(block._asdict())
+        # NOTE: the transactions, the UTXO set changes and the block are
+        # written atomically, with the block as the last operation. A crash
+        # during commit therefore never leaves transactions without their
+        # block. Refer BEP#8 for details
+        self.multichaindb.commit_block(block._asdict(), self.block_transactions)
 
         logger.debug('Commit-ing new block with hash: apphash=%s ,'
                      'height=%s, txn ids=%s', data, self.new_height,
                      self.block_txn_ids)
+        logger.debug('Read cache: %(hits)s hits, %(misses)s misses, '
+                     '%(entries)s entries, %(bytes)s bytes',
+                     self.multichaindb.read_cache.stats())
 
         if self.events_queue:
             event = Event(EventTypes.BLOCK_VALID, {
@@ -285,6 +337,9 @@ def rollback(b):
         sys.exit(1)
 
     # NOTE: the pre-commit state is always at most 1 block ahead of the commited state
+    # Transactions are committed atomically with their block (see
+    # `App.commit`), so only the artifacts written during `end_block`
+    # need to be cleaned up.
     if latest_block['height'] < pre_commit['height']:
         Election.rollback(b, pre_commit['height'], pre_commit['transactions'])
-        b.delete_transactions(pre_commit['transactions'])
+        b.read_cache.clear()
@@ -97,7 +97,7 @@ class Election(Transaction):
         return current_topology == voters
 
 
-    def validate(self, multichain, current_transactions=[]):
+    def validate(self, multichain, current_transactions=[], prevalidated=False):
         """Validate election transaction
 
         NOTE:
@@ -109,6 +109,7 @@ class Election(Transaction):
         Args:
             :param multichain: (MultiChainDB) an instantiated multichaindb.lib.MultiChainDB object.
             :param current_transactions: (list) A list of transactions to be validated along with the election
+            :param prevalidated: (bool) whether the signature was already verified
 
         Returns:
             Election: a Election object or an object of the derived Election subclass.
@@ -123,7 +124,7 @@ class Election(Transaction):
             raise DuplicateTransaction('transaction `{}` already exists'
                                        .format(self.id))
 
-        if not self.inputs_valid(input_conditions):
+        if not self.inputs_valid(input_conditions, prevalidated):
             raise InvalidSignature('Transaction signature is invalid.')
 
         current_validators = self.get_validators(multichain)
@@ -356,7 +357,7 @@ class Election(Transaction):
         # elections concluded at this height
         multichain.delete_elections(new_height)
 
-        txns = [multichain.get_transaction(tx_id) for tx_id in txn_ids]
+        txns = Transaction.from_db(multichain, multichain.get_hydrated_transactions(txn_ids))
 
         elections = cls._get_votes(txns)
         for election_id in elections:
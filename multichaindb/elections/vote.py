@@ -20,7 +20,7 @@ class Vote(Transaction):
     # Custom validation schema
     TX_SCHEMA_CUSTOM = TX_SCHEMA_VOTE
 
-    def validate(self, multichain, current_transactions=[]):
+    def validate(self, multichain, current_transactions=[], prevalidated=False):
         """Validate election vote transaction
         NOTE: There are no additional validity conditions on casting votes i.e.
         a vote is just a valid TRANFER transaction
@@ -36,7 +36,8 @@ class Vote(Transaction):
         Raises:
             ValidationError: If the election vote is invalid
         """
-        self.validate_transfer_inputs(multichain, current_transactions)
+        self.validate_transfer_inputs(multichain, current_transactions,
+                                      prevalidated)
         return self
 
 
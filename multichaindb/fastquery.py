@@ -3,7 +3,8 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
-from multichaindb.utils import condition_details_has_owner
+from itertools import islice
+
 from multichaindb.backend import query
 from multichaindb.common.transaction import TransactionLink
 
@@ -17,37 +18,45 @@ class FastQuery():
 
     def get_outputs_by_public_key(self, public_key):
         """Get outputs for a public key"""
-        txs = list(query.get_owned_ids(self.connection, public_key))
-        return [TransactionLink(tx['id'], index)
-                for tx in txs
-                for index, output in enumerate(tx['outputs'])
-                if condition_details_has_owner(output['condition']['details'],
-                                               public_key)]
+        outputs = query.get_owned_outputs(self.connection, public_key)
+        return (TransactionLink.from_dict(output) for output in outputs)
 
 
     def filter_spent_outputs(self, outputs):
         """Remove outputs that have been spent
 
         Args:
-            outputs: list of TransactionLink
+            outputs: iterable of TransactionLink
         """
-        links = [o.to_dict() for o in outputs]
-        txs = list(query.get_spending_transactions(self.connection, links))
-        spends = {TransactionLink.from_dict(input_['fulfills'])
-                  for tx in txs
-                  for input_ in tx['inputs']}
-        return [ff for ff in outputs if ff not in spends]
+        for chunk in self._chunks(outputs):
+            unspent = self._get_unspent_links(chunk)
+            yield from (ff for ff in chunk if ff in unspent)
 
 
     def filter_unspent_outputs(self, outputs):
         """Remove outputs that have not been spent
 
         Args:
-            outputs: list of TransactionLink
+            outputs: iterable of TransactionLink
         """
+        for chunk in self._chunks(outputs):
+            unspent = self._get_unspent_links(chunk)
+            yield from (ff for ff in chunk if ff not in unspent)
+
+
+    def _chunks(self, outputs):
+        # Check the outputs a batch at a time, so that memory does not grow
+        # with the number of outputs of the public key.
+        outputs = iter(outputs)
+        chunk = list(islice(outputs, self.connection.batch_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(outputs, self.connection.batch_size))
+
+
+    def _get_unspent_links(self, outputs):
+        # The UTXO set is maintained in the same atomic write as the
+        # blocks, so an output is unspent if and only if it is in there.
         links = [o.to_dict() for o in outputs]
-        txs = list(query.get_spending_transactions(self.connection, links))
-        spends = {TransactionLink.from_dict(input_['fulfills'])
-                  for tx in txs
-                  for input_ in tx['inputs']}
-        return [ff for ff in outputs if ff in spends]
+        return {TransactionLink.from_dict(utxo)
+                for utxo in query.get_utxos(self.connection, links)}
@@ -8,7 +8,7 @@ ArangoDB.
 
 """
 import logging
-from collections import namedtuple
+from collections import namedtuple, Counter
 from uuid import uuid4
 
 import rapidjson
@@ -24,13 +24,18 @@ import requests
 import multichaindb
 from multichaindb import backend, config_utils, fastquery
 from multichaindb.models import Transaction
+from multichaindb.common.transaction import TransactionLink
 from multichaindb.common.exceptions import (SchemaValidationError,
                                           ValidationError,
                                           DoubleSpend)
 from multichaindb.common.transaction_mode_types import (BROADCAST_TX_COMMIT,
                                                       BROADCAST_TX_ASYNC,
                                                       BROADCAST_TX_SYNC)
-from multichaindb.tendermint_utils import encode_transaction, merkleroot
+from multichaindb.bloom import ScalableBloomFilter
+from multichaindb.cache import get_read_cache
+from multichaindb.common.crypto import ed25519_verify
+from multichaindb.merkle import MerkleTree
+from multichaindb.tendermint_utils import encode_transaction
 from multichaindb import exceptions as core_exceptions
 from multichaindb.validation import BaseValidationRules
 
@@ -77,9 +82,25 @@ class MultiChainDB(object):
             self.validation = config_utils.load_validation_plugin(validationPlugin)
         else:
             self.validation = BaseValidationRules
+
+        self.batch_verifier = config_utils.load_batch_verifier(
+            multichaindb.config.get('ed25519_batch_verifier'))
         
         # Crea una connessione all'istanza del database ArangoDB locale
         self.connection = connection if connection else backend.connect(**multichaindb.config['database'])
+        # Merkle tree of the UTXO set, and the height of the block it
+        # reflects. Built on demand, then updated by `commit_block`.
+        self._utxo_tree = None
+        self._utxo_tree_height = None
+        # Bloom filter of the ids of the stored transactions, and the height
+        # of the block it reflects. Enabled by `track_committed_transactions`,
+        # built by the first `is_committed`, then updated by `commit_block`.
+        self._track_committed = False
+        self._committed = None
+        self._committed_height = None
+        # Stored transactions and blocks never change: reads of them go
+        # through a cache shared by the instances of the process.
+        self.read_cache = get_read_cache()
 
 
     def post_transaction(self, transaction, mode):
@@ -134,14 +155,20 @@ class MultiChainDB(object):
         return (202, '')
 
 
-    def store_bulk_transactions(self, transactions):
+    def _split_transactions(self, transactions):
+        """Split transactions into the documents stored in the
+        transactions, assets and metadata tables.
+        """
         txns = []
         assets = []
         txn_metadatas = []
         for t in transactions:
             transaction = t.tx_dict if t.tx_dict else rapidjson.loads(rapidjson.dumps(t.to_dict()))
+            # NOTE: work on a copy, `tx_dict` is shared with the memoized
+            # `Transaction` object.
+            transaction = dict(transaction)
             if transaction['operation'] == t.CREATE:
-                asset = transaction.pop('asset')
+                asset = dict(transaction.pop('asset'))
                 asset['id'] = transaction['id']
                 assets.append(asset)
 
@@ -149,6 +176,12 @@ class MultiChainDB(object):
             txn_metadatas.append({'id': transaction['id'],
                                   'metadata': metadata})
             txns.append(transaction)
+        return txns, assets, txn_metadatas
+
+
+    def store_bulk_transactions(self, transactions):
+        txns, assets, txn_metadatas = self._split_transactions(transactions)
+        self._discard_cached_transactions(txn['id'] for txn in txns)
 
         backend.query.store_metadatas(self.connection, txn_metadatas)
         if assets:
@@ -156,10 +189,44 @@ class MultiChainDB(object):
         return backend.query.store_transactions(self.connection, txns)
 
 
+    def commit_block(self, block, transactions):
+        """Store a block, its transactions and the resulting UTXO set
+        changes in a single, atomic backend operation.
+
+        Args:
+            block (dict): block with current height and block hash.
+            transactions (:obj:`list` of :obj:`~multichaindb.models.Transaction`):
+                the valid transactions included in the block.
+        """
+        txns, assets, txn_metadatas = self._split_transactions(transactions)
+        self._discard_cached_transactions(txn['id'] for txn in txns)
+        unspent_outputs = [utxo._asdict()
+                           for transaction in transactions
+                           for utxo in transaction.unspent_outputs]
+        spent_outputs = [spent_output
+                         for transaction in transactions
+                         for spent_output in transaction.spent_outputs]
+
+        result = backend.query.commit_block(self.connection, block, txns,
+                                            assets, txn_metadatas,
+                                            unspent_outputs, spent_outputs)
+        self._update_utxo_tree(block['height'], unspent_outputs, spent_outputs)
+        self._update_committed(block['height'], [txn['id'] for txn in txns])
+        return result
+
+
     def delete_transactions(self, txs):
+        self._discard_cached_transactions(txs)
         return backend.query.delete_transactions(self.connection, txs)
 
 
+    def _discard_cached_transactions(self, txn_ids):
+        # Transactions are only written again with `database.overwrite_mode`
+        # set to `replace`, or deleted on rollback.
+        for txn_id in txn_ids:
+            self.read_cache.discard(('transaction', txn_id))
+
+
     def update_utxoset(self, transaction):
         """Update the UTXO set given ``transaction``. That is, remove
         the outputs that the given ``transaction`` spends, and add the
@@ -193,38 +260,42 @@ class MultiChainDB(object):
 
 
     def get_utxoset_merkle_root(self):
-        """Returns the merkle root of the utxoset. This implies that
-        the utxoset is first put into a merkle tree.
-
-        For now, the merkle tree and its root will be computed each
-        time. This obviously is not efficient and a better approach
-        that limits the repetition of the same computation when
-        unnecesary should be sought. For instance, future optimizations
-        could simply re-compute the branches of the tree that were
-        affected by a change.
+        """Returns the merkle root of the utxoset.
 
-        The transaction hash (id) and output index should be sufficient
-        to uniquely identify a utxo, and consequently only that
-        information from a utxo record is needed to compute the merkle
-        root. Hence, each node of the merkle tree should contain the
-        tuple (txid, output_index).
+        The merkle tree (see :class:`~multichaindb.merkle.MerkleTree`) is
+        built from the database the first time, and then only updated with
+        the outputs created and spent by each block committed through
+        :meth:`commit_block`. It is built again if blocks were committed
+        by someone else in the meantime.
 
-        .. important:: The leaves of the tree will need to be sorted in
-            some kind of lexicographical order.
+        The transaction hash (id) and output index are sufficient to
+        uniquely identify a utxo, so each leaf of the tree is the hash of
+        (txid, output_index).
 
         Returns:
             str: Merkle root in hexadecimal form.
         """
-        utxoset = backend.query.get_unspent_outputs(self.connection)
-        # TODO Once ready, use the already pre-computed utxo_hash field.
-        # See common/transactions.py for details.
-        hashes = [
-            sha3_256(
-                '{}{}'.format(utxo['transaction_id'], utxo['output_index']).encode()
-            ).digest() for utxo in utxoset
-        ]
-        # TODO Notice the sorted call!
-        return merkleroot(sorted(hashes))
+        latest_block = self.get_latest_block()
+        height = latest_block['height'] if latest_block else 0
+        if self._utxo_tree is None or self._utxo_tree_height != height:
+            utxoset = backend.query.get_unspent_outputs(self.connection)
+            self._utxo_tree = MerkleTree(utxo_hash(utxo) for utxo in utxoset)
+            self._utxo_tree_height = height
+        return self._utxo_tree.root()
+
+
+    def _update_utxo_tree(self, height, unspent_outputs, spent_outputs):
+        if self._utxo_tree is None:
+            return
+        if self._utxo_tree_height != height - 1:
+            # The tree does not reflect the previous block: drop it and
+            # rebuild it on demand.
+            self._utxo_tree = None
+            return
+        self._utxo_tree.update(
+            inserted=[utxo_hash(utxo) for utxo in unspent_outputs],
+            deleted=[utxo_hash(utxo) for utxo in spent_outputs])
+        self._utxo_tree_height = height
 
 
     def get_unspent_outputs(self):
@@ -237,6 +308,23 @@ class MultiChainDB(object):
         return (record for record in cursor)
 
 
+    def get_unspent_links(self, links):
+        """Check which of the given outputs are in the UTXO set.
+
+        Args:
+            links (:obj:`list` of TransactionLink): the outputs to check.
+
+        Returns:
+            :obj:`set` of TransactionLink: the unspent outputs among
+            ``links``.
+        """
+        if not links:
+            return set()
+        outputs = [link.to_dict() for link in set(links)]
+        return {TransactionLink.from_dict(utxo)
+                for utxo in backend.query.get_utxos(self.connection, outputs)}
+
+
     def delete_unspent_outputs(self, *unspent_outputs):
         """Deletes the given ``unspent_outputs`` (utxos).
 
@@ -249,27 +337,79 @@ class MultiChainDB(object):
                                         self.connection, *unspent_outputs)
 
 
+    def track_committed_transactions(self):
+        """Keep the ids of the stored transactions in a bloom filter, so
+        that :meth:`is_committed` only queries the database for the ids
+        the filter may contain, i.e. almost never for new transactions.
+
+        The filter is built from the database by the first call to
+        :meth:`is_committed`, and then updated with the transactions of
+        each block committed through :meth:`commit_block`. It is built
+        again if blocks were committed by someone else in the meantime.
+        Transactions stored by other means, or by other processes, are
+        missed: only the process committing the blocks should track them.
+
+        The filter takes about 2 bytes per transaction. Past
+        ``cache.committed_max_bytes`` it is dropped for good, and the
+        database is queried for every id.
+        """
+        self._track_committed = True
+
+
+    def _build_committed(self):
+        max_bytes = multichaindb.config['cache']['committed_max_bytes']
+        latest_block = self.get_latest_block()
+        committed = ScalableBloomFilter()
+        for transaction_id in backend.query.get_transaction_ids(self.connection):
+            committed.add(transaction_id)
+            if committed.nbytes > max_bytes:
+                self._stop_tracking_committed()
+                return
+        self._committed = committed
+        self._committed_height = latest_block['height'] if latest_block else 0
+
+
+    def _stop_tracking_committed(self):
+        logger.warning('Too many committed transactions to keep their ids '
+                       'in memory, see `cache.committed_max_bytes`.')
+        self._track_committed = False
+        self._committed = None
+
+
+    def _update_committed(self, height, transaction_ids):
+        if self._committed is None:
+            return
+        if self._committed_height != height - 1:
+            # The filter does not reflect the previous block: build it
+            # again, this block included, when next needed.
+            self._committed = None
+            return
+        self._committed.update(transaction_ids)
+        self._committed_height = height
+        if self._committed.nbytes > \
+                multichaindb.config['cache']['committed_max_bytes']:
+            self._stop_tracking_committed()
+
+
     def is_committed(self, transaction_id):
+        if self._track_committed and self._committed is None:
+            self._build_committed()
+        if self._committed is not None and \
+                transaction_id not in self._committed:
+            return False
         transaction = backend.query.get_transaction(self.connection, transaction_id)
         return bool(transaction)
 
 
     def get_transaction(self, transaction_id):
-        transaction = backend.query.get_transaction(self.connection, transaction_id)
+        key = ('transaction', transaction_id)
+        transaction = self.read_cache.get(key)
+        if transaction is None:
+            transaction = backend.query.get_hydrated_transaction(self.connection, transaction_id)
+            if transaction:
+                self.read_cache.put(key, transaction)
 
         if transaction:
-            asset = backend.query.get_asset(self.connection, transaction_id)
-            metadata = backend.query.get_metadata(self.connection, [transaction_id])
-            if asset:
-                transaction['asset'] = asset
-
-            if 'metadata' not in transaction:
-                metadata = metadata[0] if metadata else None
-                if metadata:
-                    metadata = metadata.get('metadata')
-
-                transaction.update({'metadata': metadata})
-
             transaction = Transaction.from_dict(transaction)
 
         return transaction
@@ -278,17 +418,95 @@ class MultiChainDB(object):
     def get_transactions(self, txn_ids):
         return backend.query.get_transactions(self.connection, txn_ids)
 
-    def get_transactions_filtered(self, asset_id, operation=None, last_tx=None):
+
+    def get_hydrated_transactions(self, txn_ids):
+        """Return the transactions that match the transaction ids (txn_ids),
+        with their asset and metadata already joined in.
+
+        Args:
+            txn_ids (:obj:`list` of :obj:`str`): A list of txn_ids to
+                retrieve from the database.
+
+        Returns:
+            list: The list of transaction dicts, in the order of ``txn_ids``.
+        """
+        cached = {}
+        for txn_id in txn_ids:
+            transaction = self.read_cache.get(('transaction', txn_id))
+            if transaction is not None:
+                cached[txn_id] = transaction
+        missing = [txn_id for txn_id in txn_ids if txn_id not in cached]
+        if missing:
+            for transaction in backend.query.get_hydrated_transactions(
+                    self.connection, missing):
+                self.read_cache.put(('transaction', transaction['id']),
+                                    transaction)
+                cached[transaction['id']] = transaction
+        return [cached[txn_id] for txn_id in txn_ids if txn_id in cached]
+
+    def get_transactions_filtered(self, asset_id, operation=None, last_tx=None,
+                                  after=None, limit=None):
         """Get a list of transactions filtered on some criteria
+
+        Args:
+            asset_id (str): the id of the asset.
+            operation (str): only return transactions with this operation.
+            last_tx (bool): only return the last transaction.
+            after (str): only return the transactions following the one
+                with this id, as returned by a previous call.
+            limit (int): return at most this many transactions.
+
+        Returns:
+            :obj:`list` of Transaction: the transactions, in the order they
+            were committed.
         """
-        txids = backend.query.get_txids_filtered(self.connection, asset_id,
-                                                 operation, last_tx)
-        for txid in txids:
-            yield self.get_transaction(txid)
+        txids = list(backend.query.get_txids_filtered(
+            self.connection, asset_id, operation, bool(last_tx), after, limit))
+        return Transaction.from_db(self, self.get_hydrated_transactions(txids))
+
+
+    def get_provenance(self, txid, output, depth=None, limit=None):
+        """Get the transactions an output was transferred through: the one
+        creating it and, transitively, every transaction it spends from.
+
+        Args:
+            txid (str): the id of the transaction creating the output.
+            output (int): the index of the output.
+            depth (int): how many transfers away from the first
+                transaction to go, ``None`` for no bound.
+            limit (int): the maximum number of transactions to return,
+                ``None`` for no bound.
+
+        Returns:
+            :obj:`list` of Transaction: the transactions, the closest ones
+            first.
+        """
+        return Transaction.from_db(self, list(backend.query.get_provenance(
+            self.connection, txid, output, depth, limit)))
+
+
+    def get_descendants(self, txid, output, depth=None, limit=None):
+        """Get the transactions an output was transferred to: the one
+        spending it and, transitively, every transaction spending from it.
+
+        Args:
+            txid (str): the id of the transaction creating the output.
+            output (int): the index of the output.
+            depth (int): how many transfers away from the first
+                transaction to go, ``None`` for no bound.
+            limit (int): the maximum number of transactions to return,
+                ``None`` for no bound.
+
+        Returns:
+            :obj:`list` of Transaction: the transactions, the closest ones
+            first.
+        """
+        return Transaction.from_db(self, list(backend.query.get_descendants(
+            self.connection, txid, output, depth, limit)))
 
 
     def get_outputs_filtered(self, owner, spent=None):
-        """Get a list of output links filtered on some criteria
+        """Get the output links filtered on some criteria
 
         Args:
             owner (str): base58 encoded public_key.
@@ -297,8 +515,9 @@ class MultiChainDB(object):
                           not specified (``None``) return all outputs.
 
         Returns:
-            :obj:`list` of TransactionLink: list of ``txid`` s and ``output`` s
-            pointing to another transaction's condition
+            iterator of TransactionLink: ``txid`` s and ``output`` s
+            pointing to another transaction's condition, read from the
+            database as the iterator is consumed.
         """
         outputs = self.fastquery.get_outputs_by_public_key(owner)
         if spent is None:
@@ -310,9 +529,9 @@ class MultiChainDB(object):
 
 
     def get_spent(self, txid, output, current_transactions=[]):
-        transactions = backend.query.get_spent(self.connection, txid,
-                                               output)
-        transactions = list(transactions) if transactions else []
+        # NOTE: cursors have no truth value, always consume them.
+        transactions = list(backend.query.get_spent(self.connection, txid,
+                                                    output))
         if len(transactions) > 1:
             raise core_exceptions.CriticalDoubleSpend(
                 '`{}` was spent more than once. There is a problem'
@@ -337,6 +556,48 @@ class MultiChainDB(object):
         return transaction
 
 
+    def get_spent_outputs(self, links, current_transactions=[]):
+        """Check, in a single query, which of the given outputs are spent.
+
+        Args:
+            links (:obj:`list` of TransactionLink): the outputs to check.
+            current_transactions (:obj:`list` of Transaction): transactions
+                not yet committed that have to be taken into account.
+
+        Returns:
+            :obj:`set` of TransactionLink: the outputs among ``links`` that
+            are spent either by a committed transaction or by one of
+            ``current_transactions``.
+        """
+        spends = Counter()
+        if links:
+            # Outputs still in the UTXO set are unspent: only the other
+            # ones have to be looked up among the spending transactions.
+            unspent = self.get_unspent_links(links)
+            outputs = [link.to_dict() for link in set(links) - unspent]
+            if outputs:
+                for spend in backend.query.get_spent_outputs(self.connection, outputs):
+                    spends[TransactionLink.from_dict(spend['fulfills'])] += 1
+
+        for link, count in spends.items():
+            if count > 1:
+                raise core_exceptions.CriticalDoubleSpend(
+                    '`{}` was spent more than once. There is a problem'
+                    ' with the chain'.format(link.txid))
+
+        wanted = set(links)
+        for ctxn in current_transactions:
+            for ctxn_input in ctxn.inputs:
+                if ctxn_input.fulfills in wanted:
+                    spends[ctxn_input.fulfills] += 1
+
+        for link, count in spends.items():
+            if count > 1:
+                raise DoubleSpend('tx "{}" spends inputs twice'.format(link.txid))
+
+        return set(spends)
+
+
     def store_block(self, block):
         """Create a new block."""
 
@@ -359,6 +620,11 @@ class MultiChainDB(object):
             block_id (int): block id of the block to get.
         """
 
+        key = ('block', block_id)
+        result = self.read_cache.get(key)
+        if result is not None:
+            return result
+
         block = backend.query.get_block(self.connection, block_id)
         latest_block = self.get_latest_block()
         latest_block_height = latest_block['height'] if latest_block else 0
@@ -370,8 +636,9 @@ class MultiChainDB(object):
                   'transactions': []}
 
         if block:
-            transactions = backend.query.get_transactions(self.connection, block['transactions'])
+            transactions = self.get_hydrated_transactions(block['transactions'])
             result['transactions'] = [t.to_dict() for t in Transaction.from_db(self, transactions)]
+            self.read_cache.put(key, result)
 
         return result
 
@@ -393,8 +660,43 @@ class MultiChainDB(object):
         return [block['height'] for block in blocks]
 
 
-    def validate_transaction(self, tx, current_transactions=[]):
-        """Validate a transaction against the current status of the database."""
+    def verify_signatures(self, transactions):
+        """Verify the Ed25519 signatures of ``transactions`` in one batch.
+
+        Args:
+            transactions (list): the
+                :class:`~multichaindb.models.Transaction` to verify.
+
+        Returns:
+            list: whether the signatures of each transaction are all valid,
+            in order. ``False`` for those with other conditions, e.g.
+            thresholds: they are left to `inputs_valid`.
+        """
+        signatures = [transaction.ed25519_signatures()
+                      for transaction in transactions]
+        if not any(signatures):
+            return [False] * len(transactions)
+
+        if self.batch_verifier([signature for signed in signatures if signed
+                                for signature in signed]):
+            return [bool(signed) for signed in signatures]
+
+        # Some signature is invalid: find which, one at a time.
+        return [bool(signed) and all(ed25519_verify(*signature)
+                                     for signature in signed)
+                for signed in signatures]
+
+
+    def validate_transaction(self, tx, current_transactions=[],
+                             prevalidated=False):
+        """Validate a transaction against the current status of the database.
+
+        Args:
+            prevalidated (bool): whether the schema, id and signatures of
+                ``tx`` were already verified, e.g. by ``check_tx``. Only
+                the checks depending on the state of the chain are done
+                then.
+        """
 
         transaction = tx
 
@@ -403,21 +705,23 @@ class MultiChainDB(object):
         # throught the code base.
         if isinstance(transaction, dict):
             try:
-                transaction = Transaction.from_dict(tx)
+                transaction = Transaction.from_dict(tx, prevalidated)
             except SchemaValidationError as e:
                 logger.warning('Invalid transaction schema: %s', e.__cause__.message)
                 return False
             except ValidationError as e:
                 logger.warning('Invalid transaction (%s): %s', type(e).__name__, e)
                 return False
-        return transaction.validate(self, current_transactions)
+        return transaction.validate(self, current_transactions, prevalidated)
 
 
-    def is_valid_transaction(self, tx, current_transactions=[]):
+    def is_valid_transaction(self, tx, current_transactions=[],
+                             prevalidated=False):
         # NOTE: the function returns the Transaction object in case
         # the transaction is valid
         try:
-            return self.validate_transaction(tx, current_transactions)
+            return self.validate_transaction(tx, current_transactions,
+                                             prevalidated)
         except ValidationError as e:
             logger.warning('Invalid transaction (%s): %s', type(e).__name__, e)
             return False
@@ -554,3 +858,15 @@ class MultiChainDB(object):
 
 
 Block = namedtuple('Block', ('app_hash', 'height', 'transactions'))
+
+
+def utxo_hash(utxo):
+    """Hash identifying an unspent output, i.e. a leaf of the UTXO set
+    merkle tree.
+
+    Args:
+        utxo (dict): dict with (at least) the ``transaction_id`` and the
+            ``output_index`` of the output.
+    """
+    return sha3_256('{}{}'.format(utxo['transaction_id'],
+                                  utxo['output_index']).encode()).digest()
@@ -0,0 +1,247 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Validation of the transactions entering the mempool (``check_tx``).
+
+A transaction is fully validated once per node: the HTTP API, then
+``check_tx``, remember the transactions that passed in a `ValidatedCache`,
+and their schema, id and signatures are not checked again afterwards.
+"""
+
+import errno
+import logging
+import multiprocessing as mp
+import os
+import socket
+import stat
+import time
+from collections import OrderedDict
+
+import gevent
+
+try:
+    from hashlib import sha3_256
+except ImportError:
+    from sha3 import sha3_256
+
+import multichaindb
+from multichaindb.tendermint_utils import (decode_transaction,
+                                           encode_transaction_bytes)
+
+
+logger = logging.getLogger(__name__)
+
+# Number of transactions remembered by a `ValidatedCache`.
+VALIDATED_CACHE_SIZE = 100000
+
+# Size of the messages of a `ValidatedFeed`: a sha3-256 digest followed
+# by a transaction id.
+DIGEST_SIZE = 32
+MESSAGE_SIZE = DIGEST_SIZE + 64
+
+
+def validated_key(transaction_id, raw_transaction):
+    """Return the key of a transaction in a `ValidatedCache`: its id and
+    the sha3-256 digest of its raw bytes.
+    """
+    return (transaction_id, sha3_256(raw_transaction).digest())
+
+
+class ValidatedCache:
+    """The keys (see :func:`validated_key`) of the transactions that passed
+    validation, most recent last.
+
+    Tendermint delivers the exact bytes it checked, so a transaction found
+    here when delivered has a valid schema, id and signatures: only the
+    checks depending on the state of the chain, such as double spends, are
+    left to do.
+
+    Args:
+        max_size (int): the number of transactions remembered.
+    """
+
+    def __init__(self, max_size=VALIDATED_CACHE_SIZE):
+        self.max_size = max_size
+        self._keys = OrderedDict()
+
+    def add(self, key):
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+
+class ValidatedFeed:
+    """Receive in a `ValidatedCache` the transactions validated by the HTTP
+    API, sent by :func:`notify_validated` on a Unix datagram socket.
+
+    Whatever is received on the socket is trusted, and the signatures of
+    the transactions are not verified again: it is only created when
+    ``mempool.validated_socket`` is configured, and only the user running
+    MultiChainDB can write to it.
+
+    Args:
+        path (str): the path of the socket.
+        cache (ValidatedCache): the cache to feed.
+
+    Raises:
+        OSError: if ``path`` exists and is not a stale socket, e.g. it is
+            the socket of another running node.
+    """
+
+    def __init__(self, path, cache):
+        self.path = path
+        self.cache = cache
+        if os.path.exists(path):
+            self._remove_stale(path)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.bind(path)
+        os.chmod(path, 0o600)
+        self.socket.setblocking(False)
+
+    @staticmethod
+    def _remove_stale(path):
+        """Remove the socket left at ``path`` by a node that stopped."""
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise FileExistsError(errno.EEXIST, 'Not a socket', path)
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, 'Socket in use', path)
+
+    def receive(self):
+        """Add the transactions received so far to the cache.
+
+        Nothing waits for the messages: the HTTP API sends them before
+        posting the transaction to Tendermint, so they are there by the
+        time ``check_tx`` looks for it.
+        """
+        while True:
+            try:
+                message = self.socket.recv(MESSAGE_SIZE + 1)
+            except BlockingIOError:
+                return
+            if len(message) != MESSAGE_SIZE:
+                logger.warning('Ignore malformed validated transaction message')
+                continue
+            digest = message[:DIGEST_SIZE]
+            transaction_id = message[DIGEST_SIZE:].decode('ascii', 'replace')
+            self.cache.add((transaction_id, digest))
+
+    def close(self):
+        self.socket.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+_notify_socket = None
+
+
+def notify_validated(transaction):
+    """Report to the ABCI process that ``transaction`` passed validation,
+    as it is about to be posted by
+    :meth:`~multichaindb.lib.MultiChainDB.post_transaction`.
+
+    This is best effort: the message is dropped if nothing listens, or if
+    the socket buffer is full, and the transaction is then validated in
+    full by ``check_tx``.
+    """
+    global _notify_socket
+    path = multichaindb.config['mempool']['validated_socket']
+    if not path:
+        return
+    if _notify_socket is None:
+        _notify_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _notify_socket.setblocking(False)
+    # The raw bytes Tendermint passes to check_tx, as posted by
+    # `MultiChainDB.post_transaction`.
+    tx_dict = transaction.tx_dict if transaction.tx_dict else transaction.to_dict()
+    raw_transaction = encode_transaction_bytes(tx_dict)
+    transaction_id, digest = validated_key(transaction.id, raw_transaction)
+    try:
+        _notify_socket.sendto(digest + transaction_id.encode('ascii'), path)
+    except OSError as e:
+        logger.debug('Could not notify validated transaction: %s', e)
+
+
+_multichaindb = None
+
+
+def _init_worker():
+    global _multichaindb
+    from multichaindb import MultiChainDB
+    _multichaindb = MultiChainDB()
+
+
+def _check(raw_transaction, prevalidated):
+    try:
+        transaction = decode_transaction(raw_transaction)
+    except ValueError:
+        return False
+    return bool(_multichaindb.is_valid_transaction(
+        transaction, prevalidated=prevalidated))
+
+
+class CheckTxPool:
+    """Validate transactions against the committed state in a pool of
+    worker processes.
+
+    Tendermint sends the ``check_tx`` requests of its mempool one after
+    the other, without waiting for the answers: the ABCI server hands
+    those it received together to :meth:`check` (see
+    :class:`~multichaindb.abci_server.ABCIServer`), and they are
+    validated in parallel.
+
+    Args:
+        processes (int): the number of worker processes.
+    """
+
+    def __init__(self, processes=None):
+        self.pool = mp.Pool(processes or mp.cpu_count(),
+                            initializer=_init_worker)
+
+    def _wait(self, transactions, timeout):
+        results = [self.pool.apply_async(_check, transaction)
+                   for transaction in transactions]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        valid = []
+        for result in results:
+            remaining = None if deadline is None else \
+                max(0, deadline - time.monotonic())
+            try:
+                valid.append(result.get(remaining))
+            except mp.TimeoutError:
+                logger.warning('check_tx: validation timed out')
+                valid.append(False)
+        return valid
+
+    def check(self, transactions, timeout=None):
+        """Validate ``transactions`` in parallel.
+
+        Args:
+            transactions (list): the ``(raw_transaction, prevalidated)``
+                to validate.
+            timeout (float): how long to wait for all of them, in seconds.
+
+        Returns:
+            list: whether each transaction is valid, in order. The ones
+            not validated within ``timeout`` are not.
+        """
+        # Wait from a native thread, so that the other greenlets, i.e. the
+        # other ABCI connections, keep running meanwhile.
+        return gevent.get_hub().threadpool.apply(
+            self._wait, (transactions, timeout))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -0,0 +1,217 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Incremental merkle tree over a set of 256 bit keys.
+
+The tree is a binary radix (crit-bit) tree: every internal node splits its
+leaves on the most significant bit where they differ, so the shape of the
+tree, and hence its root, only depends on the set of keys and not on the
+order they were inserted in. Inserting or removing a key only touches the
+nodes on its path, i.e. ``O(log N)`` nodes for uniformly distributed keys
+such as hashes, and only those nodes are hashed again when the root is
+requested.
+"""
+
+from binascii import hexlify
+
+try:
+    from hashlib import sha3_256
+except ImportError:
+    from sha3 import sha3_256
+
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+class _Leaf:
+    __slots__ = ('key', 'hash')
+
+    def __init__(self, key, digest):
+        self.key = key
+        self.hash = sha3_256(LEAF_PREFIX + digest).digest()
+
+
+class _Node:
+    __slots__ = ('bit', 'key', 'left', 'right', 'hash')
+
+    def __init__(self, bit, left, right):
+        self.bit = bit
+        # Any key of the subtree: every key below this node shares the bits
+        # above `bit` with it.
+        self.key = left.key
+        self.left = left
+        self.right = right
+        self.hash = None
+
+
+def _join(bit, node, leaf):
+    if (leaf.key >> bit) & 1:
+        return _Node(bit, node, leaf)
+    return _Node(bit, leaf, node)
+
+
+def _insert(node, leaf):
+    crit_bit = (node.key ^ leaf.key).bit_length() - 1
+    if isinstance(node, _Leaf) or crit_bit > node.bit:
+        return _join(crit_bit, node, leaf)
+    if (leaf.key >> node.bit) & 1:
+        node.right = _insert(node.right, leaf)
+    else:
+        node.left = _insert(node.left, leaf)
+        node.key = node.left.key
+    node.hash = None
+    return node
+
+
+def _remove(node, key):
+    if isinstance(node, _Leaf):
+        return None if node.key == key else node
+    if (key >> node.bit) & 1:
+        node.right = _remove(node.right, key)
+        if node.right is None:
+            return node.left
+    else:
+        node.left = _remove(node.left, key)
+        if node.left is None:
+            return node.right
+        node.key = node.left.key
+    node.hash = None
+    return node
+
+
+def _contains(node, key):
+    while isinstance(node, _Node):
+        node = node.right if (key >> node.bit) & 1 else node.left
+    return node.key == key
+
+
+def _node_hash(left, right):
+    return sha3_256(NODE_PREFIX + left + right).digest()
+
+
+def _hash(node):
+    # Iterative post-order traversal restricted to the nodes whose hash was
+    # invalidated, to avoid hitting the recursion limit on skewed trees.
+    stack = [node]
+    while stack:
+        current = stack[-1]
+        if current.hash is not None:
+            stack.pop()
+        elif current.left.hash is None:
+            stack.append(current.left)
+        elif current.right.hash is None:
+            stack.append(current.right)
+        else:
+            current.hash = _node_hash(current.left.hash, current.right.hash)
+            stack.pop()
+    return node.hash
+
+
+def verify_proof(root, digest, proof):
+    """Return whether ``proof`` shows that the key ``digest`` is in the
+    tree whose root is ``root``.
+
+    Args:
+        root (str): the merkle root, in hexadecimal form.
+        digest (bytes): the key, as a 32 bytes digest.
+        proof (list): the proof returned by :meth:`MerkleTree.proof`.
+    """
+    key = int.from_bytes(digest, 'big')
+    current = _Leaf(key, digest).hash
+    previous_bit = -1
+    for bit, sibling in proof:
+        # Nodes split on higher bits the closer they are to the root.
+        if bit <= previous_bit:
+            return False
+        previous_bit = bit
+        if (key >> bit) & 1:
+            current = _node_hash(sibling, current)
+        else:
+            current = _node_hash(current, sibling)
+    return hexlify(current).decode() == root
+
+
+class MerkleTree:
+    """Merkle tree over a set of keys, updated in place.
+
+    Args:
+        digests (iterable of :obj:`bytes`): the initial keys, as 32 bytes
+            digests.
+    """
+
+    def __init__(self, digests=()):
+        self._root = None
+        self._size = 0
+        self.update(inserted=digests)
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, digest):
+        """Add the key ``digest`` to the tree, if not present."""
+        leaf = _Leaf(int.from_bytes(digest, 'big'), digest)
+        if self._root is None:
+            self._root = leaf
+        elif not _contains(self._root, leaf.key):
+            self._root = _insert(self._root, leaf)
+        else:
+            return
+        self._size += 1
+
+    def remove(self, digest):
+        """Remove the key ``digest`` from the tree, if present."""
+        if self._root is None:
+            return
+        key = int.from_bytes(digest, 'big')
+        if _contains(self._root, key):
+            self._root = _remove(self._root, key)
+            self._size -= 1
+
+    def update(self, inserted=(), deleted=()):
+        """Apply a batch of changes. Keys are inserted first, so a key both
+        inserted and deleted (e.g. an output created and spent in the same
+        block) ends up not being in the tree.
+
+        Args:
+            inserted (iterable of :obj:`bytes`): keys to add.
+            deleted (iterable of :obj:`bytes`): keys to remove.
+        """
+        for digest in inserted:
+            self.insert(digest)
+        for digest in deleted:
+            self.remove(digest)
+
+    def proof(self, digest):
+        """Return the proof that the key ``digest`` is in the tree, for
+        :func:`verify_proof`, or ``None`` if it is not.
+
+        The proof is the list of ``(bit, sibling hash)`` of the nodes on the
+        path of the key, from its leaf up to the root.
+        """
+        key = int.from_bytes(digest, 'big')
+        if self._root is None or not _contains(self._root, key):
+            return None
+        _hash(self._root)
+        path = []
+        node = self._root
+        while isinstance(node, _Node):
+            if (key >> node.bit) & 1:
+                path.append((node.bit, node.left.hash))
+                node = node.right
+            else:
+                path.append((node.bit, node.right.hash))
+                node = node.left
+        return path[::-1]
+
+    def root(self):
+        """Return the merkle root in hexadecimal form.
+
+        The root of an empty tree is the hash of the empty string, as in
+        :func:`~multichaindb.tendermint_utils.merkleroot`.
+        """
+        if self._root is None:
+            return sha3_256(b'').hexdigest()
+        return hexlify(_hash(self._root)).decode()
@@ -3,7 +3,6 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
-from multichaindb.backend.schema import validate_language_key
 from multichaindb.common.exceptions import (InvalidSignature,
                                           DuplicateTransaction)
 from multichaindb.common.schema import validate_transaction_schema
@@ -16,10 +15,11 @@ class Transaction(Transaction):
     METADATA = 'metadata'
     DATA = 'data'
 
-    def validate(self, multichaindb, current_transactions=[]):
+    def validate(self, multichaindb, current_transactions=[], prevalidated=False):
         """Validate transaction spend
         Args:
             multichaindb (MultiChainDB): an instantiated multichaindb.MultiChainDB object.
+            prevalidated (bool): whether the signatures were already verified.
         Returns:
             The transaction (Transaction) if the transaction is valid else it
             raises an exception describing the reason why the transaction is
@@ -35,25 +35,24 @@ class Transaction(Transaction):
                 raise DuplicateTransaction('transaction `{}` already exists'
                                            .format(self.id))
 
-            if not self.inputs_valid(input_conditions):
+            if not self.inputs_valid(input_conditions, prevalidated):
                 raise InvalidSignature('Transaction signature is invalid.')
 
         elif self.operation == Transaction.TRANSFER:
-            self.validate_transfer_inputs(multichaindb, current_transactions)
+            self.validate_transfer_inputs(multichaindb, current_transactions,
+                                          prevalidated)
 
         return self
 
     @classmethod
-    def from_dict(cls, tx_body):
-        return super().from_dict(tx_body, False)
+    def from_dict(cls, tx_body, skip_schema_validation=False):
+        return super().from_dict(tx_body, skip_schema_validation)
 
     @classmethod
     def validate_schema(cls, tx_body):
         validate_transaction_schema(tx_body)
         validate_txn_obj(cls.ASSET, tx_body[cls.ASSET], cls.DATA, validate_key)
         validate_txn_obj(cls.METADATA, tx_body, cls.METADATA, validate_key)
-        validate_language_key(tx_body[cls.ASSET], cls.DATA)
-        validate_language_key(tx_body, cls.METADATA)
 
 
 class FastTransaction:
@@ -3,25 +3,68 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
+import ctypes
+import heapq
+import logging
 import multiprocessing as mp
+import time
 from collections import defaultdict
 
 from multichaindb import App, MultiChainDB
+from multichaindb.common.exceptions import ValidationError
+from multichaindb.models import Transaction
+from multichaindb.core import CodeTypeError
+from multichaindb.mempool import CheckTxPool, validated_key
 from multichaindb.tendermint_utils import decode_transaction
 from abci import CodeTypeOk
 
 
+logger = logging.getLogger(__name__)
+
+
 class ParallelValidationApp(App):
     def __init__(self, multichaindb=None, events_queue=None, abci=None):
-        super().__init__(multichaindb, events_queue, abci=abci)
+        super().__init__(abci, multichaindb, events_queue)
         self.parallel_validator = ParallelValidator()
         self.parallel_validator.start()
+        self.check_tx_pool = CheckTxPool()
 
     def check_tx(self, raw_transaction):
-        return self.abci.ResponseCheckTx(code=CodeTypeOk)
+        return self.check_txs([raw_transaction])[0]
+
+    def check_txs(self, raw_transactions):
+        self.abort_if_abci_chain_is_not_synced()
+
+        transactions = []
+        prevalidated = []
+        for raw_transaction in raw_transactions:
+            try:
+                transaction = decode_transaction(raw_transaction)
+            except ValueError:
+                # Rejected by the workers as well.
+                transaction = None
+            transactions.append(transaction)
+            prevalidated.append(transaction is not None and
+                                self.is_validated(transaction, raw_transaction))
+        valid = self.check_tx_pool.check(
+            list(zip(raw_transactions, prevalidated)), timeout=30)
+
+        responses = []
+        for transaction, raw_transaction, is_valid in zip(
+                transactions, raw_transactions, valid):
+            if is_valid:
+                self.validated_transactions.add(
+                    validated_key(transaction['id'], raw_transaction))
+                responses.append(self.abci.ResponseCheckTx(code=CodeTypeOk))
+            else:
+                responses.append(self.abci.ResponseCheckTx(code=CodeTypeError))
+        return responses
 
     def deliver_tx(self, raw_transaction):
-        self.parallel_validator.validate(raw_transaction)
+        transaction = decode_transaction(raw_transaction)
+        self.parallel_validator.validate(
+            raw_transaction, transaction,
+            prevalidated=self.is_validated(transaction, raw_transaction))
         return self.abci.ResponseDeliverTx(code=CodeTypeOk)
 
     def end_block(self, request_end_block):
@@ -34,21 +77,140 @@ class ParallelValidationApp(App):
         return super().end_block(request_end_block)
 
 
-RESET = 'reset'
 EXIT = 'exit'
 
+# Size of the shared memory holding the raw transactions of a block.
+BUFFER_SIZE = 64 * 1024 * 1024
+
+
+class SharedBuffer:
+    """Raw transactions shared with the workers without pickling them.
+
+    The memory is allocated before the workers start, so that they map
+    it too. The transactions of a block are written one after the other,
+    from the start of the buffer again at each block: the workers are done
+    with the previous block by then.
+
+    Args:
+        size (int): the size of the buffer, in bytes.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.memory = mp.RawArray(ctypes.c_char, size)
+        self.offset = 0
+
+    def write(self, data):
+        """Copy ``data`` into the buffer and return its ``(offset,
+        length)``, or ``None`` if it does not fit.
+        """
+        end = self.offset + len(data)
+        if end > self.size:
+            return None
+        location = (self.offset, len(data))
+        self.memory[self.offset:end] = data
+        self.offset = end
+        return location
+
+    def read(self, location):
+        offset, length = location
+        return self.memory[offset:offset + length]
+
+    def reset(self):
+        self.offset = 0
+
+
+def _dependency_keys(dict_transaction):
+    """Return the ids linking a transaction to the transactions of the
+    same block it may depend on, or that may depend on it: its own id, the
+    id of its asset, and the ids of the transactions it spends.
+    """
+    keys = [dict_transaction.get('id')]
+    try:
+        keys.append(dict_transaction['asset']['id'])
+    except (KeyError, TypeError):
+        pass
+    for input_ in dict_transaction.get('inputs') or ():
+        try:
+            keys.append(input_['fulfills']['transaction_id'])
+        except (KeyError, TypeError):
+            pass
+    return keys
+
+
+def schedule(dict_transactions, number_of_workers):
+    """Group the transactions of a block that depend on each other, and
+    spread the groups over the workers.
+
+    Two transactions depend on each other if they share an id, an asset,
+    or a spent transaction: the groups are the connected components of
+    that relation (union-find). Validating each group in block order, on
+    its own, gives the same result as validating the whole block in order.
+
+    Args:
+        dict_transactions (list): the transactions of the block, in order.
+        number_of_workers (int): the number of workers.
+
+    Returns:
+        list: for each worker, the list of its groups, each a list of
+        ``(index, dict_transaction)`` in block order.
+    """
+    parents = {}
+
+    def find(key):
+        root = key
+        while parents.setdefault(root, root) != root:
+            root = parents[root]
+        while key != root:
+            parents[key], key = root, parents[key]
+        return root
+
+    roots = []
+    for index, dict_transaction in enumerate(dict_transactions):
+        # The index keeps malformed transactions, without an id, apart.
+        keys = [('index', index)] + [key for key in
+                                     _dependency_keys(dict_transaction)
+                                     if isinstance(key, str)]
+        root = find(keys[0])
+        for key in keys[1:]:
+            other = find(key)
+            if other != root:
+                parents[other] = root
+        roots.append(root)
+
+    groups = defaultdict(list)
+    for index, dict_transaction in enumerate(dict_transactions):
+        groups[find(roots[index])].append((index, dict_transaction))
+
+    # Largest groups first, each to the least loaded worker.
+    loads = [(0, worker) for worker in range(number_of_workers)]
+    heapq.heapify(loads)
+    assignments = [[] for _ in range(number_of_workers)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        load, worker = heapq.heappop(loads)
+        assignments[worker].append(group)
+        heapq.heappush(loads, (load + len(group), worker))
+    return assignments
+
 
 class ParallelValidator:
-    def __init__(self, number_of_workers=mp.cpu_count()):
+    def __init__(self, number_of_workers=mp.cpu_count(), buffer_size=BUFFER_SIZE):
         self.number_of_workers = number_of_workers
-        self.transaction_index = 0
+        self.dict_transactions = []
+        self.locations = []
+        self.prevalidated = []
+        self.buffer = SharedBuffer(buffer_size)
+        # The number of the block being validated, shared with the workers
+        # so that they skip the work left from a block that timed out.
+        self.sequence = mp.RawValue(ctypes.c_ulonglong, 0)
         self.routing_queues = [mp.Queue() for _ in range(self.number_of_workers)]
         self.workers = []
         self.results_queue = mp.Queue()
 
     def start(self):
         for routing_queue in self.routing_queues:
-            worker = ValidationWorker(routing_queue, self.results_queue)
+            worker = ValidationWorker(routing_queue, self.results_queue,
+                                      self.buffer, self.sequence)
             process = mp.Process(target=worker.run)
             process.start()
             self.workers.append(process)
@@ -57,20 +219,79 @@ class ParallelValidator:
         for routing_queue in self.routing_queues:
             routing_queue.put(EXIT)
 
-    def validate(self, raw_transaction):
-        dict_transaction = decode_transaction(raw_transaction)
-        index = int(dict_transaction['id'], 16) % self.number_of_workers
-        self.routing_queues[index].put((self.transaction_index, dict_transaction))
-        self.transaction_index += 1
+    def validate(self, raw_transaction, dict_transaction=None,
+                 prevalidated=False):
+        # NOTE: the dependencies of a transaction are only known once the
+        # whole block is: validation starts in `result`. The workers get
+        # the raw transaction through the shared buffer, or through their
+        # queue if it is full.
+        if dict_transaction is None:
+            dict_transaction = decode_transaction(raw_transaction)
+        self.dict_transactions.append(dict_transaction)
+        self.locations.append(self.buffer.write(raw_transaction) or
+                              raw_transaction)
+        self.prevalidated.append(prevalidated)
 
     def result(self, timeout=None):
-        result_buffer = [None] * self.transaction_index
-        for _ in range(self.transaction_index):
-            index, transaction = self.results_queue.get(timeout=timeout)
-            result_buffer[index] = transaction
-        self.transaction_index = 0
-        for routing_queue in self.routing_queues:
-            routing_queue.put(RESET)
+        """Validate the transactions of the block.
+
+        Args:
+            timeout (float): how long to wait for the workers, in seconds.
+
+        Returns:
+            list: for each transaction, in block order, the
+            :class:`~multichaindb.models.Transaction` if it is valid, or
+            ``None``.
+
+        Raises:
+            queue.Empty: if the workers did not validate the block within
+                ``timeout``. The validator is ready for the next block all
+                the same.
+        """
+        try:
+            return self._result(timeout)
+        finally:
+            self.dict_transactions = []
+            self.locations = []
+            self.prevalidated = []
+            self.buffer.reset()
+            self.sequence.value += 1
+
+    def _result(self, timeout):
+        sequence = self.sequence.value
+        dict_transactions = self.dict_transactions
+        assignments = schedule(dict_transactions, self.number_of_workers)
+        result_buffer = [None] * len(dict_transactions)
+
+        pending = 0
+        for routing_queue, groups in zip(self.routing_queues, assignments):
+            if not groups:
+                continue
+            routing_queue.put((sequence,
+                               [[(index, self.locations[index],
+                                  self.prevalidated[index])
+                                 for index, _ in group]
+                                for group in groups]))
+            pending += 1
+        # Workers only send back whether each transaction is valid: the
+        # valid ones are built again, without validation, from the dicts
+        # decoded here.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while pending:
+            remaining = None if deadline is None else \
+                max(0, deadline - time.monotonic())
+            result_sequence, results = self.results_queue.get(timeout=remaining)
+            if result_sequence != sequence:
+                # Late results of a block that timed out.
+                continue
+            pending -= 1
+            for index, error in results:
+                if error is None:
+                    result_buffer[index] = Transaction.from_dict(
+                        dict_transactions[index], True)
+                else:
+                    logger.debug('Invalid transaction %s (%s)',
+                                 dict_transactions[index].get('id'), error)
         return result_buffer
 
 
@@ -78,47 +299,81 @@ class ValidationWorker:
     """Run validation logic in a loop. This Worker is suitable for a Process
     life: no thrills, just a queue to get some values, and a queue to return results.
 
-    Note that a worker is expected to validate multiple transactions in
-    multiple rounds, and it needs to keep in memory all transactions already
-    validated, until a new round starts. To trigger a new round of validation,
-    a ValidationWorker expects a `RESET` message. To exit the infinite loop the
-    worker is in, it expects an `EXIT` message.
+    Each message is the number of a block, and the list of the groups of
+    its transactions assigned to the worker (see :func:`schedule`). Messages
+    of a block other than the one being validated, i.e. left from a block
+    that timed out, are skipped. A transaction is given
+    by its index in the block, its location in the shared buffer, or its
+    raw bytes, and whether it was already validated by ``check_tx``. The
+    Ed25519 signatures of all the transactions of the message are verified
+    in one batch first. Then each group is validated in order, each
+    transaction with the valid transactions before it in the group. The
+    result is the number of the block, and a list of ``(index, error)``,
+    where ``error`` is ``None`` for a valid transaction, and the reason it
+    is not otherwise. To exit the
+    infinite loop the worker is in, it expects an `EXIT` message.
     """
 
-    def __init__(self, in_queue, results_queue):
+    def __init__(self, in_queue, results_queue, buffer, sequence):
         self.in_queue = in_queue
         self.results_queue = results_queue
+        self.buffer = buffer
+        self.sequence = sequence
         self.multichaindb = MultiChainDB()
-        self.reset()
 
-    def reset(self):
-        # We need a place to store already validated transactions,
-        # in case of dependant transactions in the same block.
-        # `validated_transactions` maps an `asset_id` with the list
-        # of all other transactions sharing the same asset.
-        self.validated_transactions = defaultdict(list)
+    def validate(self, groups):
+        results = []
+        transaction_groups = []
+        for group in groups:
+            transactions = []
+            for index, location, prevalidated in group:
+                raw_transaction = self.buffer.read(location) \
+                    if isinstance(location, tuple) else location
+                try:
+                    transaction = Transaction.from_dict(
+                        decode_transaction(raw_transaction), prevalidated)
+                except ValidationError as e:
+                    logger.warning('Invalid transaction (%s): %s', type(e).__name__, e)
+                    results.append((index, type(e).__name__))
+                except ValueError:
+                    # Not JSON, or not UTF-8.
+                    results.append((index, 'InvalidTransaction'))
+                else:
+                    transactions.append((index, transaction, prevalidated))
+            transaction_groups.append(transactions)
 
-    def validate(self, dict_transaction):
-        try:
-            asset_id = dict_transaction['asset']['id']
-        except KeyError:
-            asset_id = dict_transaction['id']
+        # The transactions are built already: `prevalidated` only skips the
+        # verification of their signatures from here on.
+        verified = iter(self.multichaindb.verify_signatures(
+            [transaction for transactions in transaction_groups
+             for _, transaction, prevalidated in transactions
+             if not prevalidated]))
 
-        transaction = self.multichaindb.is_valid_transaction(
-                dict_transaction,
-                self.validated_transactions[asset_id])
-
-        if transaction:
-            self.validated_transactions[asset_id].append(transaction)
-        return transaction
+        for transactions in transaction_groups:
+            validated_transactions = []
+            for index, transaction, prevalidated in transactions:
+                prevalidated = prevalidated or next(verified)
+                try:
+                    transaction = self.multichaindb.validate_transaction(
+                        transaction, validated_transactions, prevalidated)
+                except ValidationError as e:
+                    logger.warning('Invalid transaction (%s): %s', type(e).__name__, e)
+                    transaction, error = None, type(e).__name__
+                else:
+                    error = None if transaction else 'InvalidTransaction'
+                if transaction:
+                    validated_transactions.append(transaction)
+                results.append((index, error))
+        return results
 
     def run(self):
         while True:
             message = self.in_queue.get()
-            if message == RESET:
-                self.reset()
-            elif message == EXIT:
+            if message == EXIT:
                 return
-            else:
-                index, transaction = message
-                self.results_queue.put((index, self.validate(transaction)))
+            sequence, groups = message
+            if sequence != self.sequence.value:
+                # Left from a block that timed out: the shared buffer may
+                # already hold the transactions of the next one.
+                continue
+            self.results_queue.put((sequence, self.validate(groups)))
@@ -63,27 +63,24 @@ def start(args):
     # We need to import this after spawning the web server
     # because import ABCIServer will monkeypatch all sockets
     # for gevent.
-    from abci.server import ABCIServer
+    from multichaindb.abci_server import ABCIServer
 
     setproctitle.setproctitle('multichaindb')
 
     # Start the ABCIServer
     abci = ABCI(TmVersion(multichaindb.config['tendermint']['version']))
     if args.experimental_parallel_validation:
-        app = ABCIServer(
-            app=ParallelValidationApp(
-                abci=abci.types,
-                events_queue=exchange.get_publisher_queue(),
-            )
+        app = ParallelValidationApp(
+            abci=abci.types,
+            events_queue=exchange.get_publisher_queue(),
         )
     else:
-        app = ABCIServer(
-            app=App(
-                abci=abci.types,
-                events_queue=exchange.get_publisher_queue(),
-            )
+        app = App(
+            abci=abci.types,
+            events_queue=exchange.get_publisher_queue(),
         )
-    app.run()
+    app.listen_validated_transactions()
+    ABCIServer(app=app).run()
 
 
 if __name__ == '__main__':
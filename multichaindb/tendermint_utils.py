@@ -17,7 +17,13 @@ except ImportError:
 def encode_transaction(value):
     """Encode a transaction (dict) to Base64."""
 
-    return base64.b64encode(json.dumps(value).encode('utf8')).decode('utf8')
+    return base64.b64encode(encode_transaction_bytes(value)).decode('utf8')
+
+
+def encode_transaction_bytes(value):
+    """Encode a transaction (dict) to the bytes Tendermint delivers."""
+
+    return json.dumps(value).encode('utf8')
 
 
 def decode_transaction(raw):
@@ -19,13 +19,14 @@ class ValidatorElection(Election):
     TX_SCHEMA_CUSTOM = TX_SCHEMA_VALIDATOR_ELECTION
 
 
-    def validate(self, multichaindb, current_transactions=[]):
+    def validate(self, multichaindb, current_transactions=[], prevalidated=False):
         """For more details refer BEP-21: https://github.com/bigchaindb/BEPs/tree/master/21
         """
 
         current_validators = self.get_validators(multichaindb)
 
-        super(ValidatorElection, self).validate(multichaindb, current_transactions=current_transactions)
+        super(ValidatorElection, self).validate(multichaindb, current_transactions=current_transactions,
+                                                prevalidated=prevalidated)
 
         # NOTE: change more than 1/3 of the current power is not allowed
         if self.asset['data']['power'] >= (1/3)*sum(current_validators.values()):
@@ -38,6 +38,10 @@ ROUTES_API_V1 = [
     r('transactions/<string:tx_id>', tx.TransactionApi),
     r('transactions', tx.TransactionListApi),
     r('outputs/', outputs.OutputListApi),
+    r('outputs/<string:tx_id>/<int:output_index>/provenance',
+      outputs.OutputProvenanceApi),
+    r('outputs/<string:tx_id>/<int:output_index>/descendants',
+      outputs.OutputDescendantsApi),
     r('validators/', validators.ValidatorsApi),
 ]
 
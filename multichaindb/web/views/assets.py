@@ -42,12 +42,9 @@ class AssetListApi(Resource):
 
         pool = current_app.config['multichain_pool']
 
-        with pool() as multichain:
-            assets = multichain.text_search(**args)
-
         try:
-            # This only works with MongoDB as the backend
-            return list(assets)
+            with pool() as multichain:
+                return list(multichain.text_search(**args))
         except OperationError as e:
             return make_error(
                 400,
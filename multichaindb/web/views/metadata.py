@@ -41,13 +41,10 @@ class MetadataApi(Resource):
 
         pool = current_app.config['multichain_pool']
 
-        with pool() as multichain:
-            args['table'] = 'metadata'
-            metadata = multichain.text_search(**args)
-
         try:
-            # This only works with MongoDB as the backend
-            return list(metadata)
+            with pool() as multichain:
+                args['table'] = 'metadata'
+                return list(multichain.text_search(**args))
         except OperationError as e:
             return make_error(
                 400,
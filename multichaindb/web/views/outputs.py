@@ -6,7 +6,30 @@
 from flask import current_app
 from flask_restful import reqparse, Resource
 
+from multichaindb.backend.exceptions import OperationError
 from multichaindb.web.views import parameters
+from multichaindb.web.views.base import make_error
+
+# Maximum (and default) bounds of the traversals of the provenance and
+# descendants of an output: a long chain of transfers must not be walked
+# in full by a single request.
+MAX_TRAVERSAL_DEPTH = 100
+MAX_TRAVERSAL_LIMIT = 1000
+
+
+def traversal_bounds():
+    """Parse the ``depth`` and ``limit`` of a traversal from the request."""
+    parser = reqparse.RequestParser()
+    parser.add_argument('depth', type=parameters.valid_depth,
+                        default=MAX_TRAVERSAL_DEPTH)
+    parser.add_argument('limit', type=parameters.valid_limit,
+                        default=MAX_TRAVERSAL_LIMIT)
+    args = parser.parse_args(strict=True)
+    if args['depth'] > MAX_TRAVERSAL_DEPTH:
+        raise ValueError('Depth must be at most {}'.format(MAX_TRAVERSAL_DEPTH))
+    if args['limit'] > MAX_TRAVERSAL_LIMIT:
+        raise ValueError('Limit must be at most {}'.format(MAX_TRAVERSAL_LIMIT))
+    return args
 
 
 class OutputListApi(Resource):
@@ -29,3 +52,70 @@ class OutputListApi(Resource):
                                                     args['spent'])
             return [{'transaction_id': output.txid, 'output_index': output.output}
                     for output in outputs]
+
+
+class OutputProvenanceApi(Resource):
+    def get(self, tx_id, output_index):
+        """API endpoint to get the provenance of an output: the transaction
+        creating it and every transaction it was transferred from.
+
+        Args:
+            tx_id (str): the id of the transaction creating the output.
+            output_index (int): the index of the output.
+            depth (int, optional): how many transfers away from the
+                output to go, at most 100 (the default).
+            limit (int, optional): the maximum number of transactions to
+                return, at most 1000 (the default).
+
+        Return:
+            A list of transactions, the closest ones first.
+        """
+        try:
+            bounds = traversal_bounds()
+        except ValueError as e:
+            return make_error(400, str(e))
+        pool = current_app.config['multichain_pool']
+
+        try:
+            with pool() as multichain:
+                txs = multichain.get_provenance(tx_id, output_index, **bounds)
+        except OperationError as e:
+            return make_error(400, '({}): {}'.format(type(e).__name__, e))
+
+        if not txs:
+            return make_error(404)
+
+        return [tx.to_dict() for tx in txs]
+
+
+class OutputDescendantsApi(Resource):
+    def get(self, tx_id, output_index):
+        """API endpoint to get the descendants of an output: the transaction
+        spending it and every transaction spending from it.
+
+        Args:
+            tx_id (str): the id of the transaction creating the output.
+            output_index (int): the index of the output.
+            depth (int, optional): how many transfers away from the
+                transaction spending the output to go, at most 100 (the
+                default).
+            limit (int, optional): the maximum number of transactions to
+                return, at most 1000 (the default).
+
+        Return:
+            A list of transactions, the closest ones first. The list is
+            empty if the output is unspent.
+        """
+        try:
+            bounds = traversal_bounds()
+        except ValueError as e:
+            return make_error(400, str(e))
+        pool = current_app.config['multichain_pool']
+
+        try:
+            with pool() as multichain:
+                txs = multichain.get_descendants(tx_id, output_index, **bounds)
+        except OperationError as e:
+            return make_error(400, '({}): {}'.format(type(e).__name__, e))
+
+        return [tx.to_dict() for tx in txs]
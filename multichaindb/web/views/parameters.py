@@ -41,6 +41,20 @@ def valid_operation(op):
     raise ValueError('Operation must be "CREATE" or "TRANSFER"')
 
 
+def valid_limit(limit):
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError('Limit must be a positive integer')
+    return limit
+
+
+def valid_depth(depth):
+    depth = int(depth)
+    if depth < 0:
+        raise ValueError('Depth must be a non-negative integer')
+    return depth
+
+
 def valid_mode(mode):
     if mode == 'async':
         return BROADCAST_TX_ASYNC
@@ -8,12 +8,14 @@
 For more information please refer to the documentation: http://bigchaindb.com/http-api
 """
 import logging
+from urllib.parse import urlencode
 
 from flask import current_app, request, jsonify
 from flask_restful import Resource, reqparse
 
 from multichaindb.common.transaction_mode_types import BROADCAST_TX_ASYNC
 from multichaindb.common.exceptions import SchemaValidationError, ValidationError
+from multichaindb.mempool import notify_validated
 from multichaindb.web.views.base import make_error
 from multichaindb.web.views import parameters
 from multichaindb.models import Transaction
@@ -51,11 +53,25 @@ class TransactionListApi(Resource):
                             required=True)
         parser.add_argument('last_tx', type=parameters.valid_bool,
                             required=False)
+        parser.add_argument('after', type=parameters.valid_txid,
+                            required=False)
+        parser.add_argument('limit', type=parameters.valid_limit,
+                            required=False)
         args = parser.parse_args()
         with current_app.config['multichain_pool']() as multichain:
             txs = multichain.get_transactions_filtered(**args)
 
-        return [tx.to_dict() for tx in txs]
+        data = [tx.to_dict() for tx in txs]
+        if args['limit'] and len(data) == args['limit']:
+            # There might be more transactions: link to the next page, that
+            # starts after the last transaction of this one.
+            query = request.args.copy()
+            query['after'] = data[-1]['id']
+            link = '<{}?{}>; rel="next"'.format(
+                request.base_url, urlencode(list(query.items(multi=True))))
+            return data, 200, {'Link': link}
+
+        return data
 
     def post(self):
         """API endpoint to push transactions to the Federation.
@@ -98,6 +114,7 @@ class TransactionListApi(Resource):
                     'Invalid transaction ({}): {}'.format(type(e).__name__, e)
                 )
             else:
+                notify_validated(tx_obj)
                 status_code, message = multichain.write_transaction(tx_obj, mode)
 
         if status_code == 202:
@@ -0,0 +1,117 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import pytest
+
+from multichaindb.backend.exceptions import CircuitOpenError, ConnectionError
+from multichaindb.backend.localarangodb.connection import LocalArangoDBConnection
+from multichaindb.backend.localarangodb.prepared import PreparedQuery
+
+
+class UnreachableQuery(PreparedQuery):
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, conn, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionAbortedError('no host could be reached')
+
+
+def test_open_breaker_is_not_retried():
+    # `max_tries=0` retries forever: only the breaker stops the loop.
+    conn = LocalArangoDBConnection(host='localhost', port=8529, dbname='test',
+                                   max_tries=0, retry_delay=1,
+                                   retry_max_delay=1, breaker_threshold=2,
+                                   breaker_timeout=60000)
+    query = UnreachableQuery()
+
+    with pytest.raises(CircuitOpenError):
+        conn.run(query)
+    assert query.calls == 2
+
+    with pytest.raises(ConnectionError):
+        conn.run(query)
+    assert query.calls == 2
+
+
+class LostCursor:
+    """A cursor whose next batch cannot be fetched."""
+
+    def __init__(self):
+        self.rows = [1]
+
+    def empty(self):
+        return not self.rows
+
+    def has_more(self):
+        return True
+
+    def __next__(self):
+        if self.rows:
+            return self.rows.pop()
+        raise ConnectionAbortedError('no host could be reached')
+
+
+def test_streamed_cursor_goes_through_breaker():
+    from multichaindb.backend.localarangodb.connection import StreamedCursor
+
+    conn = LocalArangoDBConnection(host='localhost', port=8529, dbname='test',
+                                   breaker_threshold=1, breaker_timeout=60000)
+    cursor = StreamedCursor(conn, LostCursor())
+
+    assert next(cursor) == 1
+    with pytest.raises(ConnectionError):
+        next(cursor)
+    assert conn.breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        next(cursor)
+
+
+class EndingCursor(LostCursor):
+    """A cursor whose last batch turns out to be empty."""
+
+    def __next__(self):
+        if self.rows:
+            return self.rows.pop()
+        raise StopIteration
+
+
+def test_streamed_cursor_end_closes_half_open_breaker():
+    from multichaindb.backend.localarangodb.connection import StreamedCursor
+
+    conn = LocalArangoDBConnection(host='localhost', port=8529, dbname='test',
+                                   breaker_threshold=1, breaker_timeout=0)
+    cursor = StreamedCursor(conn, EndingCursor())
+    assert next(cursor) == 1
+
+    conn.breaker.record_failure()
+    # The fetch probing the database ends the cursor.
+    with pytest.raises(StopIteration):
+        next(cursor)
+    assert not conn.breaker.is_open
+    assert conn.breaker.allow()
+
+
+def test_commit_block_waits_for_open_breaker(monkeypatch):
+    from multichaindb.backend.localarangodb import query
+    from multichaindb.backend.localarangodb.prepared import PreparedTransaction
+
+    conn = LocalArangoDBConnection(host='localhost', port=8529, dbname='test',
+                                   max_tries=1, retry_delay=1,
+                                   retry_max_delay=1, breaker_threshold=1,
+                                   breaker_timeout=100)
+    committed = []
+    monkeypatch.setattr(PreparedTransaction, 'run',
+                        lambda self, conn, **params: committed.append(params['block']))
+
+    # Failed check_tx lookups opened the breaker.
+    with pytest.raises(ConnectionError):
+        conn.run(UnreachableQuery())
+    assert conn.breaker.is_open
+
+    block = {'height': 1, 'app_hash': '', 'transactions': []}
+    query.commit_block(conn, block, [], [], [], [], [])
+    assert committed == [block]
+    assert not conn.breaker.is_open
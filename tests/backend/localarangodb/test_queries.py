@@ -0,0 +1,27 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import pytest
+
+from multichaindb.backend import query
+from multichaindb.lib import Block
+
+
+pytestmark = pytest.mark.backend('localarangodb')
+
+
+def test_commit_block_twice(b, signed_create_tx):
+    # A block committed again after a crash, before Tendermint got the
+    # answer, must end in the same state.
+    block = Block(app_hash='', height=1,
+                  transactions=[signed_create_tx.id])._asdict()
+    b.commit_block(block, [signed_create_tx])
+    b.commit_block(block, [signed_create_tx])
+
+    assert query.get_block(b.connection, 1)['height'] == 1
+    assert b.get_transaction(signed_create_tx.id).id == signed_create_tx.id
+    utxos = list(query.get_unspent_outputs(b.connection))
+    assert [(utxo['transaction_id'], utxo['output_index'])
+            for utxo in utxos] == [(signed_create_tx.id, 0)]
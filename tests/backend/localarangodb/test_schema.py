@@ -0,0 +1,53 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+from types import SimpleNamespace
+
+import pytest
+from arango.exceptions import AQLCacheConfigureError
+
+from multichaindb.backend.localarangodb.schema import enable_query_cache
+
+
+class FakeCache:
+    def __init__(self, mode, allowed=True):
+        self.mode = mode
+        self.allowed = allowed
+
+    def properties(self):
+        return {'mode': self.mode}
+
+    def configure(self, mode):
+        if not self.allowed:
+            raise AQLCacheConfigureError(SimpleNamespace(
+                error_message='forbidden', error_code=11,
+                status_code=403, status_text='Forbidden', url='',
+                method='put', headers={}, raw_body='', is_success=False,
+                body={}), SimpleNamespace(method='put', endpoint=''))
+        self.mode = mode
+
+
+def fake_connection(cache):
+    return SimpleNamespace(conn={'test': SimpleNamespace(
+        aql=SimpleNamespace(cache=cache))})
+
+
+@pytest.mark.parametrize('mode,expected', [('off', 'demand'),
+                                           ('demand', 'demand'),
+                                           ('on', 'on')])
+def test_enable_query_cache(mode, expected):
+    cache = FakeCache(mode)
+
+    enable_query_cache(fake_connection(cache), 'test')
+
+    assert cache.mode == expected
+
+
+def test_enable_query_cache_without_permission():
+    cache = FakeCache('off', allowed=False)
+
+    enable_query_cache(fake_connection(cache), 'test')
+
+    assert cache.mode == 'off'
@@ -0,0 +1,116 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+from copy import deepcopy
+
+import pytest
+
+from multichaindb.backend import query
+from multichaindb.lib import Block
+
+
+pytestmark = pytest.mark.backend('memory')
+
+
+def commit(b, height, transactions):
+    block = Block(app_hash='', height=height,
+                  transactions=[tx.id for tx in transactions])._asdict()
+    b.commit_block(block, transactions)
+
+
+def test_indexes_of_stored_transactions(b, alice, transfer_chain):
+    db = b.connection.conn
+    create, *transfers = transfer_chain
+    commit(b, 1, transfer_chain[:2])
+    commit(b, 2, transfer_chain[2:])
+
+    assert db.spends == {(tx.id, 0): spending.id
+                         for tx, spending in zip(transfer_chain, transfers)}
+    assert db.owners[alice.public_key] == [tx.id for tx in transfer_chain]
+    assert db.histories[create.id] == [((1, 1), transfers[0].id),
+                                       ((2, 0), transfers[1].id),
+                                       ((2, 1), transfers[2].id)]
+    assert db.transaction_blocks == {create.id: [1], transfers[0].id: [1],
+                                     transfers[1].id: [2], transfers[2].id: [2]}
+
+
+def test_transactions_stored_outside_a_block_come_first(b, transfer_chain):
+    db = b.connection.conn
+    create, *transfers = transfer_chain
+    commit(b, 1, [transfers[0]])
+    b.store_bulk_transactions([create, transfers[1]])
+
+    assert [transaction_id for _, transaction_id in db.histories[create.id]] == \
+        [transfers[1].id, transfers[0].id]
+    assert list(query.get_txids_filtered(b.connection, create.id)) == \
+        [create.id, transfers[1].id, transfers[0].id]
+
+
+def test_replacing_a_transaction_updates_the_indexes(db_conn, alice, signed_create_tx,
+                                                     signed_transfer_tx):
+    from multichaindb.common.crypto import generate_key_pair
+    from multichaindb.models import Transaction
+
+    bob = generate_key_pair()
+    db_conn.overwrite_mode = 'replace'
+    query.store_transactions(db_conn, [signed_create_tx.to_dict(),
+                                       signed_transfer_tx.to_dict()])
+    replacement = Transaction.transfer(signed_create_tx.to_inputs(),
+                                       [([bob.public_key], 1)],
+                                       asset_id=signed_create_tx.id).sign(
+                                           [alice.private_key]).to_dict()
+    # Same id, new owner: the indexes must follow the stored document.
+    replacement['id'] = signed_transfer_tx.id
+    query.store_transactions(db_conn, [replacement])
+
+    db = db_conn.conn
+    assert db.owners[alice.public_key] == [signed_create_tx.id]
+    assert db.owners[bob.public_key] == [signed_transfer_tx.id]
+    assert db.spends == {(signed_create_tx.id, 0): signed_transfer_tx.id}
+    assert len(db.histories[signed_create_tx.id]) == 1
+
+
+def test_delete_transactions(b, alice, signed_create_tx, signed_transfer_tx):
+    conn = b.connection
+    db = conn.conn
+    b.store_bulk_transactions([signed_create_tx, signed_transfer_tx])
+
+    query.delete_transactions(conn, [signed_transfer_tx.id])
+
+    assert query.get_transaction(conn, signed_transfer_tx.id) is None
+    assert list(query.get_metadata(conn, [signed_transfer_tx.id])) == []
+    assert db.spends == {}
+    assert db.owners[alice.public_key] == [signed_create_tx.id]
+    assert db.histories[signed_create_tx.id] == []
+    assert list(query.get_spent(conn, signed_create_tx.id, 0)) == []
+    # Deleting a transaction that is not stored does nothing.
+    query.delete_transactions(conn, [signed_transfer_tx.id])
+    assert query.get_transaction(conn, signed_create_tx.id)['id'] == \
+        signed_create_tx.id
+
+
+def test_delete_elections(db_conn):
+    query.store_election(db_conn, 'a', 1, False)
+    query.store_election(db_conn, 'a', 2, True)
+    query.store_elections(db_conn, [{'election_id': 'b', 'height': 2,
+                                     'is_concluded': False}])
+
+    query.delete_elections(db_conn, 2)
+
+    assert query.get_election(db_conn, 'a') == \
+        {'election_id': 'a', 'height': 1, 'is_concluded': False}
+    assert query.get_election(db_conn, 'b') is None
+
+
+def test_stored_documents_are_copies(db_conn, signed_create_tx):
+    expected = deepcopy(signed_create_tx.to_dict())
+    transaction = deepcopy(expected)
+    query.store_transactions(db_conn, [transaction])
+    transaction['outputs'] = []
+
+    stored = query.get_transaction(db_conn, signed_create_tx.id)
+    stored['inputs'] = []
+
+    assert query.get_transaction(db_conn, signed_create_tx.id) == expected
@@ -0,0 +1,89 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import threading
+
+import pytest
+
+from multichaindb.backend import query
+from multichaindb.lib import Block
+
+
+pytestmark = pytest.mark.backend('sqlite')
+
+
+def commit(b, height, transactions):
+    block = Block(app_hash='', height=height,
+                  transactions=[tx.id for tx in transactions])._asdict()
+    b.commit_block(block, transactions)
+
+
+def test_commit_block(b, alice, signed_create_tx, signed_transfer_tx):
+    conn = b.connection
+    commit(b, 1, [signed_create_tx, signed_transfer_tx])
+
+    assert query.get_latest_block(conn)['height'] == 1
+    assert list(query.get_block_with_transaction(conn, signed_transfer_tx.id)) == \
+        [{'height': 1}]
+    assert b.get_transaction(signed_transfer_tx.id).id == signed_transfer_tx.id
+    assert [tx['id'] for tx in query.get_spent(conn, signed_create_tx.id, 0)] == \
+        [signed_transfer_tx.id]
+    owned = query.get_owned_outputs(conn, alice.public_key)
+    assert sorted((output['transaction_id'], output['output_index'])
+                  for output in owned) == \
+        sorted([(signed_create_tx.id, 0), (signed_transfer_tx.id, 0)])
+    utxos = list(query.get_unspent_outputs(conn))
+    assert [(utxo['transaction_id'], utxo['output_index'])
+            for utxo in utxos] == [(signed_transfer_tx.id, 0)]
+    assert list(query.get_txids_filtered(conn, signed_create_tx.id)) == \
+        [signed_create_tx.id, signed_transfer_tx.id]
+    assert [asset['id'] for asset in query.text_search(conn, 'test')] == \
+        [signed_create_tx.id]
+
+
+def test_delete_transactions(b, alice, signed_create_tx, signed_transfer_tx):
+    conn = b.connection
+    b.store_bulk_transactions([signed_create_tx, signed_transfer_tx])
+
+    query.delete_transactions(conn, [signed_transfer_tx.id])
+
+    assert query.get_transaction(conn, signed_transfer_tx.id) is None
+    assert list(query.get_spent(conn, signed_create_tx.id, 0)) == []
+    assert [tx['id'] for tx in query.get_owned_ids(conn, alice.public_key)] == \
+        [signed_create_tx.id]
+
+
+def test_each_thread_uses_its_own_connection(b, signed_create_tx):
+    conn = b.connection
+    b.store_bulk_transactions([signed_create_tx])
+    threads = 8
+    # All the threads open their connection at the same time.
+    barrier = threading.Barrier(threads)
+    connections = [None] * threads
+    errors = []
+
+    def read(index):
+        barrier.wait()
+        try:
+            connections[index] = conn.conn
+            for _ in range(20):
+                assert query.get_transaction(conn, signed_create_tx.id)['id'] == \
+                    signed_create_tx.id
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            conn.close()
+
+    workers = [threading.Thread(target=read, args=(index,))
+               for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert len(set(map(id, connections))) == threads
+    # The connection of this thread is still open.
+    assert query.get_transaction(conn, signed_create_tx.id)['id'] == signed_create_tx.id
@@ -0,0 +1,115 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Queries whose results must be the same on every backend."""
+
+import pytest
+
+from multichaindb.backend import query, schema
+from multichaindb.lib import Block
+
+
+pytestmark = pytest.mark.parametrize('backend_name', [
+    pytest.param(name, marks=pytest.mark.backend(name))
+    for name in ('memory', 'sqlite', 'localarangodb')
+])
+
+
+def commit(b, height, transactions):
+    block = Block(app_hash='', height=height,
+                  transactions=[tx.id for tx in transactions])._asdict()
+    b.commit_block(block, transactions)
+
+
+def page(conn, asset_id, after=None, limit=None):
+    return list(query.get_txids_filtered(conn, asset_id, after=after,
+                                         limit=limit))
+
+
+def test_asset_history_pages(b, backend_name, transfer_chain):
+    create, *transfers = transfer_chain
+    commit(b, 1, transfer_chain[:2])
+    commit(b, 2, transfer_chain[2:])
+    ids = [tx.id for tx in transfer_chain]
+
+    assert page(b.connection, create.id) == ids
+    assert page(b.connection, create.id, limit=2) == ids[:2]
+    assert page(b.connection, create.id, after=ids[1], limit=2) == ids[2:]
+    assert page(b.connection, create.id, after=ids[3]) == []
+    assert page(b.connection, create.id, after=create.id) == ids[1:]
+    assert list(query.get_txids_filtered(b.connection, create.id,
+                                         last_tx=True)) == [ids[-1]]
+
+
+def test_asset_history_of_transactions_stored_outside_a_block(b, backend_name, transfer_chain):
+    create = transfer_chain[0]
+    b.store_bulk_transactions(transfer_chain)
+    # Without a position, the transfers are ordered by id: paging through
+    # them must not skip any.
+    expected = page(b.connection, create.id)
+    assert sorted(expected) == sorted(tx.id for tx in transfer_chain)
+
+    pages, after = [], None
+    while True:
+        ids = page(b.connection, create.id, after=after, limit=1)
+        if not ids:
+            break
+        pages += ids
+        after = ids[-1]
+    assert pages == expected
+
+
+def test_store_block_positions(b, backend_name, transfer_chain):
+    create = transfer_chain[0]
+    # Committed by a version that did not store the block positions.
+    b.store_bulk_transactions(transfer_chain)
+    query.store_block(b.connection, Block(
+        app_hash='', height=1,
+        transactions=[tx.id for tx in reversed(transfer_chain)])._asdict())
+
+    schema.store_block_positions(b.connection, b.connection.dbname)
+    schema.store_block_positions(b.connection, b.connection.dbname)
+
+    transfers = [tx.id for tx in reversed(transfer_chain[1:])]
+    if backend_name != 'memory':
+        # The memory backend always knows the position.
+        assert page(b.connection, create.id) == [create.id] + transfers
+        assert page(b.connection, create.id, after=transfers[0]) == transfers[1:]
+
+
+@pytest.fixture
+def spend_chain(b, backend_name, transfer_chain):
+    if backend_name == 'localarangodb':
+        schema.build_spend_graph(b.connection, b.connection.dbname)
+        b.connection.spend_graph = True
+    commit(b, 1, transfer_chain)
+    return [tx.id for tx in transfer_chain]
+
+
+def test_provenance_is_bounded(b, backend_name, spend_chain):
+    conn = b.connection
+    *_, last = spend_chain
+
+    def provenance(**bounds):
+        return [tx['id'] for tx in query.get_provenance(conn, last, 0, **bounds)]
+
+    assert provenance() == spend_chain[::-1]
+    assert provenance(depth=0) == [last]
+    assert provenance(depth=2) == spend_chain[:0:-1]
+    assert provenance(limit=2) == spend_chain[:1:-1]
+    assert provenance(depth=1, limit=5) == spend_chain[:1:-1]
+
+
+def test_descendants_are_bounded(b, backend_name, spend_chain):
+    conn = b.connection
+    first, *transfers = spend_chain
+
+    def descendants(**bounds):
+        return [tx['id'] for tx in query.get_descendants(conn, first, 0, **bounds)]
+
+    assert descendants() == transfers
+    assert descendants(depth=0) == transfers[:1]
+    assert descendants(depth=1) == transfers[:2]
+    assert descendants(limit=2) == transfers[:2]
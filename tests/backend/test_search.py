@@ -0,0 +1,26 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import subprocess
+import sys
+
+from multichaindb.backend.search import search_text, terms
+
+
+def test_search_text_lists_strings_in_document_order():
+    value = {'name': 'Hello', 'tags': ['a', {'b': 'c'}], 'n': 1, 'x': None}
+    assert search_text(value) == 'Hello\na\nc'
+
+
+def test_terms():
+    assert terms('Hello, wörld-2!') == ['hello', 'wörld', '2']
+
+
+def test_sqlite_backend_does_not_load_arango():
+    code = ('import sys, multichaindb.backend.sqlite.query; '
+            'print(any(name.startswith("multichaindb.backend.localarangodb") '
+            'for name in sys.modules))')
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.strip() == b'False'
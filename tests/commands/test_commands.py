@@ -0,0 +1,26 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+from argparse import Namespace
+
+import pytest
+
+
+def test_start_refuses_the_memory_backend(monkeypatch):
+    from multichaindb.commands import multichaindb as commands
+
+    monkeypatch.setenv('MULTICHAINDB_DATABASE_BACKEND', 'memory')
+    monkeypatch.setattr(commands, 'setup_logging', lambda: None)
+
+    def recover(b):
+        raise AssertionError('the node must not start')
+
+    monkeypatch.setattr(commands, 'run_recover', recover)
+    args = Namespace(config=None, log_level=None,
+                     skip_initialize_database=True)
+
+    with pytest.raises(SystemExit) as exc:
+        commands.run_start(args)
+    assert exc.value.code == 1
@@ -0,0 +1,109 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import copy
+
+import pytest
+
+import multichaindb
+
+
+TEST_DBNAME = 'multichaindb_test'
+
+# Backends whose database server could not be reached: not tried again.
+_unreachable = {}
+
+
+@pytest.fixture
+def database_config(request, tmp_path):
+    """Configure the backend named by the test's ``backend`` marker, the
+    in-memory one by default, on a database of its own.
+    """
+    marker = request.node.get_closest_marker('backend')
+    name = marker.args[0] if marker else 'memory'
+    original = multichaindb.config['database']
+    config = copy.deepcopy(multichaindb._database_map[name])
+    config['name'] = TEST_DBNAME
+    # Fail fast, and skip, when the database server is not running.
+    if 'max_tries' in config:
+        config['max_tries'] = 1
+    # Keep the files of the embedded backends out of the working directory.
+    if 'path' in config:
+        config['path'] = str(tmp_path)
+    multichaindb.config['database'] = config
+    yield config
+    multichaindb.config['database'] = original
+
+
+@pytest.fixture
+def db_conn(database_config):
+    from arango.exceptions import ServerConnectionError
+    from multichaindb.backend import connect, schema
+    from multichaindb.backend.exceptions import ConnectionError
+
+    backend = database_config['backend']
+    if backend in _unreachable:
+        pytest.skip(_unreachable[backend])
+    try:
+        conn = connect()
+        schema.init_database(conn, TEST_DBNAME)
+    # The ArangoDB client only reaches the server with the first request,
+    # made by the schema functions outside of `Connection.run`.
+    except (ConnectionError, ConnectionAbortedError,
+            ServerConnectionError) as e:
+        _unreachable[backend] = '{} is not reachable: {}'.format(backend, e)
+        pytest.skip(_unreachable[backend])
+    yield conn
+    schema.drop_database(conn, TEST_DBNAME)
+
+
+@pytest.fixture
+def b(db_conn):
+    from multichaindb import MultiChainDB
+    return MultiChainDB(connection=db_conn)
+
+
+@pytest.fixture
+def alice():
+    from multichaindb.common.crypto import generate_key_pair
+    return generate_key_pair()
+
+
+@pytest.fixture
+def signed_create_tx(alice):
+    from multichaindb.models import Transaction
+    return Transaction.create([alice.public_key], [([alice.public_key], 1)],
+                              asset={'data': {'name': 'test'}}).sign(
+                                  [alice.private_key])
+
+
+@pytest.fixture
+def signed_transfer_tx(alice, signed_create_tx):
+    from multichaindb.models import Transaction
+    return Transaction.transfer(signed_create_tx.to_inputs(),
+                                [([alice.public_key], 1)],
+                                asset_id=signed_create_tx.id).sign(
+                                    [alice.private_key])
+
+
+@pytest.fixture
+def client(b):
+    from multichaindb.web.server import create_app
+    app = create_app(debug=True, multichaindb_factory=lambda: b)
+    return app.test_client()
+
+
+@pytest.fixture
+def transfer_chain(alice, signed_create_tx):
+    """A CREATE transaction and three TRANSFER transactions of its asset,
+    each one spending the previous one.
+    """
+    from multichaindb.models import Transaction
+    transactions = [signed_create_tx]
+    for _ in range(3):
+        transactions.append(Transaction.transfer(
+            transactions[-1].to_inputs(), [([alice.public_key], 1)],
+            asset_id=signed_create_tx.id).sign([alice.private_key]))
+    return transactions
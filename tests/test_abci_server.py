@@ -0,0 +1,62 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+from io import BytesIO
+
+from abci import ABCI, CodeTypeOk, TmVersion
+from abci.application import BaseApplication
+from abci.encoding import read_messages, write_message
+
+import multichaindb
+from multichaindb.abci_server import ABCIServer
+
+
+class RecordingApp(BaseApplication):
+
+    def __init__(self, abci):
+        super().__init__(abci)
+        self.batches = []
+
+    def check_txs(self, raw_transactions):
+        self.batches.append(list(raw_transactions))
+        return [self.abci.ResponseCheckTx(code=CodeTypeOk, data=raw_transaction)
+                for raw_transaction in raw_transactions]
+
+
+class FakeSocket:
+
+    def __init__(self, data):
+        self.inbound = [data, b'']
+        self.sent = b''
+
+    def recv(self, size):
+        return self.inbound.pop(0)
+
+    def sendall(self, data):
+        self.sent += data
+
+    def close(self):
+        pass
+
+
+def test_check_tx_requests_received_together_are_batched():
+    types = ABCI(TmVersion(multichaindb.config['tendermint']['version'])).types
+    app = RecordingApp(types)
+    server = ABCIServer(port=0, app=app)
+
+    def request(**kwargs):
+        return write_message(types.Request(**kwargs))
+
+    socket = FakeSocket(request(check_tx=types.RequestCheckTx(tx=b'a')) +
+                        request(check_tx=types.RequestCheckTx(tx=b'b')) +
+                        request(flush=types.RequestFlush()) +
+                        request(check_tx=types.RequestCheckTx(tx=b'c')))
+    server.handle_connection(socket, ('127.0.0.1', 1234))
+
+    assert app.batches == [[b'a', b'b'], [b'c']]
+    responses = list(read_messages(BytesIO(socket.sent), types.Response))
+    assert [response.WhichOneof('value') for response in responses] == \
+        ['check_tx', 'check_tx', 'flush', 'check_tx']
+    assert [responses[i].check_tx.data for i in (0, 1, 3)] == [b'a', b'b', b'c']
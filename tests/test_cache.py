@@ -0,0 +1,106 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import rapidjson
+
+from multichaindb.cache import ReadCache
+
+
+def size(value):
+    return len(rapidjson.dumps(value))
+
+
+def test_values_are_returned_as_copies():
+    cache = ReadCache(1024)
+    value = {'id': 'a', 'outputs': [{'amount': '1'}]}
+    cache.put('a', value)
+    value['outputs'].clear()
+
+    cached = cache.get('a')
+    cached['outputs'].clear()
+
+    assert cache.get('a') == {'id': 'a', 'outputs': [{'amount': '1'}]}
+    assert cache.bytes == size(cache.get('a'))
+
+
+def test_least_recently_used_values_are_evicted():
+    value = {'id': 'a'}
+    cache = ReadCache(3 * size(value))
+    for key in 'abc':
+        cache.put(key, {'id': key})
+    # Reading `a` makes `b` the least recently used value.
+    cache.get('a')
+
+    cache.put('d', {'id': 'd'})
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == \
+        [{'id': 'a'}, {'id': 'c'}, {'id': 'd'}]
+    assert cache.bytes == 3 * size(value)
+
+
+def test_values_larger_than_the_cache_are_not_cached():
+    cache = ReadCache(size({'id': 'a'}))
+    cache.put('a', {'id': 'a'})
+
+    cache.put('b', {'id': 'b', 'data': 'too large'})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'id': 'a'}
+
+
+def test_a_disabled_cache_stores_nothing():
+    cache = ReadCache(0)
+    cache.put('a', {'id': 'a'})
+
+    assert cache.get('a') is None
+    assert cache.bytes == 0
+
+
+def test_replacing_a_value_updates_the_size():
+    cache = ReadCache(1024)
+    cache.put('a', {'id': 'a'})
+    cache.put('a', {'id': 'a', 'data': 'more'})
+
+    assert cache.get('a') == {'id': 'a', 'data': 'more'}
+    assert cache.bytes == size({'id': 'a', 'data': 'more'})
+
+
+def test_discard_and_clear():
+    cache = ReadCache(1024)
+    for key in 'abc':
+        cache.put(key, {'id': key})
+
+    cache.discard('a')
+    cache.discard('missing')
+
+    assert cache.get('a') is None
+    assert cache.bytes == 2 * size({'id': 'b'})
+
+    cache.clear()
+
+    assert cache.get('b') is None
+    assert cache.bytes == 0
+
+
+def test_stats():
+    cache = ReadCache(1024)
+    cache.put('a', {'id': 'a'})
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'entries': 1,
+                             'bytes': size({'id': 'a'})}
+
+
+def test_deleted_transactions_are_not_read_from_the_cache(b, signed_create_tx):
+    b.store_bulk_transactions([signed_create_tx])
+    assert b.get_transaction(signed_create_tx.id).id == signed_create_tx.id
+    assert b.read_cache.get(('transaction', signed_create_tx.id)) is not None
+
+    b.delete_transactions([signed_create_tx.id])
+
+    assert b.get_transaction(signed_create_tx.id) is None
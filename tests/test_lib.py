@@ -0,0 +1,63 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import multichaindb
+from multichaindb.backend import query
+from multichaindb.lib import Block
+
+
+def commit(b, height, transactions):
+    block = Block(app_hash='', height=height,
+                  transactions=[tx.id for tx in transactions])._asdict()
+    b.commit_block(block, transactions)
+
+
+def test_committed_filter_is_built_on_first_use(b, signed_create_tx, monkeypatch):
+    calls = []
+    get_transaction_ids = query.get_transaction_ids
+    monkeypatch.setattr(query, 'get_transaction_ids',
+                        lambda conn: calls.append(conn) or get_transaction_ids(conn))
+
+    b.track_committed_transactions()
+    assert calls == []
+
+    assert not b.is_committed(signed_create_tx.id)
+    assert len(calls) == 1
+    commit(b, 1, [signed_create_tx])
+    assert b.is_committed(signed_create_tx.id)
+    assert len(calls) == 1
+
+
+def test_committed_filter_is_rebuilt_after_a_gap(b, signed_create_tx):
+    b.track_committed_transactions()
+    b.is_committed(signed_create_tx.id)
+    # Block 1 was committed by someone else.
+    commit(b, 2, [signed_create_tx])
+    assert b._committed is None
+    assert b.is_committed(signed_create_tx.id)
+    assert b._committed_height == 2
+
+
+def test_committed_filter_is_dropped_when_too_large(b, signed_create_tx, monkeypatch):
+    monkeypatch.setitem(multichaindb.config['cache'], 'committed_max_bytes', 0)
+    b.track_committed_transactions()
+    commit(b, 1, [signed_create_tx])
+
+    assert b.is_committed(signed_create_tx.id)
+    assert b._committed is None
+    assert not b._track_committed
+
+
+def test_verify_signatures_flags_each_transaction(b, alice, signed_create_tx):
+    from multichaindb.models import Transaction
+
+    forged = Transaction.create([alice.public_key], [([alice.public_key], 1)],
+                                asset={'data': {'name': 'forged'}}).sign([alice.private_key])
+    forged.inputs[0].fulfillment.signature = bytes(64)
+
+    assert b.verify_signatures([signed_create_tx, forged]) == [True, False]
+    assert b.verify_signatures([signed_create_tx]) == [True]
+    assert b.verify_signatures([]) == []
+    assert not hasattr(signed_create_tx, 'signatures_verified')
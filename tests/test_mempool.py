@@ -0,0 +1,106 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import base64
+import multiprocessing as mp
+import os
+import socket
+
+import pytest
+
+import multichaindb
+from multichaindb import MultiChainDB
+from multichaindb.mempool import (CheckTxPool, ValidatedCache, ValidatedFeed,
+                                  notify_validated, validated_key)
+from multichaindb.tendermint_utils import encode_transaction
+
+
+def test_check_tx_pool_validates_in_parallel(db_conn, monkeypatch):
+    # Every validation waits for the others: none of them returns unless
+    # all of them run at the same time.
+    barrier = mp.Barrier(4)
+    monkeypatch.setattr(MultiChainDB, 'is_valid_transaction',
+                        lambda self, tx, prevalidated=False: barrier.wait(10) >= 0)
+
+    pool = CheckTxPool(processes=4)
+    try:
+        valid = pool.check([(b'{"id": "%d"}' % n, False) for n in range(4)],
+                           timeout=30)
+    finally:
+        pool.close()
+
+    assert valid == [True] * 4
+
+
+def test_check_tx_pool_rejects_undecodable_transactions(db_conn):
+    pool = CheckTxPool(processes=1)
+    try:
+        assert pool.check([(b'not json', False)], timeout=30) == [False]
+    finally:
+        pool.close()
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'validated.sock')
+
+
+def test_notified_transactions_are_fed_to_the_cache(socket_path, signed_create_tx, monkeypatch):
+    monkeypatch.setitem(multichaindb.config['mempool'], 'validated_socket', socket_path)
+    feed = ValidatedFeed(socket_path, ValidatedCache())
+    try:
+        notify_validated(signed_create_tx)
+        feed.receive()
+    finally:
+        feed.close()
+
+    # Keyed on the bytes Tendermint delivers.
+    raw = base64.b64decode(encode_transaction(signed_create_tx.to_dict()))
+    assert validated_key(signed_create_tx.id, raw) in feed.cache
+
+
+def test_validated_feed_does_not_steal_a_live_socket(socket_path):
+    feed = ValidatedFeed(socket_path, ValidatedCache())
+    try:
+        with pytest.raises(OSError):
+            ValidatedFeed(socket_path, ValidatedCache())
+        assert os.path.exists(socket_path)
+    finally:
+        feed.close()
+
+
+def test_validated_feed_replaces_a_stale_socket(socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    feed = ValidatedFeed(socket_path, ValidatedCache())
+    feed.close()
+
+
+def test_validated_feed_does_not_remove_other_files(socket_path):
+    with open(socket_path, 'w') as f:
+        f.write('data')
+
+    with pytest.raises(OSError):
+        ValidatedFeed(socket_path, ValidatedCache())
+    assert os.path.exists(socket_path)
+
+
+def test_app_only_listens_when_started(b, socket_path, monkeypatch):
+    from abci import ABCI, TmVersion
+    from multichaindb import App
+
+    monkeypatch.setitem(multichaindb.config['mempool'], 'validated_socket', socket_path)
+    types = ABCI(TmVersion(multichaindb.config['tendermint']['version'])).types
+    app = App(types, multichaindb=b)
+    assert app.validated_feed is None
+    assert not os.path.exists(socket_path)
+
+    app.listen_validated_transactions()
+    try:
+        assert os.path.exists(socket_path)
+    finally:
+        app.validated_feed.close()
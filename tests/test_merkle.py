@@ -0,0 +1,73 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+from hypothesis import given, strategies as st
+
+from multichaindb.merkle import MerkleTree, verify_proof
+
+
+# Random keys, and keys sharing long prefixes, that split on low bits.
+digest = st.one_of(st.binary(min_size=32, max_size=32),
+                   st.integers(0, 255).map(lambda n: bytes(31) + bytes([n])))
+digests = st.lists(digest, unique=True, max_size=64)
+
+
+@given(digests, st.data())
+def test_root_does_not_depend_on_the_order_of_the_changes(keys, data):
+    deleted = data.draw(st.lists(st.sampled_from(keys), unique=True)
+                        if keys else st.just([]))
+    changes = [('insert', key) for key in keys] + \
+        [('remove', key) for key in deleted]
+    order = data.draw(st.permutations(changes))
+    # Any order, as long as a key is inserted before it is removed.
+    for key in deleted:
+        insert, remove = order.index(('insert', key)), order.index(('remove', key))
+        if remove < insert:
+            order[insert], order[remove] = order[remove], order[insert]
+
+    tree = MerkleTree()
+    for change, key in order:
+        getattr(tree, change)(key)
+
+    remaining = [key for key in keys if key not in deleted]
+    assert tree.root() == MerkleTree(reversed(remaining)).root()
+    assert len(tree) == len(remaining)
+
+
+@given(digests)
+def test_inserting_and_removing_the_same_keys_is_idempotent(keys):
+    tree = MerkleTree(keys)
+    root = tree.root()
+
+    tree.update(inserted=keys)
+
+    assert tree.root() == root
+    tree.update(deleted=keys)
+    assert tree.root() == MerkleTree().root()
+    assert len(tree) == 0
+
+
+@given(digests.filter(bool), st.data())
+def test_proof_round_trip(keys, data):
+    tree = MerkleTree(keys)
+    root = tree.root()
+    key = data.draw(st.sampled_from(keys))
+
+    proof = tree.proof(key)
+
+    assert verify_proof(root, key, proof)
+    other = bytes([key[0] ^ 1]) + key[1:]
+    assert not verify_proof(root, other, proof)
+    if proof:
+        bit, sibling = proof[0]
+        tampered = [(bit, bytes(32))] + proof[1:]
+        assert not verify_proof(root, key, tampered)
+
+
+def test_no_proof_for_a_missing_key():
+    tree = MerkleTree([bytes(32)])
+
+    assert tree.proof(bytes([1]) + bytes(31)) is None
+    assert MerkleTree().proof(bytes(32)) is None
@@ -0,0 +1,127 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import json
+import queue
+
+import pytest
+
+from multichaindb.models import Transaction
+
+
+def raw(transaction):
+    return json.dumps(transaction.to_dict()).encode('utf8')
+
+
+@pytest.fixture
+def create_txs(alice):
+    return [Transaction.create([alice.public_key], [([alice.public_key], 1)],
+                               asset={'data': {'n': n}}).sign([alice.private_key])
+            for n in range(2)]
+
+
+@pytest.fixture
+def validator(db_conn):
+    from multichaindb.parallel_validation import ParallelValidator
+    validator = ParallelValidator(number_of_workers=1)
+    yield validator
+    validator.stop()
+    for worker in validator.workers:
+        worker.join()
+
+
+def test_result_timeout_does_not_leak_into_next_block(validator, create_txs):
+    first, second = create_txs
+
+    # No worker is running yet: the first block times out.
+    validator.validate(raw(first))
+    with pytest.raises(queue.Empty):
+        validator.result(timeout=0.1)
+    assert validator.dict_transactions == []
+    assert validator.locations == []
+    assert validator.buffer.offset == 0
+
+    # A late result of the first block must not be read as the second's.
+    validator.results_queue.put((0, [(0, 'InvalidTransaction')]))
+    validator.start()
+    validator.validate(raw(second))
+    result = validator.result(timeout=30)
+
+    assert [transaction.id for transaction in result] == [second.id]
+
+
+@pytest.fixture
+def block(alice, create_txs):
+    """The transactions of a block: two chains of transfers, a double
+    spend, a transaction included twice and a malformed one.
+    """
+    first, second = create_txs
+    transfer = Transaction.transfer(first.to_inputs(), [([alice.public_key], 1)],
+                                    asset_id=first.id).sign([alice.private_key])
+    double_spend = Transaction.transfer(first.to_inputs(), [([alice.public_key], 1)],
+                                        asset_id=first.id,
+                                        metadata={'double': 'spend'}).sign(
+                                            [alice.private_key])
+    # Spends a transaction of the block that is not stored yet.
+    chained = Transaction.transfer(transfer.to_inputs(), [([alice.public_key], 1)],
+                                   asset_id=first.id).sign([alice.private_key])
+    return [first.to_dict(), second.to_dict(), transfer.to_dict(),
+            double_spend.to_dict(), chained.to_dict(), second.to_dict(),
+            {'malformed': True}]
+
+
+def test_schedule_groups_dependent_transactions(block):
+    from multichaindb.parallel_validation import schedule
+
+    assignments = schedule(block, 3)
+
+    groups = sorted([[index for index, _ in group]
+                     for groups in assignments for group in groups])
+    # The first asset, its transfers and the double spend; the second
+    # asset and its copy; the malformed transaction on its own.
+    assert groups == [[0, 2, 3, 4], [1, 5], [6]]
+    # Largest group first, each to the least loaded worker.
+    assert [[len(group) for group in groups] for groups in assignments] == \
+        [[4], [2], [1]]
+
+
+def test_schedule_with_more_groups_than_workers(block):
+    from multichaindb.parallel_validation import schedule
+
+    assignments = schedule(block, 2)
+
+    assert [[[index for index, _ in group] for group in groups]
+            for groups in assignments] == [[[0, 2, 3, 4]], [[1, 5], [6]]]
+
+
+def test_grouped_validation_matches_serial_validation(b, block):
+    from multichaindb.common.exceptions import ValidationError
+    from multichaindb.parallel_validation import ValidationWorker, schedule
+
+    serial = []
+    validated_transactions = []
+    for dict_transaction in block:
+        try:
+            transaction = Transaction.from_dict(dict_transaction)
+        except ValidationError:
+            transaction = None
+        if transaction:
+            transaction = b.is_valid_transaction(transaction,
+                                                 validated_transactions)
+        if transaction:
+            validated_transactions.append(transaction)
+        serial.append(bool(transaction))
+
+    worker = ValidationWorker(None, None, None, None)
+    results = []
+    for groups in schedule(block, 2):
+        results.extend(worker.validate(
+            [[(index, json.dumps(dict_transaction).encode('utf8'), False)
+              for index, dict_transaction in group]
+             for group in groups]))
+    grouped = [error is None for _, error in sorted(results)]
+
+    assert grouped == serial
+    assert serial == [True, True, True, False, True, False, False]
@@ -0,0 +1,49 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import pytest
+
+from multichaindb.lib import Block
+
+
+OUTPUTS_ENDPOINT = '/api/v1/outputs/'
+
+
+@pytest.fixture
+def committed_chain(b, transfer_chain):
+    b.commit_block(Block(app_hash='', height=1,
+                         transactions=[tx.id for tx in transfer_chain])._asdict(),
+                   transfer_chain)
+    return [tx.id for tx in transfer_chain]
+
+
+def test_provenance_is_bounded(client, committed_chain):
+    url = '{}{}/0/provenance'.format(OUTPUTS_ENDPOINT, committed_chain[-1])
+
+    res = client.get(url)
+    assert [tx['id'] for tx in res.json] == committed_chain[::-1]
+
+    res = client.get(url, query_string={'depth': 1})
+    assert [tx['id'] for tx in res.json] == committed_chain[:1:-1]
+
+    res = client.get(url, query_string={'limit': 1})
+    assert [tx['id'] for tx in res.json] == committed_chain[-1:]
+
+
+def test_descendants_are_bounded(client, committed_chain):
+    url = '{}{}/0/descendants'.format(OUTPUTS_ENDPOINT, committed_chain[0])
+
+    res = client.get(url, query_string={'depth': 0})
+    assert [tx['id'] for tx in res.json] == committed_chain[1:2]
+
+
+@pytest.mark.parametrize('bounds', [{'depth': -1}, {'depth': 101},
+                                    {'limit': 0}, {'limit': 1001},
+                                    {'depth': 'x'}])
+def test_traversal_bounds_are_checked(client, committed_chain, bounds):
+    for endpoint in ('provenance', 'descendants'):
+        res = client.get('{}{}/0/{}'.format(OUTPUTS_ENDPOINT, committed_chain[0], endpoint),
+                         query_string=bounds)
+        assert res.status_code == 400
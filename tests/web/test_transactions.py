@@ -0,0 +1,35 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# BigchainDB and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import pytest
+
+from multichaindb.lib import Block
+
+
+TX_ENDPOINT = '/api/v1/transactions/'
+
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'x'])
+def test_get_transactions_rejects_invalid_limit(client, signed_create_tx, limit):
+    res = client.get(TX_ENDPOINT, query_string={
+        'asset_id': signed_create_tx.id, 'limit': limit})
+    assert res.status_code == 400
+
+
+def test_get_transactions_links_next_page(b, client, transfer_chain):
+    create = transfer_chain[0]
+    b.commit_block(Block(app_hash='', height=1,
+                         transactions=[tx.id for tx in transfer_chain])._asdict(),
+                   transfer_chain)
+
+    res = client.get(TX_ENDPOINT, query_string={'asset_id': create.id, 'limit': 3})
+    assert res.status_code == 200
+    assert [tx['id'] for tx in res.json] == [tx.id for tx in transfer_chain[:3]]
+    assert 'after={}'.format(transfer_chain[2].id) in res.headers['Link']
+
+    res = client.get(TX_ENDPOINT, query_string={
+        'asset_id': create.id, 'limit': 3, 'after': transfer_chain[2].id})
+    assert [tx['id'] for tx in res.json] == [transfer_chain[3].id]
+    assert 'Link' not in res.headers